@@ -0,0 +1,288 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Union
+from admin_areas import AdminAreaIndex
+from geometry import load_border
+# imports for types
+from OSMPythonTools.element import Element as OSMElement
+from OSMPythonTools.overpass import OverpassResult
+
+if TYPE_CHECKING:
+    from earth_crawler import EarthCrawler
+
+
+class AddressResolver():
+    """
+    Resolves addresses (county, state, region, country) of place nodes
+    returned by Overpass. Administrative areas containing every node are
+    requested together with the nodes themselves ('is_in'), so most nodes
+    never need a Nominatim call. Remaining nodes are looked up with the
+    crawler data source (in batches of up to 50 ids per Nominatim
+    request).
+
+    When both borders and locations are searched ('local_addresses'
+    setting), containing areas are found locally instead: polygons of all
+    administrative relations of the search object are loaded in batches
+    and nodes are assigned to them by 'AdminAreaIndex'. Loaded borders of
+    exported regions are reused by 'EarthCrawler.fetch_region_wkt'.
+    """
+    # Administrative level to Nominatim address key mapping
+    ADMIN_LEVEL_KEYS = {2: "country", 3: "region", 4: "state", 6: "county"}
+
+    def __init__(self, Crawler: EarthCrawler) -> None:
+        """
+        Args:
+            Crawler (EarthCrawler): Crawler instance, which APIs and
+                settings are used
+        """
+        self.Crawler = Crawler
+        self.Tmp = Crawler.Tmp
+        self.index = AdminAreaIndex()
+        # {relation id: border wkt or wkb} of regions loaded for the index
+        self.borders: dict[int, Union[str, bytes]] = {}
+        # Address of the search object, shared by all its nodes
+        self.base_address: dict = {}
+
+    @property
+    def local(self) -> bool:
+        """Nodes addresses are resolved with local spatial index.
+        """
+        # Incremental crawls don't load borders of unchanged regions
+        return self.Tmp.local_addresses and self.Tmp.search_borders and \
+            self.Tmp.search_locations and not self.Tmp.incremental
+
+    def place_selectors(self) -> str:
+        """
+        Creates Overpass statements selecting chosen place nodes of the
+        areas in the ".a1" set.
+
+        Returns:
+            str: Overpass statements
+        """
+        points_search_line = ""
+        for choice in self.Tmp.search_places_choice:
+            points_search_line = f"{points_search_line} "\
+                f"node[place='{choice}'](area.a1);"
+        return points_search_line
+
+    def points_query(self, area_id: int) -> str:
+        """
+        Creates Overpass query returning chosen place nodes of the area,
+        each one followed by administrative areas it lies in.
+
+        Args:
+            area_id (int): Overpass area id
+
+        Returns:
+            str: Overpass query
+        """
+        points_search_line = self.place_selectors()
+        if self.local:
+            return f"area({area_id})->.a1; ({points_search_line}); out body;"
+        levels = "|".join(map(str, self.ADMIN_LEVEL_KEYS))
+        return f"area({area_id})->.a1; ({points_search_line})->.pts; "\
+            "foreach.pts->.p(.p out body; .p is_in->.i; "\
+            "area.i[\"boundary\"=\"administrative\"]"\
+            f"[\"admin_level\"~\"^({levels})$\"]; out tags;);"
+
+    def split_result(self, points: OverpassResult) -> tuple[
+            list[OSMElement], dict[int, list[OSMElement]]]:
+        """
+        Splits 'points_query' result into place nodes and areas
+        containing each of them.
+
+        Args:
+            points (OverpassResult): Result of 'points_query'
+
+        Returns:
+            tuple[list[OSMElement], dict[int, list[OSMElement]]]:
+                Place nodes and {node id: containing areas} dictionary
+        """
+        nodes: list[OSMElement] = []
+        containers: dict[int, list[OSMElement]] = {}
+        for element in points.elements() or []:
+            if element.type() == "node":
+                nodes.append(element)
+                containers[element.id()] = []
+            elif element.type() == "area" and nodes:
+                containers[nodes[-1].id()].append(element)
+        return nodes, containers
+
+    def address_from_tags(self, node: OSMElement, areas: list[OSMElement],
+                          language: Union[str, None] = None) -> dict:
+        """
+        Composes node address from its own tags and tags of
+        administrative areas containing it.
+
+        Args:
+            node (OSMElement): Place node
+            areas (list[OSMElement]): Areas containing the node
+            language (Union[str, None], optional): Names language.
+                Defaults to None ('objects_language').
+
+        Returns:
+            dict: Address with "location" and administrative levels keys
+        """
+        adr = {}
+        tags = node.tags() or {}
+        if "name" in tags:
+            adr["location"] = self.Crawler.choose_name_from_tag(
+                tags, language)
+        for area in areas:
+            area_tags = area.tags() or {}
+            try:
+                key = self.ADMIN_LEVEL_KEYS[int(area_tags["admin_level"])]
+            except (KeyError, ValueError):
+                continue
+            if key not in adr and "name" in area_tags:
+                adr[key] = self.Crawler.choose_name_from_tag(
+                    area_tags, language)
+        return adr
+
+    def address_from_nominatim(self, adr: dict) -> dict:
+        """
+        Converts Nominatim address into 'address_from_tags' format.
+
+        Args:
+            adr (dict): Nominatim address
+
+        Returns:
+            dict: Address with "location" and administrative levels keys
+        """
+        adr_mod = {}
+        for x in self.Tmp.search_places_choice:
+            if x in adr:
+                adr_mod["location"] = adr[x]
+        for x in self.ADMIN_LEVEL_KEYS.values():
+            if x in adr:
+                adr_mod[x] = adr[x]
+        return adr_mod
+
+    def set_search_object(self, result: dict) -> None:
+        """
+        Keeps address of the chosen Nominatim search result (requested with
+        'addressdetails'), which contains all nodes of the object.
+
+        Args:
+            result (dict): Nominatim search result
+        """
+        self.base_address = self.address_from_nominatim(
+            result.get("address", {}))
+        self.base_address.pop("location", None)
+
+    def index_admin_areas(self, area_id: str,
+                          regions: OverpassResult) -> None:
+        """
+        Loads borders of administrative relations found in the search
+        object into the spatial index. Relations of all levels from the
+        combined Overpass search are used if available, otherwise only
+        the exported regions.
+
+        Args:
+            area_id (str): Nominatim id of the search object
+            regions (OverpassResult): Exported regions
+        """
+        exported = {r.id() for r in regions.relations() or []}
+        by_level = self.Crawler.admin_relations.get(area_id)
+        if by_level is not None:
+            relations = [r for level in self.ADMIN_LEVEL_KEYS
+                         for r in by_level.get(level, [])]
+        else:
+            relations = regions.relations() or []
+        borders = self.Crawler.source.borders([r.id() for r in relations])
+        for relation in relations:
+            if relation.id() not in borders:
+                continue
+            if relation.id() in exported:
+                self.borders[relation.id()] = borders[relation.id()]
+            try:
+                key = self.ADMIN_LEVEL_KEYS[int(relation.tag("admin_level"))]
+            except (KeyError, TypeError, ValueError):
+                continue
+            geometry = load_border(borders[relation.id()])
+            if geometry.geom_type in ("Polygon", "MultiPolygon"):
+                self.index.add(
+                    geometry, key,
+                    self.Crawler.choose_name_from_tag(relation.tags()),
+                    self.Crawler.translated_names(relation.tags()))
+        self.Tmp.logger_object.info(
+            f"{len(self.index)} administrative areas indexed")
+
+    def resolve_locally(self, nodes: list[OSMElement]) -> dict[int, dict]:
+        """
+        Resolves addresses of nodes with the spatial index. Levels above
+        indexed ones are taken from the search object address.
+
+        Args:
+            nodes (list[OSMElement]): Place nodes
+
+        Returns:
+            dict[int, dict]: {node id: address} dictionary
+        """
+        located = self.index.assign([p.lon() for p in nodes],
+                                    [p.lat() for p in nodes])
+        return {p.id(): {**self.base_address, **areas,
+                         **self.address_from_tags(p, [])}
+                for p, areas in zip(nodes, located)}
+
+    def translate(self, nodes: list[OSMElement],
+                  containers: dict[int, list[OSMElement]],
+                  addresses: dict[int, dict]) -> None:
+        """
+        Adds names in 'EarthCrawler.extra_languages' to resolved addresses
+        ("names" key: {language: address}). Names without translation
+        (e.g. from Nominatim lookup) are kept in 'objects_language'.
+
+        Args:
+            nodes (list[OSMElement]): Place nodes
+            containers (dict[int, list[OSMElement]]):
+                {node id: containing areas} dictionary
+            addresses (dict[int, dict]): {node id: address} dictionary
+        """
+        resolved = [p for p in nodes if p.id() in addresses]
+        for language in self.Crawler.extra_languages:
+            if self.local:
+                located = self.index.assign([p.lon() for p in resolved],
+                                            [p.lat() for p in resolved],
+                                            language)
+            else:
+                located = [{} for _ in resolved]
+            for p, areas in zip(resolved, located):
+                adr = addresses[p.id()]
+                translated = {**areas, **self.address_from_tags(
+                    p, containers.get(p.id(), []), language)}
+                adr.setdefault("names", {})[language] = {
+                    key: translated.get(key, value)
+                    for key, value in adr.items() if key != "names"}
+
+    def resolve(self, nodes: list[OSMElement],
+                containers: dict[int, list[OSMElement]]) -> dict[int, dict]:
+        """
+        Resolves addresses of all nodes. Nodes without name or without
+        any containing area found are looked up with the data source.
+
+        Args:
+            nodes (list[OSMElement]): Place nodes
+            containers (dict[int, list[OSMElement]]):
+                {node id: containing areas} dictionary
+
+        Returns:
+            dict[int, dict]: {node id: address} dictionary
+        """
+        addresses = {}
+        unresolved = []
+        local = self.resolve_locally(nodes) if self.local else {}
+        for p in nodes:
+            adr = local.get(p.id()) or self.address_from_tags(
+                p, containers.get(p.id(), []))
+            if "location" in adr and len(adr) > 1:
+                addresses[p.id()] = adr
+            else:
+                unresolved.append(p)
+        if unresolved:
+            self.Tmp.logger_object.info(
+                f"{len(unresolved)} of {len(nodes)} nodes are looked up")
+            for node_id, adr in self.Crawler.source.lookup_addresses(
+                    unresolved).items():
+                addresses[node_id] = self.address_from_nominatim(adr)
+        self.translate(nodes, containers, addresses)
+        return addresses
@@ -0,0 +1,93 @@
+import threading
+import numpy as np
+import shapely
+from typing import Sequence, Union
+# imports for types
+from shapely.geometry.base import BaseGeometry
+
+
+class AdminAreaIndex():
+    """
+    Spatial index (STRtree) of administrative areas polygons, assigning
+    points to areas containing them with vectorized shapely predicates.
+    Areas can be added from several threads, the tree is rebuilt on the
+    first assignment after new areas are added.
+    """
+    def __init__(self) -> None:
+        self.geometries: list[BaseGeometry] = []
+        self.keys: list[str] = []
+        self.names: list[str] = []
+        # {language: name} of areas names exported in other languages
+        self.translations: list[dict[str, str]] = []
+        self._tree: Union[shapely.STRtree, None] = None
+        self._areas = np.empty(0)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def add(self, geometry: BaseGeometry, key: str, name: str,
+            translations: Union[dict[str, str], None] = None) -> None:
+        """
+        Adds area polygon.
+
+        Args:
+            geometry (BaseGeometry): Polygon or MultiPolygon
+            key (str): Address key of the area level ("county", "state",
+                "region" or "country")
+            name (str): Area name
+            translations (Union[dict[str, str], None], optional):
+                {language: name} of other languages. Defaults to None.
+        """
+        with self._lock:
+            self.geometries.append(geometry)
+            self.keys.append(key)
+            self.names.append(name)
+            self.translations.append(translations or {})
+            self._tree = None
+
+    def tree(self) -> shapely.STRtree:
+        """
+        Returns STRtree of added areas, building it if needed.
+
+        Returns:
+            shapely.STRtree: Areas tree
+        """
+        with self._lock:
+            if self._tree is None:
+                geometries = np.array(self.geometries, dtype=object)
+                shapely.prepare(geometries)
+                self._tree = shapely.STRtree(geometries)
+                self._areas = shapely.area(geometries)
+            return self._tree
+
+    def assign(self, lons: Sequence[float], lats: Sequence[float],
+               language: Union[str, None] = None) -> list[dict[str, str]]:
+        """
+        Finds areas containing every point. If areas of the same level
+        overlap, the smallest one is chosen.
+
+        Args:
+            lons (Sequence[float]): Points longitudes
+            lats (Sequence[float]): Points latitudes
+            language (Union[str, None], optional): Language of translated
+                names, areas without translation keep their name. Defaults
+                to None.
+
+        Returns:
+            list[dict[str, str]]: {address key: area name} of every point
+        """
+        addresses: list[dict[str, str]] = [{} for _ in range(len(lons))]
+        if not addresses or not self.geometries:
+            return addresses
+        tree = self.tree()
+        points = shapely.points(np.asarray(lons, dtype=float),
+                                np.asarray(lats, dtype=float))
+        # Points on a border belong to both areas ('intersects')
+        point_index, area_index = tree.query(points, predicate="intersects")
+        order = np.lexsort((self._areas[area_index], point_index))
+        for point, area in zip(point_index[order].tolist(),
+                               area_index[order].tolist()):
+            addresses[point].setdefault(self.keys[area], self.translations[
+                area].get(language, self.names[area]))
+        return addresses
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from typing import Any, Callable, TYPE_CHECKING, Union
+from tempdata import CrawlCancelled
+# imports for types
+from OSMPythonTools.element import Element as OSMElement
+from OSMPythonTools.overpass import OverpassResult
+
+if TYPE_CHECKING:
+    from earth_crawler import EarthCrawler
+    from geometry import GeometryPool
+
+
+class AsyncEarthCrawler():
+    """
+    Pipelines 'EarthCrawler' searches: first Nominatim and Overpass searches
+    of all ';'-separated objects run concurrently, and regions borders and
+    points are fetched ahead of the region being exported. Network requests
+    run in worker threads (bounded by 'max_concurrent_requests'), while
+    rate limits and retries are handled by the APIs themselves (osm_api).
+    Fetched borders are prepared by 'GeometryPool' worker processes, if
+    enabled ('geometry_workers' setting). Exports are filled in the
+    original objects and regions order.
+    """
+    def __init__(self, Crawler: EarthCrawler) -> None:
+        """
+        Args:
+            Crawler (EarthCrawler): Synchronous crawler, which stages are
+                pipelined
+        """
+        self.Crawler = Crawler
+        self.Tmp = Crawler.Tmp
+        # Number of regions fetched ahead of the exported one
+        self.prefetch = max(1, self.Tmp.max_concurrent_requests) * 2
+        self.geometry_pool: Union[GeometryPool, None] = None
+
+    async def request(self, func: Callable, *args: Any) -> Any:
+        """
+        Runs blocking network function in a worker thread.
+
+        Args:
+            func (Callable): 'EarthCrawler' fetch function
+
+        Returns:
+            Any: Function result
+        """
+        async with self.semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def search_object(self, single_obj_req: tuple[str, int]) -> tuple[
+            list, OverpassResult]:
+        """
+        First Nominatim and Overpass searches of a single object.
+
+        Args:
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+
+        Returns:
+            tuple[list, OverpassResult]: Nominatim search results json and
+                found Overpass regions
+        """
+        js = await self.request(self.Crawler.fetch_first_search,
+                                single_obj_req)
+        osm_area_id = f"{js[0]['osm_type'][0]}{js[0]['osm_id']}"
+        overp_regions = await self.request(
+            self.Crawler.overpass_search, osm_area_id, single_obj_req)
+        return js, overp_regions
+
+    async def fetch_border(self,
+                           region: OSMElement) -> Union[str, bytes, dict]:
+        """
+        Fetches region border and prepares it in the geometry pool.
+
+        Args:
+            region (OSMElement): Element, found by Overpass
+
+        Returns:
+            Union[str, bytes, dict]: Border wkt (or wkb) or border
+                prepared by the pool
+        """
+        region_wkt = await self.request(self.Crawler.fetch_region_wkt, region)
+        if self.geometry_pool is None:
+            return region_wkt
+        return await asyncio.wrap_future(self.geometry_pool.submit(
+            region_wkt, self.Crawler.region_admin_level(region)))
+
+    async def fetch_region(self, region: OSMElement) -> tuple[Any, Any]:
+        """
+        Concurrently fetches region border and points (if configured).
+
+        Args:
+            region (OSMElement): Element, found by Overpass
+
+        Returns:
+            tuple[Any, Any]: 'fetch_border' and 'fetch_locations' results
+        """
+        async def skip() -> None:
+            return None
+
+        journal = self.Crawler.journal
+        if journal is not None and journal.get(region.id()) is not None:
+            return None, None
+        return await asyncio.gather(
+            self.fetch_border(region) if self.Tmp.search_borders else skip(),
+            self.request(self.Crawler.fetch_locations, region)
+            if self.Tmp.search_locations else skip())
+
+    async def process_regions(self, overp_regions: OverpassResult) -> None:
+        """
+        Async counterpart of 'EarthCrawler.second_nominatim_search'.
+
+        Args:
+            overp_regions (OverpassResult): Overpass regions to proccess
+        """
+        relations = overp_regions.relations()
+        if relations is None:
+            self.Tmp.logger_object.error("No administrative levels found")
+            self.Tmp.current_stage_num = 0
+            self.Tmp.error_found = 1
+            return
+        self.Tmp.current_area_obj_number = len(relations)
+        self.Crawler.start_region_exports()
+        await self.request(self.Crawler.refresh_changed, overp_regions)
+        await self.request(self.Crawler.prefetch_borders, relations)
+        pending: deque = deque()
+        regions_iter = enumerate(relations)
+
+        def schedule() -> None:
+            item = next(regions_iter, None)
+            if item is not None:
+                i, region = item
+                pending.append(
+                    (i, region,
+                     asyncio.create_task(self.fetch_region(region))))
+
+        for _ in range(self.prefetch):
+            schedule()
+        try:
+            while pending:
+                i, region, task = pending.popleft()
+                schedule()
+                region_wkt, locations = await task
+                self.Crawler.process_region(i, region, region_wkt, locations)
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+
+    async def crawl(self) -> None:
+        """
+        Async counterpart of 'EarthCrawler.request_and_proccess_data'.
+        """
+        self.semaphore = asyncio.Semaphore(
+            max(1, self.Tmp.max_concurrent_requests))
+        if self.Tmp.search_borders and self.Tmp.geometry_workers != 0:
+            from geometry import GeometryPool
+            self.geometry_pool = GeometryPool(self.Tmp)
+            # Enough borders are fetched ahead to keep all workers busy
+            self.prefetch = max(self.prefetch, self.geometry_pool.workers * 2)
+        try:
+            await self.crawl_objects()
+        finally:
+            if self.geometry_pool is not None:
+                self.geometry_pool.close()
+                self.geometry_pool = None
+
+    async def crawl_objects(self) -> None:
+        """Searches and exports all objects of the search line.
+        """
+        search_list = self.Crawler.search_line_proccessing()
+        self.Tmp.obj_number = len(search_list)
+        searches = [asyncio.create_task(self.search_object(single_obj_req))
+                    for single_obj_req in search_list]
+        for single_obj_req, search in zip(search_list, searches):
+            try:
+                js, overp_regions = await search
+                self.Crawler.first_nominatim_search(single_obj_req, js)
+                await self.process_regions(overp_regions)
+            except CrawlCancelled:
+                self.Crawler.close_exports()
+                raise
+            except Exception:
+                self.Tmp.logger_object.exception(
+                    f"Search of {single_obj_req[0]} failed")
+                self.Tmp.error_found = 1
+            self.Crawler.export_results(single_obj_req)
@@ -0,0 +1,335 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import shapely
+from typing import Union
+from geometry import load_border
+from tempdata import TempData
+
+# Combined search of all region levels is stored with this level
+ALL_LEVELS = 0
+# Administrative levels of the combined search
+REGION_LEVELS = range(3, 11)
+
+
+class BoundaryIndex():
+    """
+    Persistent index of administrative relations, stored in a SQLite file
+    and filled as a side effect of crawls: relation tags (names in all
+    languages), administrative level, parent relations of the searches
+    they were found in and borders with their bounding boxes in an R*Tree.
+    Repeated crawls of indexed objects (e.g. in another language or with
+    another kml style) need no requests for regions and borders. Entries
+    expire after the responses cache TTLs, so changed regions and borders
+    are requested again.
+    """
+    def __init__(self, Tmp: TempData) -> None:
+        """
+        Opens (or creates) index database defined in Tmp parameters.
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+        """
+        self.Tmp = Tmp
+        self.ttl = {"nominatim": Tmp.cache_nominatim_ttl_hours * 3600,
+                    "overpass": Tmp.cache_overpass_ttl_hours * 3600}
+        self._lock = threading.Lock()
+        Tmp.check_folder_existance(
+            os.path.dirname(Tmp.boundary_index_file) or ".")
+        self._connection = sqlite3.connect(
+            Tmp.boundary_index_file, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS relations ("
+            "id INTEGER PRIMARY KEY, admin_level INTEGER, tags TEXT, "
+            "border BLOB, updated REAL, border_updated REAL);"
+            "CREATE TABLE IF NOT EXISTS parents ("
+            "parent INTEGER, child INTEGER, PRIMARY KEY (parent, child));"
+            "CREATE INDEX IF NOT EXISTS parents_child ON parents (child);"
+            "CREATE TABLE IF NOT EXISTS searched_levels ("
+            "parent INTEGER, admin_level INTEGER, updated REAL, "
+            "PRIMARY KEY (parent, admin_level));"
+            "CREATE TABLE IF NOT EXISTS searches ("
+            "key TEXT PRIMARY KEY, results TEXT, updated REAL);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS borders_bbox USING rtree("
+            "id, min_lon, max_lon, min_lat, max_lat);")
+        # Entries of index files written without update time are expired
+        for table, column in [("relations", "border_updated"),
+                              ("searched_levels", "updated"),
+                              ("searches", "updated")]:
+            columns = [row[1] for row in self._connection.execute(
+                f"PRAGMA table_info({table})")]
+            if column not in columns:
+                self._connection.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} REAL")
+        self._connection.commit()
+
+    def _expiry(self, endpoint: str) -> float:
+        """
+        Returns time, entries updated before which are expired.
+
+        Args:
+            endpoint (str): Endpoint name ("nominatim" or "overpass")
+
+        Returns:
+            float: Expiry timestamp
+        """
+        return time.time() - self.ttl[endpoint]
+
+    def search(self, key: str) -> Union[list[dict], None]:
+        """
+        Returns stored search results, if they are not expired.
+
+        Args:
+            key (str): Search key
+
+        Returns:
+            Union[list[dict], None]: Nominatim search results json or None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT results FROM searches WHERE key = ? AND updated >= ?",
+                (key, self._expiry("nominatim"))).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def add_search(self, keys: list[str], results: list[dict]) -> None:
+        """
+        Stores search results.
+
+        Args:
+            keys (list[str]): Search keys
+            results (list[dict]): Nominatim search results json
+        """
+        data = json.dumps(results, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                [(key, data, now) for key in keys])
+            self._connection.commit()
+
+    def add_relations(self, parent: int, level: Union[int, None],
+                      elements: list[dict]) -> None:
+        """
+        Stores administrative relations found in the parent relation and
+        marks the searched level (or all levels) as complete. Relations
+        of the level stored with an earlier search of the parent are
+        replaced.
+
+        Args:
+            parent (int): Relation id of the search object
+            level (Union[int, None]): Searched level, None for all levels
+            elements (list[dict]): Overpass relations json
+        """
+        rows = []
+        for element in elements:
+            if element.get("type") != "relation":
+                continue
+            tags = element.get("tags", {})
+            try:
+                admin_level = int(tags["admin_level"])
+            except (KeyError, ValueError):
+                continue
+            rows.append((element["id"], admin_level,
+                         json.dumps(tags, ensure_ascii=False)))
+        levels = list(REGION_LEVELS) if level is None else [level]
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM parents WHERE parent = ? AND child IN (SELECT "
+                "id FROM relations WHERE admin_level IN "
+                f"({', '.join('?' * len(levels))}))", (parent, *levels))
+            self._connection.executemany(
+                "INSERT INTO relations (id, admin_level, tags, updated) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "admin_level = excluded.admin_level, tags = excluded.tags, "
+                "updated = excluded.updated",
+                [(*row, now) for row in rows])
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO parents VALUES (?, ?)",
+                [(parent, row[0]) for row in rows])
+            self._connection.execute(
+                "INSERT OR REPLACE INTO searched_levels VALUES (?, ?, ?)",
+                (parent, ALL_LEVELS if level is None else level, now))
+            self._connection.commit()
+
+    def add_borders(self, borders: dict[int, Union[str, bytes]]) -> None:
+        """
+        Stores borders of indexed relations.
+
+        Args:
+            borders (dict[int, Union[str, bytes]]): {relation id: border
+                wkt or wkb} dictionary
+        """
+        rows = []
+        for relation_id, border in borders.items():
+            geometry = load_border(border)
+            if geometry is None or geometry.is_empty:
+                continue
+            rows.append((relation_id, zlib.compress(shapely.to_wkb(geometry)),
+                         geometry.bounds))
+        now = time.time()
+        with self._lock:
+            for relation_id, data, (x1, y1, x2, y2) in rows:
+                cursor = self._connection.execute(
+                    "UPDATE relations SET border = ?, border_updated = ? "
+                    "WHERE id = ?", (data, now, relation_id))
+                if cursor.rowcount:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO borders_bbox "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (relation_id, x1, x2, y1, y2))
+            self._connection.commit()
+
+    def borders(self, relation_ids: list[int]) -> dict[int, bytes]:
+        """
+        Returns stored borders, which are not expired.
+
+        Args:
+            relation_ids (list[int]): Relations ids
+
+        Returns:
+            dict[int, bytes]: {relation id: border wkb} dictionary
+        """
+        borders = {}
+        expiry = self._expiry("overpass")
+        with self._lock:
+            for relation_id in relation_ids:
+                row = self._connection.execute(
+                    "SELECT border FROM relations WHERE id = ? AND border IS "
+                    "NOT NULL AND border_updated >= ?",
+                    (relation_id, expiry)).fetchone()
+                if row is not None:
+                    borders[relation_id] = zlib.decompress(row[0])
+        return borders
+
+    def stored_borders(self, relation_ids: list[int]) -> set[int]:
+        """
+        Returns ids of relations, which borders are stored and not
+        expired.
+
+        Args:
+            relation_ids (list[int]): Relations ids
+
+        Returns:
+            set[int]: Ids of relations with stored borders
+        """
+        stored = set()
+        expiry = self._expiry("overpass")
+        with self._lock:
+            for relation_id in relation_ids:
+                row = self._connection.execute(
+                    "SELECT 1 FROM relations WHERE id = ? AND border IS "
+                    "NOT NULL AND border_updated >= ?",
+                    (relation_id, expiry)).fetchone()
+                if row is not None:
+                    stored.add(relation_id)
+        return stored
+
+    def _searched(self, parent: int, level: Union[int, None],
+                  expiry: float) -> bool:
+        """
+        Checks if relations of the level were searched in the parent
+        after the expiry time.
+        """
+        levels = (ALL_LEVELS,) if level is None else (ALL_LEVELS, level)
+        return self._connection.execute(
+            "SELECT 1 FROM searched_levels WHERE parent = ? AND admin_level "
+            f"IN ({', '.join('?' * len(levels))}) AND updated >= ?",
+            (parent, *levels, expiry)).fetchone() is not None
+
+    def _within(self, area: int, ancestor: int, levels: list[int],
+                expiry: float) -> Union[list[tuple], None]:
+        """
+        Finds relations of the ancestor search lying in the area. Candidates
+        are picked by the R*Tree and checked with their borders, all of
+        them have to be known.
+
+        Args:
+            area (int): Relation id of the search object
+            ancestor (int): Relation id of the search object ancestor
+            levels (list[int]): Administrative levels
+            expiry (float): Time, borders updated before which are expired
+
+        Returns:
+            Union[list[tuple], None]: (id, tags) rows or None
+        """
+        placeholders = ", ".join("?" * len(levels))
+        missing = self._connection.execute(
+            "SELECT COUNT(*) FROM parents p JOIN relations r ON r.id = "
+            f"p.child WHERE p.parent = ? AND r.admin_level IN ({placeholders})"
+            " AND (r.border IS NULL OR r.border_updated < ?)",
+            (ancestor, *levels, expiry)).fetchone()[0]
+        row = self._connection.execute(
+            "SELECT border FROM relations WHERE id = ? AND border IS NOT NULL "
+            "AND border_updated >= ?", (area, expiry)).fetchone()
+        bbox = self._connection.execute(
+            "SELECT min_lon, max_lon, min_lat, max_lat FROM borders_bbox "
+            "WHERE id = ?", (area,)).fetchone()
+        if missing or row is None or bbox is None:
+            return None
+        candidates = self._connection.execute(
+            "SELECT r.id, r.tags, r.border FROM borders_bbox b "
+            "JOIN parents p ON p.child = b.id JOIN relations r ON r.id = b.id "
+            "WHERE b.min_lon >= ? AND b.max_lon <= ? AND b.min_lat >= ? AND "
+            "b.max_lat <= ? AND p.parent = ? AND r.admin_level IN "
+            f"({placeholders}) AND r.id != ?",
+            (*bbox, ancestor, *levels, area)).fetchall()
+        area_geometry = shapely.from_wkb(zlib.decompress(row[0]))
+        points = shapely.point_on_surface(shapely.from_wkb(
+            [zlib.decompress(border) for _, _, border in candidates]))
+        inside = shapely.contains(area_geometry, points)
+        return [(relation_id, tags) for (relation_id, tags, _), found
+                in zip(candidates, inside.tolist()) if found]
+
+    def children(self, area: int,
+                 level: Union[int, None] = None) -> Union[list[dict], None]:
+        """
+        Returns indexed relations of the level found in the search object.
+        Relations of an object searched before are returned as they were
+        found. Otherwise relations of a searched object containing the area
+        are filtered by their borders. Expired searches and borders are
+        not used.
+
+        Args:
+            area (int): Relation id of the search object
+            level (Union[int, None], optional): Administrative level.
+                Defaults to None (all levels 3-10).
+
+        Returns:
+            Union[list[dict], None]: Overpass relations json or None if
+                relations of the level are not indexed
+        """
+        levels = list(REGION_LEVELS) if level is None else [level]
+        placeholders = ", ".join("?" * len(levels))
+        expiry = self._expiry("overpass")
+        with self._lock:
+            if self._searched(area, level, expiry):
+                rows = self._connection.execute(
+                    "SELECT r.id, r.tags FROM parents p JOIN relations r ON "
+                    "r.id = p.child WHERE p.parent = ? AND r.admin_level IN "
+                    f"({placeholders}) ORDER BY r.id",
+                    (area, *levels)).fetchall()
+            else:
+                rows = None
+                ancestors = self._connection.execute(
+                    "SELECT parent FROM parents WHERE child = ?",
+                    (area,)).fetchall()
+                for (ancestor,) in ancestors:
+                    if self._searched(ancestor, level, expiry):
+                        rows = self._within(area, ancestor, levels, expiry)
+                        if rows is not None:
+                            break
+        if rows is None:
+            return None
+        return [{"type": "relation", "id": relation_id,
+                 "tags": json.loads(tags)} for relation_id, tags in rows]
+
+    def close(self) -> None:
+        """Closes index database.
+        """
+        with self._lock:
+            self._connection.close()
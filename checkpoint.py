@@ -0,0 +1,239 @@
+import json
+import os
+import re
+import time
+import numpy as np
+from typing import Any, Iterable, Union
+from tempdata import TempData
+
+
+class CrawlJournal():
+    """
+    Append-only JSONL journal of completed regions of a single search
+    object. Each line keeps region borders (as exported) and points, so
+    an interrupted crawl can be resumed: completed regions are written to
+    exports from the journal without any request. Incremental crawls
+    ('incremental' setting) keep the journal along with the OSM data
+    timestamp, so the next crawl requests only regions changed since then.
+    Journal is written only by crawls, which need it (see 'is_needed').
+    """
+    # Seconds between journal syncs to disk, later records are lost by
+    # crash and their regions are crawled again
+    SYNC_INTERVAL = 5.0
+
+    def __init__(self, Tmp: TempData, obj_name: str) -> None:
+        """
+        Opens journal of the search object. Previous journal is loaded if
+        resume or incremental mode is on and it was written with the same
+        settings, otherwise it is replaced by a new one.
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+            obj_name (str): Search object name
+        """
+        self.Tmp = Tmp
+        self.synced = time.monotonic()
+        state_dir = os.path.join(Tmp.export_dir, ".state")
+        Tmp.check_folder_existance(state_dir)
+        file_name = re.sub(r'[\\/:*?"<>|]', "_", obj_name)
+        self.path = os.path.join(state_dir, f"{file_name}.jsonl")
+        self.settings = self.settings_signature(obj_name)
+        self.completed: dict[int, dict] = {}
+        # OSM data timestamp of the previous complete crawl
+        self.crawled: Union[str, None] = None
+        # Timestamp of the current crawl, OSM data timestamp if known
+        self.timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        # Regions of the current crawl, kept by incremental journal
+        self.kept: set[int] = set()
+        if (Tmp.resume or Tmp.incremental) and os.path.exists(self.path):
+            self.load()
+        if self.completed and self.crawled is not None:
+            self.Tmp.logger_object.info(
+                f"Updating {obj_name} crawled at {self.crawled}: "
+                f"{len(self.completed)} regions in the journal")
+        elif self.completed:
+            self.Tmp.logger_object.info(
+                f"Resuming {obj_name}: {len(self.completed)} regions "
+                "already completed")
+        # Journal is rewritten to drop a line possibly truncated by crash
+        self.rewrite(self.crawled, self.completed.values())
+
+    @staticmethod
+    def is_needed(Tmp: TempData) -> bool:
+        """
+        Checks if the crawl keeps journal: resumable crawls ('resumable'
+        setting), resumed and incremental ones.
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+
+        Returns:
+            bool: Journal has to be written
+        """
+        return Tmp.resumable or Tmp.resume or Tmp.incremental
+
+    def settings_signature(self, obj_name: str) -> dict[str, Any]:
+        """
+        Collects settings, which affect journal records content.
+
+        Args:
+            obj_name (str): Search object name
+
+        Returns:
+            dict[str, Any]: Settings dictionary
+        """
+        return {
+            "obj_name": obj_name,
+            "search_type": self.Tmp.search_type,
+            "objects_language": self.Tmp.objects_language,
+            "export_languages": self.Tmp.export_languages,
+            "search_borders": self.Tmp.search_borders,
+            "search_locations": self.Tmp.search_locations,
+            "search_places_choice": self.Tmp.search_places_choice,
+            "simplify": self.Tmp.simplify,
+            "simplify_tolerance": self.Tmp.simplify_tolerance,
+            "simplify_tolerance_by_level": {
+                str(k): v
+                for k, v in self.Tmp.simplify_tolerance_by_level.items()},
+            "coordinates_precision": self.Tmp.coordinates_precision,
+            "export_holes": self.Tmp.export_holes}
+
+    def load(self) -> None:
+        """
+        Loads completed regions from the journal. Journal written with
+        other settings is ignored, as well as a truncated last line.
+        """
+        with open(self.path, encoding="utf-8") as file:
+            for i, line in enumerate(file):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if i == 0:
+                    if record.get("settings") != self.settings:
+                        self.Tmp.logger_object.warning(
+                            "Journal settings differ, starting over")
+                        return
+                    self.crawled = record.get("crawled")
+                    if self.crawled is None and not self.Tmp.resume:
+                        # Incremental crawl was never completed
+                        return
+                    continue
+                self.completed[record["id"]] = record
+
+    def rewrite(self, crawled: Union[str, None],
+                records: Iterable[dict]) -> None:
+        """
+        Writes the journal anew.
+
+        Args:
+            crawled (Union[str, None]): OSM data timestamp of the last
+                complete crawl
+            records (Iterable[dict]): Regions records
+        """
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.write({"settings": self.settings, "crawled": crawled},
+                   sync=False)
+        for record in records:
+            self.write(record, sync=False)
+        self.write_sync()
+
+    def write(self, record: dict, sync: bool = True) -> None:
+        """
+        Appends record to the journal.
+
+        Args:
+            record (dict): Journal record
+            sync (bool, optional): Flush journal to disk. Defaults to True.
+        """
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if sync:
+            self.write_sync()
+
+    def write_sync(self) -> None:
+        """Flushes journal to disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.synced = time.monotonic()
+
+    def get(self, region_id: int) -> Union[dict, None]:
+        """
+        Returns completed region record.
+
+        Args:
+            region_id (int): Region relation id
+
+        Returns:
+            Union[dict, None]: Region record or None if not completed
+        """
+        return self.completed.get(region_id)
+
+    def keep(self, region_id: int) -> None:
+        """
+        Marks completed region as exported by the current crawl.
+
+        Args:
+            region_id (int): Region relation id
+        """
+        self.kept.add(region_id)
+
+    def drop(self, region_ids: Iterable[int]) -> None:
+        """
+        Forgets completed regions, so they are crawled again.
+
+        Args:
+            region_ids (Iterable[int]): Regions relations ids
+        """
+        for region_id in region_ids:
+            self.completed.pop(region_id, None)
+
+    def record_region(self, region_id: int, name: str,
+                      borders: Union[dict, None],
+                      points: Union[list[dict], None]) -> None:
+        """
+        Records completed region.
+
+        Args:
+            region_id (int): Region relation id
+            name (str): Region name
+            borders (Union[dict, None]): Exported region borders
+            points (Union[list[dict], None]): Exported region points rows
+        """
+        if borders is not None:
+            borders = {
+                "multi": borders["multi"],
+                "polygons": [
+                    [np.asarray(outer).tolist(),
+                     [np.asarray(ring).tolist() for ring in inner]]
+                    for outer, inner in borders["polygons"]],
+                "admin_level": borders.get("admin_level")}
+        record = {"id": region_id, "name": name, "borders": borders,
+                  "points": points}
+        self.write(record, sync=time.monotonic() - self.synced >=
+                   self.SYNC_INTERVAL)
+        if self.Tmp.incremental:
+            self.completed[region_id] = record
+            self.keep(region_id)
+
+    def close(self) -> None:
+        """Syncs and closes journal file.
+        """
+        if not self._file.closed:
+            self.write_sync()
+            self._file.close()
+
+    def finish(self) -> None:
+        """
+        Removes journal of the successfully exported search object.
+        Incremental journal is rewritten instead with regions of the
+        current crawl and its timestamp.
+        """
+        self.close()
+        if self.Tmp.incremental:
+            self.rewrite(self.timestamp, [
+                record for region_id, record in self.completed.items()
+                if region_id in self.kept])
+            self.close()
+        elif os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,228 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Sequence, Union
+from logger import flush_logging
+from tempdata import TempData
+
+# Exit codes
+EXIT_OK = 0
+EXIT_PARTIAL = 1  # some of the jobs or search objects failed
+EXIT_USAGE = 2  # wrong arguments or configuration
+EXIT_FAILED = 3  # all jobs failed
+
+
+def parse_overrides(items: Sequence[str]) -> dict[str, str]:
+    """
+    Parses '--set' arguments.
+
+    Args:
+        items (Sequence[str]): "[Section.]key=value" strings
+
+    Raises:
+        ValueError: Argument without '='
+
+    Returns:
+        dict[str, str]: {"[Section.]key": value}
+    """
+    overrides = {}
+    for item in items:
+        if "=" not in item:
+            raise ValueError(f"Expected [Section.]key=value, got '{item}'")
+        key, value = item.split("=", 1)
+        overrides[key.strip()] = value.strip()
+    return overrides
+
+
+def read_jobs_file(file_path: str) -> list[dict[str, Any]]:
+    """
+    Reads jobs file. Each not empty line is a job: either a search line
+    (';'-separated objects, as in GUI) or a JSON object with "search" and
+    optional "set" ({"[Section.]key": value}) and "output_dir" keys.
+    Lines starting with '#' are ignored.
+
+    Args:
+        file_path (str): Jobs file path
+
+    Returns:
+        list[dict[str, Any]]: Jobs
+    """
+    jobs = []
+    with open(file_path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                jobs.append(json.loads(line))
+            else:
+                jobs.append({"search": line})
+    return jobs
+
+
+def run_job(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    Crawls single job in the current process.
+
+    Args:
+        job (dict[str, Any]): Job with "search", "set", "config",
+            "output_dir" and "resume" keys
+
+    Returns:
+        dict[str, Any]: Job summary
+    """
+    from earth_crawler import EarthCrawler
+
+    summary: dict[str, Any] = {
+        "search": job["search"], "ok": False, "regions": 0, "points": 0,
+        "failed_objects": [], "seconds": 0.0, "error": None, "metrics": None}
+    start = time.perf_counter()
+    try:
+        Tmp = TempData(config_file=job["config"], overrides=job["set"])
+        Tmp.search_line = job["search"]
+        Tmp.export_dir = job["output_dir"]
+        Tmp.check_folder_existance(Tmp.export_dir)
+        Tmp.resume = job["resume"]
+        Crawler = EarthCrawler(Tmp)
+        Crawler.request_and_proccess_data()
+        summary.update(
+            ok=not Tmp.failed_objects, regions=Tmp.regions_done,
+            points=Tmp.points_done, failed_objects=Tmp.failed_objects,
+            metrics=Crawler.metrics.summary())
+    except Exception as error:
+        summary["error"] = f"{type(error).__name__}: {error}"
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    # Pool workers exit without writing queued log records
+    flush_logging()
+    return summary
+
+
+def crawl(args: argparse.Namespace) -> int:
+    """
+    Runs 'crawl' command: jobs are crawled in a process pool sharing
+    endpoints rate limits and responses cache.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        int: Exit code
+    """
+    try:
+        overrides = parse_overrides(args.set)
+        jobs = [{"search": search} for search in args.search]
+        if args.jobs_file is not None:
+            jobs += read_jobs_file(args.jobs_file)
+        # Configuration is validated before any job is started
+        Tmp = TempData(config_file=args.config, overrides=overrides)
+        for job in jobs:
+            job["set"] = {**overrides, **job.get("set", {})}
+            job["config"] = args.config
+            job["output_dir"] = job.get("output_dir", args.output_dir)
+            # '--resume' may be given before or after the command
+            job["resume"] = args.resume or args.resume_jobs
+            if job["set"] != overrides:
+                TempData(config_file=args.config, overrides=job["set"])
+    except (OSError, KeyError, ValueError) as error:
+        print(f"earth_crawler: error: {error}", file=sys.stderr)
+        return EXIT_USAGE
+    if not jobs:
+        print("earth_crawler: error: nothing to crawl", file=sys.stderr)
+        return EXIT_USAGE
+
+    start = time.perf_counter()
+    workers = min(max(1, args.workers), len(jobs))
+    if workers == 1:
+        results = [run_job(job) for job in jobs]
+    else:
+        from osm_api import SharedTokenBucket, use_shared_buckets
+
+        buckets = {"nominatim": SharedTokenBucket(Tmp.nominatim_rate),
+                   "overpass": SharedTokenBucket(Tmp.overpass_rate)}
+        # Forked workers get empty log queues
+        flush_logging()
+        with ProcessPoolExecutor(
+                workers, initializer=use_shared_buckets,
+                initargs=(buckets,)) as pool:
+            results = list(pool.map(run_job, jobs))
+
+    failed = sum(not result["ok"] for result in results)
+    summary = {
+        "jobs": results,
+        "total": {"jobs": len(results), "failed": failed,
+                  "regions": sum(result["regions"] for result in results),
+                  "points": sum(result["points"] for result in results),
+                  "seconds": round(time.perf_counter() - start, 3)}}
+    text = json.dumps(summary, ensure_ascii=False)
+    if args.summary == "-":
+        print(text)
+    else:
+        with open(args.summary, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    if failed == 0:
+        return EXIT_OK
+    return EXIT_FAILED if failed == len(results) else EXIT_PARTIAL
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Creates command line arguments parser.
+
+    Returns:
+        argparse.ArgumentParser: Arguments parser
+    """
+    parser = argparse.ArgumentParser(
+        prog="earth_crawler", description="Earth Crawler script mode")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="resume interrupted crawl from its journal")
+    commands = parser.add_subparsers(dest="command")
+    crawl_parser = commands.add_parser(
+        "crawl", help="crawl search objects without GUI",
+        description="Crawl search objects without GUI. Every SEARCH "
+        "argument or jobs file line is a separate job.")
+    crawl_parser.add_argument(
+        "search", nargs="*",
+        help="search line: ';'-separated objects, as in GUI")
+    crawl_parser.add_argument(
+        "--config", default="config.ini",
+        help="configuration file (default: %(default)s)")
+    crawl_parser.add_argument(
+        "--set", action="append", default=[], metavar="[SECTION.]KEY=VALUE",
+        help="override configuration value, may be repeated")
+    crawl_parser.add_argument(
+        "-o", "--output-dir", default=".//export//",
+        help="exports directory (default: %(default)s)")
+    crawl_parser.add_argument(
+        "-f", "--jobs-file",
+        help="file with one job per line: search line or JSON object "
+        'with "search", "set" and "output_dir" keys')
+    crawl_parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="number of jobs crawled in parallel (default: %(default)s)")
+    crawl_parser.add_argument(
+        "--resume", action="store_true", dest="resume_jobs",
+        help="resume interrupted jobs from their journals")
+    crawl_parser.add_argument(
+        "--summary", default="-",
+        help="JSON summary file, '-' for stdout (default: %(default)s)")
+    return parser
+
+
+def main(argv: Union[Sequence[str], None] = None) -> int:
+    """Command line entry point.
+
+    Args:
+        argv (Union[Sequence[str], None], optional): Arguments. Defaults
+            to sys.argv.
+
+    Returns:
+        int: Exit code
+    """
+    args = build_parser().parse_args(argv)
+    if args.command == "crawl":
+        return crawl(args)
+    from earth_crawler import script_sequence
+    script_sequence(args.resume)
+    return EXIT_OK
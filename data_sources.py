@@ -0,0 +1,649 @@
+from __future__ import annotations
+import threading
+import numpy as np
+import shapely
+from OSMPythonTools.overpass import overpassQueryBuilder, OverpassResult
+from typing import TYPE_CHECKING, Union
+from admin_areas import AdminAreaIndex
+from boundary_index import BoundaryIndex
+from osm_pbf import OSMExtract, assemble_multipolygon
+# imports for types
+from OSMPythonTools.element import Element as OSMElement
+
+if TYPE_CHECKING:
+    from earth_crawler import EarthCrawler
+
+# Overpass area ids of relations are relation ids plus this offset
+AREA_ID_OFFSET = 3600000000
+# Administrative levels of the regions search ("admin_level" 3-10)
+REGION_LEVELS = range(3, 11)
+
+
+def relation_id(area_id: Union[str, int]) -> int:
+    """
+    Converts Nominatim id ("r123") or Overpass area id to relation id.
+
+    Args:
+        area_id (Union[str, int]): Nominatim or Overpass area id
+
+    Returns:
+        int: Relation id
+    """
+    if isinstance(area_id, str):
+        return int(area_id[1:])
+    return area_id - AREA_ID_OFFSET
+
+
+def osm_timestamp(result: OverpassResult) -> Union[str, None]:
+    """
+    Returns timestamp of OSM data the Overpass result was made of.
+
+    Args:
+        result (OverpassResult): Overpass result
+
+    Returns:
+        Union[str, None]: Timestamp ("2024-01-01T00:00:00Z"), None if the
+            result has no timestamp
+    """
+    return (result.toJSON().get("osm3s") or {}).get("timestamp_osm_base")
+
+
+def relation_border(element: dict) -> Union[bytes, None]:
+    """
+    Assembles relation border from geometry of its member ways (Overpass
+    'out geom'). Ways with "inner" role are holes, ways with any other
+    role are outer rings.
+
+    Args:
+        element (dict): Overpass relation json
+
+    Returns:
+        Union[bytes, None]: Border wkb, None if member ways do not form
+            any closed ring
+    """
+    ways: dict[str, list[list[tuple[float, float]]]] = {
+        "outer": [], "inner": []}
+    for member in element.get("members", []):
+        points = [(p["lon"], p["lat"]) for p in member.get("geometry") or []
+                  if p is not None]
+        if member.get("type") == "way" and len(points) > 1:
+            role = "inner" if member.get("role") == "inner" else "outer"
+            ways[role].append(points)
+    lines = {}
+    for role, coords in ways.items():
+        if coords:
+            lines[role] = list(shapely.linestrings(
+                np.concatenate(coords), indices=np.repeat(
+                    np.arange(len(coords)), [len(c) for c in coords])))
+        else:
+            lines[role] = []
+    geometry = assemble_multipolygon(lines["outer"], lines["inner"])
+    return shapely.to_wkb(geometry) if geometry is not None else None
+
+
+class DataSource():
+    """
+    Source of OSM data used by 'EarthCrawler': search objects,
+    administrative relations, their borders and place nodes. Results
+    have the form of Nominatim and Overpass responses.
+    """
+    def __init__(self, Crawler: EarthCrawler) -> None:
+        """
+        Args:
+            Crawler (EarthCrawler): Crawler instance, which settings are
+                used
+        """
+        self.Crawler = Crawler
+        self.Tmp = Crawler.Tmp
+
+    def search(self, single_obj_req: tuple[str, int]) -> list[dict]:
+        """
+        Searches object in chosen (in Tmp parameters) mode: World,
+        Country or State.
+
+        Args:
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+
+        Returns:
+            list[dict]: Nominatim search results json
+        """
+        raise NotImplementedError
+
+    def admin_relations(self, area_id: str,
+                        level: Union[int, None] = None) -> OverpassResult:
+        """
+        Finds administrative relations inside the search object.
+
+        Args:
+            area_id (str): Nominatim id of the search object
+            level (Union[int, None], optional): Administrative level.
+                Defaults to None (all levels 3-10, tags only).
+
+        Returns:
+            OverpassResult: Found relations
+        """
+        raise NotImplementedError
+
+    def borders(self, relation_ids: list[int]) -> dict[
+            int, Union[str, bytes]]:
+        """
+        Loads borders of administrative relations.
+
+        Args:
+            relation_ids (list[int]): Relations ids
+
+        Returns:
+            dict[int, Union[str, bytes]]: {relation id: border wkt or wkb}
+                dictionary
+        """
+        raise NotImplementedError
+
+    def prefetch_borders(self, relation_ids: list[int]) -> None:
+        """
+        Requests borders of relations exported next at once, so later
+        'borders' calls need no requests. Sources requesting borders one
+        by one ignore it.
+
+        Args:
+            relation_ids (list[int]): Relations ids
+        """
+
+    def places(self, area_id: int) -> OverpassResult:
+        """
+        Finds chosen place nodes of the region ('AddressResolver.split_result'
+        format).
+
+        Args:
+            area_id (int): Overpass area id of the region
+
+        Returns:
+            OverpassResult: Place nodes
+        """
+        raise NotImplementedError
+
+    def lookup_addresses(self, nodes: list[OSMElement]) -> dict[int, dict]:
+        """
+        Looks nodes addresses up.
+
+        Args:
+            nodes (list[OSMElement]): Nodes to look up
+
+        Returns:
+            dict[int, dict]: {node id: Nominatim address} dictionary
+        """
+        raise NotImplementedError
+
+    def changes(self, relation_ids: list[int],
+                since: str) -> Union[dict, None]:
+        """
+        Finds regions and place nodes changed since the previous crawl.
+
+        Args:
+            relation_ids (list[int]): Regions relations ids
+            since (str): Timestamp of the previous crawl
+
+        Returns:
+            Union[dict, None]: {"regions": changed regions ids, "nodes":
+                changed place nodes ids, "places": ids of all place nodes
+                of the regions (None if not searched), "timestamp": OSM
+                data timestamp or None} dictionary, None if the source
+                doesn't track changes
+        """
+        return None
+
+    def close(self) -> None:
+        """Releases resources of the source, when the crawl is finished.
+        """
+
+
+class OnlineSource(DataSource):
+    """
+    Data requested from Nominatim and Overpass APIs of the crawler.
+    Borders are Nominatim wkt, or are assembled from member ways if
+    'overpass_borders' is set: regions of a single level are requested
+    with their geometry ('out geom'), other relations are requested by
+    ids in batches.
+    """
+    # Nominatim lookup endpoint accepts up to 50 'osm_ids' per request
+    LOOKUP_BATCH_SIZE = 50
+
+    def __init__(self, Crawler: EarthCrawler) -> None:
+        super().__init__(Crawler)
+        # {relation id: border wkb} assembled from the regions queries
+        self.assembled: dict[int, bytes] = {}
+
+    def assemble(self, result: OverpassResult) -> OverpassResult:
+        """
+        Assembles borders of relations returned with their geometry and
+        strips the geometry off the result.
+
+        Args:
+            result (OverpassResult): Relations with member ways geometry
+
+        Returns:
+            OverpassResult: Relations with tags only
+        """
+        elements = []
+        for element in result.toJSON()["elements"]:
+            if element.get("type") == "relation":
+                border = relation_border(element)
+                if border is not None:
+                    self.assembled[element["id"]] = border
+                element = {key: value for key, value in element.items()
+                           if key not in ("members", "bounds")}
+            elements.append(element)
+        return OverpassResult({**result.toJSON(), "elements": elements},
+                              result.queryString(), {})
+
+    def search(self, single_obj_req: tuple[str, int]) -> list[dict]:
+        if self.Tmp.search_type == "world" or self.Tmp.search_type == "":
+            osm_data = self.Crawler.nominatim.query(
+                single_obj_req[0], params={
+                    'accept-language': f'{self.Tmp.objects_language}',
+                    'addressdetails': 1, 'namedetails': 1})
+        else:
+            osm_data = self.Crawler.nominatim.query("", params={
+                'accept-language': f'{self.Tmp.objects_language}',
+                'addressdetails': 1, 'namedetails': 1,
+                f'{self.Tmp.search_type}': f'{single_obj_req[0]}'})
+        self.Tmp.logger_object.debug(
+            "Nominatim search: %s", osm_data.queryString())
+        return osm_data.toJSON()
+
+    def admin_relations(self, area_id: str,
+                        level: Union[int, None] = None) -> OverpassResult:
+        geometry = level is not None and self.Tmp.search_borders and \
+            self.Tmp.overpass_borders
+        if level is None:
+            query = overpassQueryBuilder(
+                area=area_id, elementType='relation',
+                selector=['"boundary"="administrative"',
+                          '"admin_level"~"^([3-9]|10)$"'], out='tags')
+        else:
+            query = overpassQueryBuilder(
+                area=area_id, elementType='relation',
+                selector=['"boundary"="administrative"',
+                          f'"admin_level"="{level}"'],
+                out='geom' if geometry else 'body')
+        self.Tmp.logger_object.debug(query)
+        result = self.Crawler.overpass.query(query)
+        if geometry:
+            result = self.assemble(result)
+        return result
+
+    def borders(self, relation_ids: list[int]) -> dict[
+            int, Union[str, bytes]]:
+        if self.Tmp.overpass_borders:
+            return self.overpass_borders(relation_ids)
+        borders = {}
+        for start in range(0, len(relation_ids), self.LOOKUP_BATCH_SIZE):
+            batch = relation_ids[start:start + self.LOOKUP_BATCH_SIZE]
+            results = self.Crawler.nominatim.query(
+                *[f"relation/{i}" for i in batch], lookup=True, wkt=True,
+                params={'accept-language': f'{self.Tmp.objects_language}'})
+            for res in results.toJSON():
+                if res.get("osm_id") in batch and "geotext" in res:
+                    borders[res["osm_id"]] = res["geotext"]
+        return borders
+
+    def prefetch_borders(self, relation_ids: list[int]) -> None:
+        """
+        Requests geometry of relations not assembled yet in batches, if
+        'overpass_borders' is set. Assembled borders are kept until they
+        are requested.
+        """
+        if not self.Tmp.overpass_borders:
+            return
+        missing = [i for i in relation_ids if i not in self.assembled]
+        for start in range(0, len(missing), self.LOOKUP_BATCH_SIZE):
+            batch = missing[start:start + self.LOOKUP_BATCH_SIZE]
+            query = f"relation(id:{','.join(map(str, batch))}); out geom;"
+            self.Tmp.logger_object.debug(query)
+            self.assemble(self.Crawler.overpass.query(
+                query, timeout=self.Tmp.overpass_timeout))
+
+    def overpass_borders(self, relation_ids: list[int]) -> dict[int, bytes]:
+        """
+        Returns borders assembled from the regions query or prefetched,
+        requesting geometry of other relations.
+
+        Args:
+            relation_ids (list[int]): Relations ids
+
+        Returns:
+            dict[int, bytes]: {relation id: border wkb} dictionary
+        """
+        self.prefetch_borders(relation_ids)
+        return {i: self.assembled.pop(i) for i in relation_ids
+                if i in self.assembled}
+
+    def places(self, area_id: int) -> OverpassResult:
+        return self.Crawler.overpass.query(
+            self.Crawler.address_resolver.points_query(area_id),
+            timeout=self.Tmp.overpass_timeout)
+
+    def changes(self, relation_ids: list[int],
+                since: str) -> Union[dict, None]:
+        """
+        Regions, their member ways or the ways nodes newer than the
+        previous crawl change borders, newer place nodes change points of
+        regions they lie in and lay in before. All places ids are returned
+        to find deleted ones.
+        """
+        newer = f'(newer:"{since}")'
+        query = f"relation(id:{','.join(map(str, relation_ids))})->.regions; "
+        changed = f"relation.regions{newer};"
+        if self.Tmp.search_borders:
+            query += (
+                f"way(r.regions)->.ways; node(w.ways){newer}->.moved; "
+                f"(way.ways{newer}; way.ways(bn.moved);)->.changed; ")
+            changed += " relation.regions(bw.changed);"
+        query += f"({changed}); out ids;"
+        if self.Tmp.search_locations:
+            areas = ",".join(str(AREA_ID_OFFSET + i) for i in relation_ids)
+            query += (
+                f" area(id:{areas})->.a1; "
+                f"({self.Crawler.address_resolver.place_selectors()})->.pts;"
+                f" .pts out ids; node.pts{newer}->.new; .new out meta; "
+                f".new is_in->.i; area.i(id:{areas}); out ids;")
+        self.Tmp.logger_object.debug(query)
+        result = self.Crawler.overpass.query(
+            query, timeout=self.Tmp.overpass_timeout)
+        regions, nodes, places = set(), set(), set()
+        for element in result.toJSON()["elements"]:
+            if element["type"] == "relation":
+                regions.add(element["id"])
+            elif element["type"] == "area":
+                regions.add(relation_id(element["id"]))
+            elif element["type"] == "node":
+                places.add(element["id"])
+                # Only changed nodes are returned with metadata
+                if "timestamp" in element:
+                    nodes.add(element["id"])
+        return {"regions": regions, "nodes": nodes,
+                "places": places if self.Tmp.search_locations else None,
+                "timestamp": osm_timestamp(result)}
+
+    def lookup_addresses(self, nodes: list[OSMElement]) -> dict[int, dict]:
+        addresses = {}
+        for start in range(0, len(nodes), self.LOOKUP_BATCH_SIZE):
+            batch = nodes[start:start + self.LOOKUP_BATCH_SIZE]
+            results = self.Crawler.nominatim.query(
+                *[f"{p.type()}/{p.id()}" for p in batch],
+                zoom=10, lookup=True,
+                params={'accept-language': f'{self.Tmp.objects_language}'})
+            for res in results:
+                if res.id() is not None and res.address() is not None:
+                    addresses[res.id()] = res.address()
+        return addresses
+
+
+class PBFSource(DataSource):
+    """
+    Data of an offline OSM PBF extract ('pbf_file' setting). The extract
+    is read on the first request and shared by crawlers of the same file.
+    Spatial queries are answered with shapely vectorized predicates and
+    addresses with 'AdminAreaIndex' of the extract boundaries, so the
+    crawl makes no network requests.
+    """
+    _extracts: dict[str, OSMExtract] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, Crawler: EarthCrawler, path: str) -> None:
+        """
+        Args:
+            Crawler (EarthCrawler): Crawler instance, which settings are
+                used
+            path (str): .osm.pbf file path
+        """
+        super().__init__(Crawler)
+        self.path = path
+        self._index: Union[AdminAreaIndex, None] = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def extract(self) -> OSMExtract:
+        """Extract data, read on the first access.
+        """
+        with self._lock:
+            if self.path not in self._extracts:
+                self.Tmp.logger_object.info(f"Reading {self.path}")
+                extract = OSMExtract(self.path)
+                self.Tmp.logger_object.info(
+                    f"{len(extract.geometries)} administrative areas and "
+                    f"{len(extract.place_ids)} places read")
+                self._extracts[self.path] = extract
+            return self._extracts[self.path]
+
+    @property
+    def index(self) -> AdminAreaIndex:
+        """Index of the extract areas of address levels.
+        """
+        with self._index_lock:
+            if self._index is None:
+                keys = self.Crawler.address_resolver.ADMIN_LEVEL_KEYS
+                index = AdminAreaIndex()
+                for rel_id, geometry in self.extract.geometries.items():
+                    tags = self.extract.relations[rel_id]
+                    level = int(tags["admin_level"]) \
+                        if tags["admin_level"].isdigit() else None
+                    if level in keys and "name" in tags:
+                        index.add(geometry, keys[level],
+                                  self.Crawler.choose_name_from_tag(tags),
+                                  self.Crawler.translated_names(tags))
+                self._index = index
+            return self._index
+
+    def relation_json(self, rel_id: int) -> dict:
+        """Creates Overpass json of the extract relation.
+        """
+        return {"type": "relation", "id": rel_id,
+                "tags": self.extract.relations[rel_id]}
+
+    def search(self, single_obj_req: tuple[str, int]) -> list[dict]:
+        name = single_obj_req[0].strip().casefold()
+        found = []
+        for rel_id, tags in self.extract.relations.items():
+            names = {v.casefold() for k, v in tags.items()
+                     if k == "name" or k.startswith("name:")}
+            if name in names and rel_id in self.extract.geometries:
+                found.append((int(tags["admin_level"])
+                              if tags["admin_level"].isdigit() else 99,
+                              rel_id))
+        levels = {key: level for level, key in
+                  self.Crawler.address_resolver.ADMIN_LEVEL_KEYS.items()}
+        results = []
+        for level, rel_id in sorted(found):
+            tags = self.extract.relations[rel_id]
+            point = shapely.point_on_surface(self.extract.geometries[rel_id])
+            # Lower levels areas contain only a part of the object
+            address = {key: name for key, name in self.index.assign(
+                [point.x], [point.y])[0].items() if levels[key] <= level}
+            results.append({
+                "osm_type": "relation", "osm_id": rel_id,
+                "lat": str(point.y), "lon": str(point.x),
+                "display_name": ", ".join(dict.fromkeys(
+                    [self.Crawler.choose_name_from_tag(tags),
+                     *reversed(address.values())])),
+                "class": "boundary", "type": "administrative",
+                "address": address})
+        return results
+
+    def admin_relations(self, area_id: str,
+                        level: Union[int, None] = None) -> OverpassResult:
+        area = self.extract.geometries.get(relation_id(area_id))
+        elements = []
+        if area is not None:
+            levels = set(map(str, REGION_LEVELS if level is None
+                             else [level]))
+            candidates = [
+                rel_id for rel_id in self.extract.geometries
+                if self.extract.relations[rel_id]["admin_level"] in levels]
+            points = shapely.point_on_surface(np.array(
+                [self.extract.geometries[i] for i in candidates],
+                dtype=object))
+            inside = shapely.contains(area, points)
+            elements = [self.relation_json(rel_id) for rel_id, found in
+                        zip(candidates, inside.tolist()) if found]
+        return OverpassResult({"elements": elements}, self.path, {})
+
+    def borders(self, relation_ids: list[int]) -> dict[int, str]:
+        return {i: self.extract.geometries[i].wkt for i in relation_ids
+                if i in self.extract.geometries}
+
+    def places(self, area_id: int) -> OverpassResult:
+        extract = self.extract
+        area = extract.geometries.get(relation_id(area_id))
+        elements = []
+        if area is not None and len(extract.place_ids):
+            chosen = np.array([tags["place"] in self.Tmp.search_places_choice
+                               for tags in extract.place_tags])
+            inside = chosen & shapely.contains_xy(
+                area, extract.place_lons, extract.place_lats)
+            elements = [
+                {"type": "node", "id": int(extract.place_ids[i]),
+                 "lat": float(extract.place_lats[i]),
+                 "lon": float(extract.place_lons[i]),
+                 "tags": extract.place_tags[i]}
+                for i in np.flatnonzero(inside).tolist()]
+        return OverpassResult({"elements": elements}, self.path, {})
+
+    def lookup_addresses(self, nodes: list[OSMElement]) -> dict[int, dict]:
+        located = self.index.assign([p.lon() for p in nodes],
+                                    [p.lat() for p in nodes])
+        addresses = {}
+        for p, address in zip(nodes, located):
+            tags = p.tags() or {}
+            if "place" in tags and "name" in tags:
+                address[tags["place"]] = \
+                    self.Crawler.choose_name_from_tag(tags)
+            addresses[p.id()] = address
+        return addresses
+
+
+class IndexedSource(DataSource):
+    """
+    Data source consulting 'BoundaryIndex' before the wrapped one. Search
+    results, administrative relations and borders it returns are added to
+    the index, so objects crawled once are crawled again (e.g. in another
+    language) without requests for regions and borders.
+    """
+    def __init__(self, Crawler: EarthCrawler, source: DataSource) -> None:
+        """
+        Args:
+            Crawler (EarthCrawler): Crawler instance, which settings are
+                used
+            source (DataSource): Source of not indexed data
+        """
+        super().__init__(Crawler)
+        self.source = source
+        self.index = BoundaryIndex(self.Tmp)
+
+    def localize(self, results: list[dict]) -> list[dict]:
+        """
+        Translates names of search results stored in another language,
+        using their 'namedetails'.
+
+        Args:
+            results (list[dict]): Nominatim search results json
+
+        Returns:
+            list[dict]: Search results json
+        """
+        localized = []
+        for res in results:
+            names = res.get("namedetails") or {}
+            if "name" in names:
+                name = self.Crawler.choose_name_from_tag(names)
+                parts = res["display_name"].split(", ")
+                address = dict(res.get("address", {}))
+                if res.get("addresstype") in address:
+                    address[res["addresstype"]] = name
+                res = {**res, "address": address,
+                       "display_name": ", ".join([name, *parts[1:]])}
+            localized.append(res)
+        return localized
+
+    def search(self, single_obj_req: tuple[str, int]) -> list[dict]:
+        key = f"{self.Tmp.search_type}|{single_obj_req[0].strip().casefold()}"
+        language_key = f"{key}|{self.Tmp.objects_language}"
+        results = self.index.search(language_key)
+        if results is None:
+            results = self.index.search(key)
+            if results is not None:
+                results = self.localize(results)
+        if results is not None:
+            self.Tmp.logger_object.info(
+                f"{single_obj_req[0]} search results loaded from index")
+            return results
+        results = self.source.search(single_obj_req)
+        if results:
+            self.index.add_search([key, language_key], results)
+        return results
+
+    def admin_relations(self, area_id: str,
+                        level: Union[int, None] = None) -> OverpassResult:
+        if not area_id.startswith("r"):
+            return self.source.admin_relations(area_id, level)
+        elements = self.index.children(relation_id(area_id), level)
+        if elements is not None:
+            self.Tmp.logger_object.info(
+                f"{len(elements)} relations of {area_id} loaded from index")
+            return OverpassResult(
+                {"elements": elements}, self.Tmp.boundary_index_file, {})
+        result = self.source.admin_relations(area_id, level)
+        self.index.add_relations(
+            relation_id(area_id), level, result.toJSON()["elements"])
+        return result
+
+    def borders(self, relation_ids: list[int]) -> dict[
+            int, Union[str, bytes]]:
+        borders: dict[int, Union[str, bytes]] = {
+            **self.index.borders(relation_ids)}
+        missing = [i for i in relation_ids if i not in borders]
+        if missing:
+            loaded = self.source.borders(missing)
+            self.index.add_borders(loaded)
+            borders.update(loaded)
+        return borders
+
+    def prefetch_borders(self, relation_ids: list[int]) -> None:
+        stored = self.index.stored_borders(relation_ids)
+        self.source.prefetch_borders(
+            [i for i in relation_ids if i not in stored])
+
+    def places(self, area_id: int) -> OverpassResult:
+        return self.source.places(area_id)
+
+    def lookup_addresses(self, nodes: list[OSMElement]) -> dict[int, dict]:
+        return self.source.lookup_addresses(nodes)
+
+    def changes(self, relation_ids: list[int],
+                since: str) -> Union[dict, None]:
+        return self.source.changes(relation_ids, since)
+
+    def close(self) -> None:
+        self.index.close()
+        self.source.close()
+
+
+def create_source(Crawler: EarthCrawler) -> DataSource:
+    """
+    Creates data source chosen in settings: PBF extract if 'pbf_file' is
+    set, otherwise online APIs, consulting boundary index if it is
+    enabled along with responses cache (except incremental crawls, which
+    need current borders).
+
+    Args:
+        Crawler (EarthCrawler): Crawler instance
+
+    Returns:
+        DataSource: Data source
+    """
+    if Crawler.Tmp.pbf_file:
+        return PBFSource(Crawler, Crawler.Tmp.pbf_file)
+    if Crawler.Tmp.use_cache and Crawler.Tmp.boundary_index and \
+            not Crawler.Tmp.incremental:
+        return IndexedSource(Crawler, OnlineSource(Crawler))
+    return OnlineSource(Crawler)
@@ -1,419 +1,927 @@
-from OSMPythonTools.nominatim import Nominatim
-from OSMPythonTools.overpass import overpassQueryBuilder, Overpass
-import simplekml
-from shapely import wkt
-import pandas as pd
-import os
-from tempdata import TempData
-# imports for types
-from shapely.geometry.polygon import Polygon
-from OSMPythonTools.element import Element as OSMElement
-from OSMPythonTools.overpass import OverpassResult
-
-
-def pause():  # !remove
-    os.system('pause')
-
-
-class EarthCrawler():
-    """
-    Uses OSM APIs (Nominatim, Overpass) to get requested regions and
-    countries borders as well as various lacalities (cities, towns, villages,
-    etc.) and export them to related formats (kml, xlsx).
-    """
-    def __init__(self, Tmp: TempData) -> None:
-        """
-        Initializes OSM APIs instances and resieves temporary data
-        class instance.
-
-        Args:
-            Tmp (TempData): Temporary data class instance
-        """
-        # Settings import
-        self.Tmp = Tmp
-
-        # Initiate search engine
-        self.nominatim = Nominatim()
-        self.overpass = Overpass()
-
-    def admin_level_try_list_creator(
-            self, target_val: int, values_list: list) -> list:
-        """
-        Creates 'try list' of administrative levels, to parse through with
-        additional user-defined value as the first element.
-
-        Args:
-            target_val (int): user-defined value
-            values_list (list): basic 'try list'
-
-        Returns:
-            list: final 'try list'
-        """
-        output_list = [target_val]
-        for i in values_list:
-            if i != target_val:
-                output_list.append(i)
-        return output_list
-
-    def configure_kml_obj(self, kml_obj: simplekml.Folder) -> simplekml.Folder:
-        """Sets kml lines color and width.
-
-        Args:
-            kml_obj (simplekml.Folder): Base kml folder object
-
-        Returns:
-            simplekml.Folder: Configured kml folder object
-        """
-        kml_obj.style.linestyle.color = simplekml.Color.hex(
-            self.Tmp.line_color[1:])
-        kml_obj.style.linestyle.width = self.Tmp.line_width
-        return kml_obj
-
-    def add_kml_object(
-            self, kml_level: simplekml.Folder, coords: list,
-            obj_name: str, obj_types: list) -> None:
-        """
-        Adds an object with the specified coordinates, name and type to
-        the specific folder.
-
-        Args:
-            kml_level (simplekml.Folder): Kml folder to add objects to
-            coords (list): Object coordinates
-            obj_name (str): Object name
-            obj_types (list): Object type: 'Polygon' or 'Line'
-        """
-        if 'Polygon' in obj_types and self.Tmp.polygons_to_lines is False:
-            kml_obj = kml_level.newpolygon(
-                name=f"{obj_name}", outerboundaryis=coords)
-            kml_obj.polystyle.fill = 0
-            self.configure_kml_obj(kml_obj)
-        if 'Line' in obj_types or self.Tmp.polygons_to_lines is True:
-            kml_obj = kml_level.newlinestring(
-                name=f"{obj_name}", coords=coords)
-            self.configure_kml_obj(kml_obj)
-
-    def choose_name_from_tag(self, tags: dict) -> str:
-        """
-        Chooses object name according to selected language. If there is
-        no such object name language in OSM data, chooses default one from
-        "name" tag.
-
-        Args:
-            tags (dict): Tags from nominatim search results
-
-        Returns:
-            str: Object name
-        """
-        cur_lang_tag = f"name:{self.Tmp.objects_language}"
-        if cur_lang_tag in tags:  # f"name:{cur_lang_tag}"
-            return tags[cur_lang_tag]
-        elif "neme:en" in tags:
-            return tags["neme:en"]
-        else:
-            return tags["name"]
-
-    def proccess_loaded_wkt(self, kml_doc: simplekml.Folder,
-                            loaded_wkt: Polygon) -> None:
-        """
-        Checks if the loaded wkt (well-known text) is polygon or multi-polygon
-        object and passes it's coordinates to 'add_kml_object' function.
-
-        Args:
-            kml_doc (simplekml.Folder):
-                Kml folder object
-            loaded_wkt (Polygon):
-                Wkt returned by Nominatim API
-        """
-        if loaded_wkt.geom_type == 'MultiPolygon':
-            polygons = list(loaded_wkt.geoms)
-            multi_poly_folder = kml_doc.newfolder(
-                name=f"{self.Tmp.current_sub_obj_name}")
-            for i, poly in enumerate(polygons):
-                coords = list(poly.exterior.coords)
-                i_obj_name = f"{self.Tmp.current_sub_obj_name}_{i+1}"
-                # if len(coords) > 5000:
-                self.add_kml_object(
-                    multi_poly_folder, coords, i_obj_name, ['Polygon'])
-        elif loaded_wkt.geom_type == 'Polygon':
-            coords = list(loaded_wkt.exterior.coords)
-            self.add_kml_object(
-                kml_doc, coords, self.Tmp.current_sub_obj_name, ['Polygon'])
-
-    def save_kml(self, obj_name: str) -> None:
-        """Saves kml file.
-
-        Args:
-            obj_name (str): Object name used in file name
-        """
-        if self.Tmp.polygons_to_lines:
-            sub_name = "(lines)"
-        else:
-            sub_name = "(polygons)"
-        kml_file_name = f"{obj_name} {sub_name}"
-        self.kml_doc.save(f".\\export\\{kml_file_name}.kml")
-        print(f"KML file saved as {kml_file_name}")
-
-    def save_excel(self, obj_name: str) -> None:
-        """Save Excel 'xlsx' file.
-
-        Args:
-            obj_name (str): Object name used in file name
-        """
-        self.excel_writer.close()
-        print(f"Excel file saved {self.Tmp.current_obj_name}.xlsx.xlsx")
-
-    def search_line_proccessing(self) -> list[tuple[str, int]]:
-        """
-        Splits string with objects to search (and their administrative levels)
-        and creates a search list of [object name (str), administrative level
-        (int)] tuples.
-
-        Returns:
-            list(tuple(str,int)): Search list of (object name (str),
-                administrative level (int)) tuples
-        """
-        # search_list = list(map(str.strip, search_line.split(';')))
-        search_list = []
-        first_split_lst = self.Tmp.search_line.split(';')
-        for loc in first_split_lst:
-            strp = loc.strip()
-            if strp != "":
-                if "=" in strp:
-                    loc_lst = strp.split('=')
-                    loc_tuple = (loc_lst[0], int(loc_lst[1]))
-                else:
-                    loc_tuple = (strp, 4)
-                search_list.append(loc_tuple)
-        return search_list
-
-    def regions_search(self, index: int, region: OSMElement,
-                       kml_doc: simplekml.Folder) -> None:
-        """Searches region polygons returned by Nominatim
-
-        Args:
-            index (int): Index used to track progress
-            region (OSMElement): Element, found by Nominatim
-            kml_doc (simplekml.Folder): Kml folder object
-        """
-        self.Tmp.current_stage = 0
-        self.Tmp.current_stage_num += 1
-        self.Tmp.current_obj = index
-        self.Tmp.current_area_obj = index
-        self.Tmp.current_area_obj_name = region.tag(
-            f'name:{self.Tmp.objects_language}')
-        self.Tmp.current_sub_obj_name = region.tag(
-            f'name:{self.Tmp.objects_language}')
-        region_data = self.nominatim.query(
-            f"{region.type()}/{region.id()}",
-            zoom=4, lookup=True, wkt=True)
-        loaded_wkt = wkt.loads(region_data.wkt())
-        if hasattr(loaded_wkt, 'geom_type'):
-            self.proccess_loaded_wkt(kml_doc, loaded_wkt)
-        else:
-            print("No attr")
-
-    def locations_search(self, index: int, region: OSMElement,
-                         kml_doc: simplekml.Folder) -> None:
-        """Searches location points returned by Nominatim
-
-        Args:
-            index (int): Index used to track progress
-            region (OSMElement): Element, found by Nominatim
-            kml_doc (simplekml.Folder): Kml folder object
-        """
-        self.Tmp.current_stage = 1
-        self.Tmp.current_stage_num += 1
-        keys_list = self.Tmp.search_places_choice + \
-            ["county", "state", "region", "country"]
-        points = self.overpass.query
-        dict_list = []
-        points_search_line = ""
-        # self.Tmp.current_obj = index
-        # self.Tmp.current_obj_name = region.tag(
-        #    f'name:{self.Tmp.objects_language}')
-        if self.Tmp.search_locations:
-            for choice in self.Tmp.search_places_choice:
-                points_search_line = f"{points_search_line} "\
-                    f"nwr[place='{choice}'](area.a1);"
-            base_req_line = f"area({region.areaId()})->.a1; "\
-                f"({points_search_line});out body;"
-        points = self.overpass.query(base_req_line, timeout=60)
-        self.Tmp.sub_obj_number = len(points.nodes())
-        for i, p in enumerate(points.nodes()):
-            print(p.lon(), p.lat())
-            n = self.nominatim.query(
-                f"{p.type()}/{p.id()}", zoom=10, lookup=True,
-                params={'accept-language': f'{self.Tmp.objects_language}'})
-            adr = n.address()
-            print(adr)
-            adr_mod = {}
-            for x in keys_list:
-                try:
-                    loc = adr[x]
-                    if x in self.Tmp.search_places_choice:
-                        adr_mod["location"] = loc
-
-                    else:
-                        adr_mod[x] = loc
-                except Exception:
-                    continue
-            adr_mod["lon"] = p.lon()
-            adr_mod["lat"] = p.lat()
-            try:
-                kml_doc.newpoint(
-                    name=adr_mod["location"], coords=[(p.lon(), p.lat())])
-            except KeyError:
-                print("No location name - Skip")
-                print("------------------")
-                continue
-            print(adr_mod["location"])
-            self.Tmp.current_obj = i
-            self.Tmp.current_sub_obj_name = adr_mod["location"]  # ! Too late
-            dict_list.append(adr_mod)
-            print("------------------")
-        if self.Tmp.export_to_excel:
-            df = pd.DataFrame(
-                dict_list, columns=["location", "county", "state", "region",
-                                    "country", "lon", "lat"])
-            df.to_excel(self.excel_writer,
-                        sheet_name=f"{self.Tmp.current_area_obj_name}")
-            print(df)
-
-    def first_nominatim_search(self, single_obj_req: tuple[str, int]) -> str:
-        """
-        Searches object with Nominatim in chosen (in Tmp parameters)
-        mode: World, Country or State to retrieve its id.
-
-        Args:
-            single_obj_req (tuple[str, int]):
-                Tuple with object name and administrative level
-
-        Returns:
-            str: Nominatim id
-        """
-        self.kml_doc = simplekml.Kml()
-        if self.Tmp.search_type == "world" or self.Tmp.search_type == "":
-            osm_data = self.nominatim.query(
-                single_obj_req[0], params={'accept-language':
-                                           f'{self.Tmp.objects_language}'})
-            # language=self.Tmp.objects_language
-        else:
-            osm_data = self.nominatim.query(
-                "", params={'accept-language': f'{self.Tmp.objects_language}',
-                            f'{self.Tmp.search_type}': f'{single_obj_req[0]}'})
-        print(dir(osm_data))
-        print(osm_data.address())  # displayName())
-        print(osm_data._queryString)
-
-        search_mode = 0
-        if search_mode == 0:
-            js = osm_data.toJSON()
-            for res in js:
-                print(res)
-                # print(len(js))
-            self.Tmp.current_search_json = js
-        return f"{js[0]['osm_type'][0]}{js[0]['osm_id']}"
-
-    def overpass_search(self, area_id: str,
-                        single_obj_req: tuple[str, int]) -> OverpassResult:
-        """
-        Tries different admin levels from 'admin_level_try_list' and returns
-        first correct Overpass result.
-
-        Args:
-            area_id (str):
-                Nominatim id from 'first_nominatim_search' result
-            single_obj_req (tuple[str, int]):
-                Tuple with object name and administrative level
-
-        Returns:
-            OverpassResult: Found Overpass regions
-        """
-        regions = self.overpass.query
-
-        admin_level_try_list = self.admin_level_try_list_creator(
-            single_obj_req[1], [4, 5, 6, 7, 8, 9, 10, 3])  # [3,4,5,6,7,8,9,10]
-
-        for i in admin_level_try_list:
-            try:
-                query = overpassQueryBuilder(
-                    area=area_id, elementType='relation',
-                    selector=['"boundary"="administrative"',
-                              f'"admin_level"="{i}"'], out='body')
-                # f"area({osm_data.areaId()})->.searchArea;
-                # (relation["boundary"="administrative"]["admin_level"="4"]
-                # (area.searchArea);); out body";
-                regions = self.overpass.query(query)
-                self.Tmp.sub_obj_number = len(regions.relations())
-                self.Tmp.current_area_obj_number = self.Tmp.sub_obj_number
-                print(query)
-                break
-            except TypeError:
-                self.Tmp.logger_object.warning(
-                    f"No administrative level {i} found")
-                continue
-        return regions
-
-    def second_nominatim_search(self,
-                                overpass_regions: OverpassResult) -> None:
-        """
-        Second Nominatim search, which using Overpass results to create
-        borders and points.
-
-        Args:
-            overpass_regions (OverpassResult): Overpass regions to proccess
-        """
-        try:
-            if self.Tmp.search_locations and self.Tmp.export_to_excel:
-                self.excel_writer = pd.ExcelWriter(
-                    f".\\export\\{self.Tmp.current_obj_name}.xlsx",
-                    engine="xlsxwriter")
-            for i, region in enumerate(overpass_regions.relations()):
-                if self.Tmp.search_borders and self.Tmp.search_locations:
-                    cur_folder = self.kml_doc.newfolder(
-                        name=self.choose_name_from_tag(region.tags()))
-                else:
-                    cur_folder = self.kml_doc
-
-                if self.Tmp.search_borders:
-                    self.regions_search(i, region, cur_folder)
-                if self.Tmp.search_locations:
-                    self.locations_search(i, region, cur_folder)
-                self.Tmp.current_stage_num = 0
-        except TypeError:
-            self.Tmp.logger_object.error(
-                    "No administrative levels found")
-            self.Tmp.current_stage_num = 0
-            self.Tmp.error_found = 1
-
-    def request_and_proccess_data(self) -> None:
-        """Gathers all 3 searches together and exports configured data.
-        """
-        search_list = self.search_line_proccessing()
-        for single_obj_req in search_list:
-            osm_area_id = self.first_nominatim_search(single_obj_req)
-            overp_regions = self.overpass_search(osm_area_id, single_obj_req)
-            self.second_nominatim_search(overp_regions)
-            if self.Tmp.error_found == 0:
-                if self.Tmp.export_to_excel:
-                    self.save_excel(single_obj_req[0])
-                if self.Tmp.export_to_kml:
-                    self.save_kml(single_obj_req[0])
-            else:
-                self.Tmp.error_found = 0
-
-
-def script_sequence() -> None:
-    """Script running without GUI.
-    """
-    Tmp = TempData()
-    try:
-        Converter = EarthCrawler(Tmp)
-        Converter.request_and_proccess_data()
-    except Exception:
-        Tmp.logger_object.exception("UncaughtException")
-        Tmp.logger_object.warning("Ending script due too uncaught exception")
-
-
-if __name__ == "__main__":
-    script_sequence()
+from __future__ import annotations
+import os
+import sys
+from typing import Callable, TYPE_CHECKING, Sequence, Union
+from tempdata import TempData
+from kml_writer import KMLStreamWriter
+from metrics import CrawlMetrics
+
+if TYPE_CHECKING:
+    from shapely.geometry.polygon import Polygon
+    from OSMPythonTools.element import Element as OSMElement
+    from OSMPythonTools.overpass import OverpassResult
+    from table_export import TableExport
+    from feature_export import FeatureExport
+    from language_exports import LanguageExports
+    from checkpoint import CrawlJournal
+
+
+def pause():  # !remove
+    os.system('pause')
+
+
+class EarthCrawler():
+    """
+    Uses OSM APIs (Nominatim, Overpass) or an offline PBF extract to get
+    requested regions and countries borders as well as various lacalities
+    (cities, towns, villages, etc.) and export them to related formats
+    (kml, xlsx).
+    """
+    def __init__(self, Tmp: TempData) -> None:
+        """
+        Initializes OSM APIs instances and resieves temporary data
+        class instance.
+
+        Args:
+            Tmp (TempData): Temporary data class instance
+        """
+        # Heavy dependencies (OSMPythonTools, shapely, numpy) are imported
+        # with the first crawler, so importing the module stays fast
+        from OSMPythonTools.cachingStrategy import CachingStrategy
+        from osm_api import create_apis
+        from osm_cache import SQLiteCache, NoCache
+        from address_resolver import AddressResolver
+        from data_sources import create_source
+        from geometry import GeometryProcessor
+
+        # Settings import
+        self.Tmp = Tmp
+
+        # Initiate responses cache and search engine
+        if self.Tmp.use_cache:
+            CachingStrategy.use(SQLiteCache, Tmp=self.Tmp)
+        else:
+            CachingStrategy.use(NoCache)
+        self.metrics = CrawlMetrics(self.Tmp)
+        self.nominatim, self.overpass = create_apis(self.Tmp, self.metrics)
+        self.address_resolver = AddressResolver(self)
+        self.source = create_source(self)
+        self.geometry = GeometryProcessor(self.Tmp)
+        # {area id: {admin level: relations}} from combined Overpass search
+        self.admin_relations: dict[str, dict[int, list[OSMElement]]] = {}
+        self.kml_doc: Union[KMLStreamWriter, None] = None
+        self.table_export: Union[TableExport, None] = None
+        self.feature_export: Union[FeatureExport, None] = None
+        self.language_exports: Union[LanguageExports, None] = None
+        self.journal: Union[CrawlJournal, None] = None
+
+    def admin_level_try_list_creator(
+            self, target_val: int, values_list: list) -> list:
+        """
+        Creates 'try list' of administrative levels, to parse through with
+        additional user-defined value as the first element.
+
+        Args:
+            target_val (int): user-defined value
+            values_list (list): basic 'try list'
+
+        Returns:
+            list: final 'try list'
+        """
+        output_list = [target_val]
+        for i in values_list:
+            if i != target_val:
+                output_list.append(i)
+        return output_list
+
+    def add_kml_object(
+            self, kml_level: KMLStreamWriter, coords: Sequence,
+            obj_name: str, obj_types: list,
+            inner: Sequence[Sequence] = ()) -> None:
+        """
+        Adds an object with the specified coordinates, name and type to
+        the current kml folder.
+
+        Args:
+            kml_level (KMLStreamWriter): Kml writer to add objects to
+            coords (Sequence): Object coordinates
+            obj_name (str): Object name
+            obj_types (list): Object type: 'Polygon' or 'Line'
+            inner (Sequence[Sequence], optional): Polygon interior rings
+                (holes) coordinates. Defaults to ().
+        """
+        if 'Polygon' in obj_types and self.Tmp.polygons_to_lines is False:
+            kml_level.add_polygon(f"{obj_name}", coords, inner)
+        if 'Line' in obj_types or self.Tmp.polygons_to_lines is True:
+            kml_level.add_linestring(f"{obj_name}", coords)
+            for ring in inner:
+                kml_level.add_linestring(f"{obj_name}", ring)
+
+    def choose_name_from_tag(self, tags: dict,
+                             language: Union[str, None] = None) -> str:
+        """
+        Chooses object name according to selected language. If there is
+        no such object name language in OSM data, chooses default one from
+        "name" tag.
+
+        Args:
+            tags (dict): Tags from nominatim search results
+            language (Union[str, None], optional): Name language. Defaults
+                to None ('objects_language').
+
+        Returns:
+            str: Object name
+        """
+        cur_lang_tag = f"name:{language or self.Tmp.objects_language}"
+        if cur_lang_tag in tags:  # f"name:{cur_lang_tag}"
+            return tags[cur_lang_tag]
+        elif "neme:en" in tags:
+            return tags["neme:en"]
+        else:
+            return tags["name"]
+
+    @property
+    def extra_languages(self) -> list[str]:
+        """Languages of names exported in addition to 'objects_language'.
+        """
+        return [language for language in self.Tmp.export_languages
+                if language != self.Tmp.objects_language]
+
+    def translated_names(self, tags: dict) -> dict[str, str]:
+        """
+        Chooses object names in 'extra_languages'.
+
+        Args:
+            tags (dict): Object tags
+
+        Returns:
+            dict[str, str]: {language: name} dictionary
+        """
+        return {language: self.choose_name_from_tag(tags, language)
+                for language in self.extra_languages}
+
+    def add_region_borders(self, kml_doc: Union[KMLStreamWriter, None],
+                           borders: dict) -> None:
+        """
+        Passes prepared region polygons coordinates to 'add_kml_borders'
+        function and geometry exports.
+
+        Args:
+            kml_doc (Union[KMLStreamWriter, None]): Kml writer object, None
+                if kml is not exported
+            borders (dict): {"multi": is multi-polygon, "polygons":
+                [(exterior ring, interior rings), ...] ('PackedPolygons'
+                or lists restored from the journal), "admin_level":
+                region administrative level} dictionary
+        """
+        if self.feature_export is not None:
+            self.feature_export.add_border(
+                self.Tmp.current_sub_obj_name, borders)
+        if kml_doc is not None:
+            self.add_kml_borders(
+                kml_doc, self.Tmp.current_sub_obj_name, borders)
+
+    def add_kml_borders(self, kml_doc: KMLStreamWriter, name: str,
+                        borders: dict) -> None:
+        """
+        Passes region polygons coordinates to 'add_kml_object' function.
+        Multi-polygon parts are placed into separate kml folder.
+
+        Args:
+            kml_doc (KMLStreamWriter): Kml writer object
+            name (str): Region name
+            borders (dict): Region borders (see 'add_region_borders')
+        """
+        if borders["multi"]:
+            kml_doc.open_folder(f"{name}")
+            for i, (coords, inner) in enumerate(borders["polygons"]):
+                i_obj_name = f"{name}_{i+1}"
+                self.add_kml_object(
+                    kml_doc, coords, i_obj_name, ['Polygon'], inner)
+            kml_doc.close_folder()
+        elif borders["polygons"]:
+            coords, inner = borders["polygons"][0]
+            self.add_kml_object(kml_doc, coords, name, ['Polygon'], inner)
+
+    def proccess_loaded_wkt(
+            self, kml_doc: Union[KMLStreamWriter, None], loaded_wkt: Polygon,
+            admin_level: Union[int, None] = None) -> Union[dict, None]:
+        """
+        Checks if the loaded wkt (well-known text) is polygon or multi-polygon
+        object, prepares it with 'GeometryProcessor' and passes it to
+        'add_region_borders' function.
+
+        Args:
+            kml_doc (Union[KMLStreamWriter, None]):
+                Kml writer object, None if kml is not exported
+            loaded_wkt (Polygon):
+                Wkt returned by Nominatim API
+            admin_level (Union[int, None], optional):
+                Region administrative level. Defaults to None.
+
+        Returns:
+            Union[dict, None]: Exported borders (see 'add_region_borders')
+        """
+        if loaded_wkt.geom_type not in ['MultiPolygon', 'Polygon']:
+            return None
+        borders = {
+            "multi": loaded_wkt.geom_type == 'MultiPolygon',
+            "polygons": self.geometry.prepare(loaded_wkt, admin_level),
+            "admin_level": admin_level}
+        self.add_region_borders(kml_doc, borders)
+        return borders
+
+    def kml_file_name(self, obj_name: str,
+                      language: Union[str, None] = None) -> str:
+        """Creates kml file name.
+
+        Args:
+            obj_name (str): Object name used in file name
+            language (Union[str, None], optional): Names language of
+                additional kml files. Defaults to None.
+
+        Returns:
+            str: Kml file name with extension
+        """
+        if self.Tmp.polygons_to_lines:
+            sub_name = "(lines)"
+        else:
+            sub_name = "(polygons)"
+        extension = "kmz" if self.Tmp.kmz else "kml"
+        if language is not None:
+            obj_name = f"{obj_name} ({language})"
+        return f"{obj_name} {sub_name}.{extension}"
+
+    def save_kml(self, obj_name: str) -> None:
+        """Finishes kml file, written while searching.
+
+        Args:
+            obj_name (str): Object name used in file name
+        """
+        if self.kml_doc is not None:
+            self.kml_doc.close()
+        self.Tmp.logger_object.info(
+            f"KML file saved as {self.kml_file_name(obj_name)}")
+
+    def save_excel(self, obj_name: str) -> None:
+        """Finishes locations table files (Excel and other table formats).
+
+        Args:
+            obj_name (str): Object name used in file name
+        """
+        if self.table_export is not None:
+            self.table_export.close()
+            self.table_export = None
+            self.Tmp.logger_object.info(
+                f"Locations tables saved as {self.Tmp.current_obj_name}"
+                f".{{{','.join(self.Tmp.table_formats)}}}")
+
+    def save_features(self) -> None:
+        """Finishes geometry exports (GeoJSON, FlatGeobuf).
+        """
+        if self.feature_export is not None:
+            self.feature_export.close()
+            self.feature_export = None
+
+    def search_line_proccessing(self) -> list[tuple[str, int]]:
+        """
+        Splits string with objects to search (and their administrative levels)
+        and creates a search list of [object name (str), administrative level
+        (int)] tuples.
+
+        Returns:
+            list(tuple(str,int)): Search list of (object name (str),
+                administrative level (int)) tuples
+        """
+        # search_list = list(map(str.strip, search_line.split(';')))
+        search_list = []
+        first_split_lst = self.Tmp.search_line.split(';')
+        for loc in first_split_lst:
+            strp = loc.strip()
+            if strp != "":
+                if "=" in strp:
+                    loc_lst = strp.split('=')
+                    loc_tuple = (loc_lst[0], int(loc_lst[1]))
+                else:
+                    loc_tuple = (strp, 4)
+                search_list.append(loc_tuple)
+        return search_list
+
+    def fetch_region_wkt(self, region: OSMElement) -> Union[str, bytes]:
+        """
+        Requests region border wkt (well-known text) or wkb from the data
+        source, unless it was loaded for local addresses resolution.
+
+        Args:
+            region (OSMElement): Element, found by Overpass
+
+        Returns:
+            Union[str, bytes]: Region border wkt or wkb
+        """
+        region_wkt = self.address_resolver.borders.pop(region.id(), None)
+        if region_wkt is not None:
+            return region_wkt
+        with self.metrics.stage("region_border", region=region.id()):
+            return self.source.borders([region.id()]).get(
+                region.id(), "GEOMETRYCOLLECTION EMPTY")
+
+    @staticmethod
+    def region_admin_level(region: OSMElement) -> Union[int, None]:
+        """Returns region administrative level.
+
+        Args:
+            region (OSMElement): Element, found by Overpass
+
+        Returns:
+            Union[int, None]: Administrative level or None if not set
+        """
+        try:
+            return int(region.tag("admin_level"))
+        except (TypeError, ValueError):
+            return None
+
+    def regions_search(self, index: int, region: OSMElement,
+                       kml_doc: Union[KMLStreamWriter, None],
+                       region_wkt: Union[str, bytes, dict, None] = None
+                       ) -> Union[dict, None]:
+        """Searches region polygons returned by Nominatim
+
+        Args:
+            index (int): Index used to track progress
+            region (OSMElement): Element, found by Nominatim
+            kml_doc (Union[KMLStreamWriter, None]): Kml writer object, None
+                if kml is not exported
+            region_wkt (Union[str, bytes, dict, None], optional): Already
+                fetched region border wkt (or wkb) or border prepared by
+                'GeometryPool'.
+                Defaults to None.
+
+        Returns:
+            Union[dict, None]: Exported borders (see 'add_region_borders')
+        """
+        self.Tmp.check_cancelled()
+        self.Tmp.current_stage = 0
+        self.Tmp.current_stage_num += 1
+        self.Tmp.current_obj = index
+        self.Tmp.current_area_obj = index
+        self.Tmp.current_area_obj_name = region.tag(
+            f'name:{self.Tmp.objects_language}')
+        self.Tmp.current_sub_obj_name = region.tag(
+            f'name:{self.Tmp.objects_language}')
+        admin_level = self.region_admin_level(region)
+        if isinstance(region_wkt, dict):
+            borders = self.geometry.borders(region_wkt, admin_level)
+            if borders is not None:
+                self.add_region_borders(kml_doc, borders)
+            return borders
+        from geometry import load_border
+
+        if region_wkt is None:
+            region_wkt = self.fetch_region_wkt(region)
+        loaded_wkt = load_border(region_wkt)
+        if hasattr(loaded_wkt, 'geom_type'):
+            return self.proccess_loaded_wkt(kml_doc, loaded_wkt, admin_level)
+        else:
+            self.Tmp.logger_object.warning(
+                f"Border of {self.Tmp.current_area_obj_name} has no geometry")
+            return None
+
+    def fetch_locations(self, region: OSMElement) -> tuple[
+            list[OSMElement], dict[int, dict]]:
+        """Requests region place nodes and resolves their addresses.
+
+        Args:
+            region (OSMElement): Element, found by Overpass
+
+        Returns:
+            tuple[list[OSMElement], dict[int, dict]]:
+                Place nodes and {node id: address} dictionary
+        """
+        with self.metrics.stage("locations", region=region.id()):
+            points = self.source.places(region.areaId())
+            nodes, containers = self.address_resolver.split_result(points)
+            return nodes, self.address_resolver.resolve(nodes, containers)
+
+    def locations_search(
+            self, index: int, region: OSMElement,
+            kml_doc: Union[KMLStreamWriter, None],
+            locations: Union[tuple[list[OSMElement], dict[int, dict]],
+                             None] = None) -> list[dict]:
+        """Searches location points returned by Nominatim
+
+        Args:
+            index (int): Index used to track progress
+            region (OSMElement): Element, found by Nominatim
+            kml_doc (Union[KMLStreamWriter, None]): Kml writer object, None
+                if kml is not exported
+            locations (Union[tuple[list[OSMElement], dict[int, dict]], None],
+                optional): Already fetched 'fetch_locations' result.
+                Defaults to None.
+
+        Returns:
+            list[dict]: Exported points rows
+        """
+        self.Tmp.check_cancelled()
+        self.Tmp.current_stage = 1
+        self.Tmp.current_stage_num += 1
+        dict_list = []
+        # self.Tmp.current_obj = index
+        # self.Tmp.current_obj_name = region.tag(
+        #    f'name:{self.Tmp.objects_language}')
+        if locations is None:
+            locations = self.fetch_locations(region)
+        nodes, addresses = locations
+        self.Tmp.sub_obj_number = len(nodes)
+        logger = self.Tmp.logger_object
+        for i, p in enumerate(nodes):
+            self.Tmp.check_cancelled()
+            adr_mod = addresses.get(p.id(), {})
+            # Node id lets incremental crawls find regions of changed nodes
+            adr_mod["id"] = p.id()
+            adr_mod["lon"] = p.lon()
+            adr_mod["lat"] = p.lat()
+            if "location" not in adr_mod:
+                logger.debug("No location name of node %s - Skip", p.id())
+                continue
+            # Arguments are formatted only if debug messages are enabled
+            logger.debug("%s (%s, %s): %s", adr_mod["location"],
+                         adr_mod["lon"], adr_mod["lat"], adr_mod)
+            self.Tmp.current_obj = i
+            self.Tmp.current_sub_obj_name = adr_mod["location"]  # ! Too late
+            dict_list.append(adr_mod)
+        self.Tmp.check_cancelled()
+        self.add_locations(kml_doc, dict_list)
+        return dict_list
+
+    def add_locations(self, kml_doc: Union[KMLStreamWriter, None],
+                      dict_list: list[dict]) -> None:
+        """Exports region points to kml and Excel.
+
+        Args:
+            kml_doc (Union[KMLStreamWriter, None]): Kml writer object, None
+                if kml is not exported
+            dict_list (list[dict]): Points rows
+        """
+        if kml_doc is not None:
+            for adr_mod in dict_list:
+                kml_doc.add_point(
+                    adr_mod["location"], adr_mod["lon"], adr_mod["lat"])
+        self.Tmp.points_done += len(dict_list)
+        if self.table_export is not None:
+            self.table_export.add(self.Tmp.current_area_obj_name, dict_list)
+        if self.feature_export is not None:
+            self.feature_export.add_points(
+                self.Tmp.current_area_obj_name, dict_list)
+
+    def fetch_first_search(self, single_obj_req: tuple[str, int]) -> list:
+        """
+        Searches object with the data source in chosen (in Tmp
+        parameters) mode: World, Country or State.
+
+        Args:
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+
+        Returns:
+            list: Nominatim search results json
+        """
+        with self.metrics.stage("first_search", obj=single_obj_req[0]):
+            return self.source.search(single_obj_req)
+
+    def first_nominatim_search(
+            self, single_obj_req: tuple[str, int],
+            search_json: Union[list, None] = None) -> str:
+        """
+        Searches object with Nominatim in chosen (in Tmp parameters)
+        mode: World, Country or State to retrieve its id.
+
+        Args:
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+            search_json (Union[list, None], optional): Already fetched
+                'fetch_first_search' result. Defaults to None.
+
+        Returns:
+            str: Nominatim id
+        """
+        self.current_request = single_obj_req
+        if search_json is None:
+            search_json = self.fetch_first_search(single_obj_req)
+
+        search_mode = 0
+        if search_mode == 0:
+            js = search_json
+            for res in js:
+                self.Tmp.logger_object.debug("Search result: %s", res)
+            self.Tmp.current_search_json = js
+            # First result is used unless another one is chosen in GUI
+            self.Tmp.current_obj_name = js[0]["display_name"]
+            self.address_resolver.set_search_object(js[0])
+        return f"{js[0]['osm_type'][0]}{js[0]['osm_id']}"
+
+    def overpass_search(self, area_id: str,
+                        single_obj_req: tuple[str, int]) -> OverpassResult:
+        """
+        Tries different admin levels from 'admin_level_try_list' and returns
+        first correct Overpass result. Found administrative areas are
+        indexed for local addresses resolution if enabled.
+
+        Args:
+            area_id (str):
+                Nominatim id from 'first_nominatim_search' result
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+
+        Returns:
+            OverpassResult: Found Overpass regions
+        """
+        with self.metrics.stage("overpass_search", obj=single_obj_req[0]):
+            if self.Tmp.combined_admin_query:
+                regions = self.combined_overpass_search(
+                    area_id, single_obj_req)
+            else:
+                regions = self.levels_overpass_search(
+                    area_id, single_obj_req)
+        if self.address_resolver.local:
+            with self.metrics.stage("admin_areas", obj=single_obj_req[0]):
+                self.address_resolver.index_admin_areas(area_id, regions)
+        return regions
+
+    def levels_overpass_search(
+            self, area_id: str,
+            single_obj_req: tuple[str, int]) -> OverpassResult:
+        """
+        Requests administrative relations level by level until any is
+        found.
+
+        Args:
+            area_id (str):
+                Nominatim id from 'first_nominatim_search' result
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+
+        Returns:
+            OverpassResult: Found Overpass regions
+        """
+        regions = None
+
+        admin_level_try_list = self.admin_level_try_list_creator(
+            # [3,4,5,6,7,8,9,10]
+            single_obj_req[1], [4, 5, 6, 7, 8, 9, 10, 3])
+
+        for i in admin_level_try_list:
+            try:
+                # f"area({osm_data.areaId()})->.searchArea;
+                # (relation["boundary"="administrative"]["admin_level"="4"]
+                # (area.searchArea);); out body";
+                regions = self.source.admin_relations(area_id, i)
+                self.Tmp.sub_obj_number = len(regions.relations())
+                self.Tmp.current_area_obj_number = self.Tmp.sub_obj_number
+                break
+            except TypeError:
+                self.Tmp.logger_object.warning(
+                    f"No administrative level {i} found")
+                continue
+        return regions
+
+    def combined_overpass_search(
+            self, area_id: str,
+            single_obj_req: tuple[str, int]) -> OverpassResult:
+        """
+        Requests administrative relations of all levels (3-10) at once and
+        picks the first level from 'admin_level_try_list', which has any.
+        All levels relations are kept in 'admin_relations'.
+
+        Args:
+            area_id (str):
+                Nominatim id from 'first_nominatim_search' result
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+
+        Returns:
+            OverpassResult: Found Overpass regions of the picked level
+        """
+        from OSMPythonTools.overpass import OverpassResult
+
+        all_regions = self.source.admin_relations(area_id)
+        by_level: dict[int, list[OSMElement]] = {}
+        for region in all_regions.relations() or []:
+            try:
+                level = int(region.tag("admin_level"))
+            except (TypeError, ValueError):
+                continue
+            by_level.setdefault(level, []).append(region)
+        self.admin_relations[area_id] = by_level
+
+        admin_level_try_list = self.admin_level_try_list_creator(
+            single_obj_req[1], [4, 5, 6, 7, 8, 9, 10, 3])
+        chosen_level = None
+        for i in admin_level_try_list:
+            if i in by_level:
+                chosen_level = i
+                break
+            self.Tmp.logger_object.warning(
+                f"No administrative level {i} found")
+        elements = [
+            e for e in all_regions.toJSON()["elements"]
+            if e.get("type") == "relation" and
+            e.get("tags", {}).get("admin_level") == str(chosen_level)]
+        regions = OverpassResult(
+            {**all_regions.toJSON(), "elements": elements},
+            all_regions.queryString(), {})
+        if chosen_level is not None:
+            self.Tmp.sub_obj_number = len(elements)
+            self.Tmp.current_area_obj_number = self.Tmp.sub_obj_number
+        return regions
+
+    def start_region_exports(self) -> None:
+        """
+        Opens exports filled region by region. Export modules are imported
+        only if their formats are enabled.
+        """
+        from checkpoint import CrawlJournal
+
+        self.kml_doc = None
+        if self.Tmp.export_to_kml:
+            kml_path = os.path.join(
+                self.Tmp.export_dir,
+                self.kml_file_name(self.current_request[0]))
+            self.kml_doc = KMLStreamWriter(
+                kml_path, self.current_request[0], self.Tmp.line_color,
+                self.Tmp.line_width, self.Tmp.kmz)
+        self.journal = CrawlJournal(self.Tmp, self.current_request[0]) \
+            if CrawlJournal.is_needed(self.Tmp) else None
+        self.metrics.start_regions()
+        if self.Tmp.search_locations and self.Tmp.export_to_excel:
+            from table_export import TableExport
+            self.table_export = TableExport(
+                self.Tmp, self.Tmp.current_obj_name)
+        if self.Tmp.feature_formats:
+            from feature_export import FeatureExport
+            self.feature_export = FeatureExport(
+                self.Tmp, self.current_request[0])
+        if self.extra_languages:
+            from language_exports import LanguageExports
+            self.language_exports = LanguageExports(
+                self, self.current_request[0])
+
+    def refresh_changed(self, overpass_regions: OverpassResult) -> None:
+        """
+        Incremental crawl: asks data source for objects changed since the
+        previous crawl and forgets journal records of regions affected by
+        them, so only these regions are requested again, while others are
+        exported from the journal.
+
+        Args:
+            overpass_regions (OverpassResult): Overpass regions to proccess
+        """
+        from data_sources import osm_timestamp
+
+        journal = self.journal
+        if not self.Tmp.incremental or journal is None:
+            return
+        journal.timestamp = osm_timestamp(overpass_regions) or \
+            journal.timestamp
+        relations = overpass_regions.relations()
+        if journal.crawled is None or not journal.completed or not relations:
+            return
+        with self.metrics.stage("changes", obj=self.current_request[0]):
+            changes = self.source.changes(
+                [region.id() for region in relations], journal.crawled)
+        if changes is None:
+            stale = set(journal.completed)
+        else:
+            journal.timestamp = changes["timestamp"] or journal.timestamp
+            stale = changes["regions"]
+            for region_id, record in journal.completed.items():
+                ids = {row.get("id") for row in record["points"] or []}
+                # Points of the region were changed or deleted
+                if ids & changes["nodes"] or (
+                        changes["places"] is not None and
+                        ids - changes["places"]):
+                    stale.add(region_id)
+        journal.drop(stale)
+        changed = sum(journal.get(region.id()) is None for region in relations)
+        self.Tmp.logger_object.info(
+            f"{changed} of {len(relations)} regions changed since "
+            f"{journal.crawled}")
+
+    def prefetch_borders(self, relations: list[OSMElement]) -> None:
+        """
+        Requests borders of all regions left to export at once, if the
+        data source requests them in batches ('overpass_borders'), instead
+        of a request per region.
+
+        Args:
+            relations (list[OSMElement]): Regions to proccess
+        """
+        # Nominatim borders are requested region by region
+        if not self.Tmp.search_borders or not self.Tmp.overpass_borders:
+            return
+        relation_ids = [
+            region.id() for region in relations
+            if region.id() not in self.address_resolver.borders and (
+                self.journal is None or self.journal.get(region.id()) is None)]
+        if relation_ids:
+            with self.metrics.stage("region_borders",
+                                    obj=self.current_request[0]):
+                self.source.prefetch_borders(relation_ids)
+
+    def process_region(
+            self, index: int, region: OSMElement,
+            region_wkt: Union[str, bytes, dict, None] = None,
+            locations: Union[tuple[list[OSMElement], dict[int, dict]],
+                             None] = None) -> None:
+        """
+        Creates region border and points, using already fetched data
+        if given.
+
+        Args:
+            index (int): Index used to track progress
+            region (OSMElement): Element, found by Overpass
+            region_wkt (Union[str, bytes, dict, None], optional): Already
+                fetched region border wkt (or wkb) or prepared border.
+                Defaults to None.
+            locations (Union[tuple[list[OSMElement], dict[int, dict]], None],
+                optional): Already fetched 'fetch_locations' result.
+                Defaults to None.
+        """
+        self.Tmp.check_cancelled()
+        folder = self.Tmp.search_borders and self.Tmp.search_locations \
+            and self.kml_doc is not None
+        if folder:
+            self.kml_doc.open_folder(self.choose_name_from_tag(region.tags()))
+
+        record = self.journal.get(region.id()) \
+            if self.journal is not None else None
+        with self.metrics.stage("region_export", region=region.id()):
+            if record is not None:
+                self.replay_region(index, record)
+                self.journal.keep(region.id())  # type: ignore
+                borders, points = record["borders"], record["points"]
+            else:
+                borders = points = None
+                if self.Tmp.search_borders:
+                    borders = self.regions_search(
+                        index, region, self.kml_doc, region_wkt)
+                if self.Tmp.search_locations:
+                    points = self.locations_search(
+                        index, region, self.kml_doc, locations)
+                if self.journal is not None:
+                    self.journal.record_region(
+                        region.id(), self.Tmp.current_area_obj_name,
+                        borders, points)
+            if self.language_exports is not None:
+                self.language_exports.add_region(
+                    region.tags(), borders, points, folder)
+        if folder:
+            self.kml_doc.close_folder()
+        self.Tmp.regions_done += 1
+        self.Tmp.current_stage_num = 0
+
+    def replay_region(self, index: int, record: dict) -> None:
+        """Exports region completed in the previous run from the journal.
+
+        Args:
+            index (int): Index used to track progress
+            record (dict): Journal record of the region
+        """
+        self.Tmp.current_obj = index
+        self.Tmp.current_area_obj = index
+        self.Tmp.current_area_obj_name = record["name"]
+        self.Tmp.current_sub_obj_name = record["name"]
+        if record["borders"] is not None:
+            self.add_region_borders(self.kml_doc, record["borders"])
+        if record["points"] is not None:
+            self.add_locations(self.kml_doc, record["points"])
+
+    def second_nominatim_search(self,
+                                overpass_regions: OverpassResult) -> None:
+        """
+        Second Nominatim search, which using Overpass results to create
+        borders and points.
+
+        Args:
+            overpass_regions (OverpassResult): Overpass regions to proccess
+        """
+        try:
+            self.start_region_exports()
+            self.refresh_changed(overpass_regions)
+            self.prefetch_borders(overpass_regions.relations())
+            for i, region in enumerate(overpass_regions.relations()):
+                self.process_region(i, region)
+        except TypeError:
+            self.Tmp.logger_object.error(
+                    "No administrative levels found")
+            self.Tmp.current_stage_num = 0
+            self.Tmp.error_found = 1
+
+    def save_languages(self) -> None:
+        """Finishes exports in additional languages.
+        """
+        if self.language_exports is not None:
+            self.language_exports.close()
+            self.language_exports = None
+
+    def discard_exports(self) -> None:
+        """
+        Removes unfinished kml and table files of the failed search object.
+        Journal is kept to resume the search later.
+        """
+        if self.kml_doc is not None:
+            self.kml_doc.discard()
+        if self.language_exports is not None:
+            self.language_exports.discard()
+            self.language_exports = None
+        if self.table_export is not None:
+            self.table_export.discard()
+            self.table_export = None
+        if self.feature_export is not None:
+            self.feature_export.discard()
+            self.feature_export = None
+        if self.journal is not None:
+            self.journal.close()
+
+    def close_exports(self) -> None:
+        """
+        Closes exports of the cancelled search object. Files stay valid
+        and contain regions exported before cancellation, journal is kept
+        to resume the search later.
+        """
+        if self.kml_doc is not None:
+            self.kml_doc.close()
+        if self.table_export is not None:
+            self.table_export.close()
+            self.table_export = None
+        self.save_features()
+        self.save_languages()
+        if self.journal is not None:
+            self.journal.close()
+
+    def finish_journal(self) -> None:
+        """
+        Removes journal of the successfully exported search object, or
+        keeps it for the next incremental crawl.
+        """
+        if self.journal is not None:
+            self.journal.finish()
+
+    def export_results(
+            self, single_obj_req: tuple[str, int],
+            notify: Union[Callable[[list], None], None] = None) -> None:
+        """Saves configured exports of a single search object.
+
+        Args:
+            single_obj_req (tuple[str, int]):
+                Tuple with object name and administrative level
+            notify (Union[Callable[[list], None], None], optional): Called
+                with [0, export type] before and [1, export type] after
+                Excel and KML exports. Defaults to None.
+        """
+        def save(export_type: str, save_export: Callable) -> None:
+            if notify is not None:
+                notify([0, export_type])
+            save_export(single_obj_req[0])
+            if notify is not None:
+                notify([1, export_type])
+
+        if self.Tmp.error_found == 0:
+            with self.metrics.stage("export", obj=single_obj_req[0]):
+                if self.Tmp.export_to_excel and self.Tmp.search_locations:
+                    save("Excel", self.save_excel)
+                if self.Tmp.export_to_kml:
+                    save("KML", self.save_kml)
+                self.save_features()
+                self.save_languages()
+                self.finish_journal()
+        else:
+            self.discard_exports()
+            self.Tmp.failed_objects.append(single_obj_req[0])
+            self.Tmp.error_found = 0
+
+    def request_and_proccess_data(self) -> None:
+        """
+        Gathers all 3 searches together and exports configured data.
+        Searches are pipelined by 'AsyncEarthCrawler'. Crawl metrics are
+        summarized at the end.
+        """
+        import asyncio
+        from async_crawler import AsyncEarthCrawler
+
+        try:
+            asyncio.run(AsyncEarthCrawler(self).crawl())
+        finally:
+            self.source.close()
+            self.metrics.log_summary()
+
+
+def script_sequence(resume: bool = False) -> None:
+    """Script running without GUI.
+
+    Args:
+        resume (bool, optional): Resume interrupted crawl, skipping regions
+            completed in the previous run. Defaults to False.
+    """
+    Tmp = TempData()
+    Tmp.resume = resume
+    try:
+        Converter = EarthCrawler(Tmp)
+        Converter.request_and_proccess_data()
+    except Exception:
+        Tmp.logger_object.exception("UncaughtException")
+        Tmp.logger_object.warning("Ending script due too uncaught exception")
+
+
+if __name__ == "__main__":
+    from cli import main
+    sys.exit(main())
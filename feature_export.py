@@ -0,0 +1,233 @@
+import json
+import os
+import numpy as np
+from typing import Any, Union
+from tempdata import TempData
+from geometry import PackedPolygons
+import flatgeobuf
+
+
+def polygons_box(polygons: list[tuple[Any, list[Any]]]) -> tuple[
+        float, float, float, float]:
+    """
+    Computes bounding box of prepared polygons.
+
+    Args:
+        polygons (list[tuple[Any, list[Any]]]): (exterior ring, interior
+            rings) coordinates of every polygon or 'PackedPolygons'
+
+    Returns:
+        tuple[float, float, float, float]: (min x, min y, max x, max y)
+    """
+    return PackedPolygons.from_rings(polygons).bounds()
+
+
+class FeatureExporter():
+    """
+    Base class of geometry exporters. Region borders and points are
+    written into separate layers ("borders" and "points" files). Borders
+    come in the prepared geometry model shared with KML export (see
+    'EarthCrawler.add_region_borders'), so region WKT is parsed and
+    simplified once for all formats.
+    """
+    extension = ""
+    POINT_PROPERTIES = ("area", "location", "county", "state", "region",
+                        "country")
+
+    def __init__(self, file_path: str) -> None:
+        """
+        Args:
+            file_path (str): Output files path without extension, layer name
+                is appended to it
+        """
+        self.paths = [f"{file_path} {layer}.{self.extension}"
+                      for layer in ("borders", "points")]
+
+    def add_border(self, name: str, admin_level: Union[int, None],
+                   polygons: list[tuple[Any, list[Any]]]) -> None:
+        """
+        Writes region border as a single (multi)polygon feature.
+
+        Args:
+            name (str): Region name
+            admin_level (Union[int, None]): Region administrative level
+            polygons (list[tuple[Any, list[Any]]]): (exterior ring, interior
+                rings) coordinates of every polygon
+        """
+        raise NotImplementedError
+
+    def add_points(self, area_name: str, rows: list[dict]) -> None:
+        """
+        Writes region points.
+
+        Args:
+            area_name (str): Region name
+            rows (list[dict]): Location rows
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Finishes output files.
+        """
+        raise NotImplementedError
+
+    def discard(self) -> None:
+        """Closes and removes unfinished output files.
+        """
+        self.close()
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class GeoJSONSeqExporter(FeatureExporter):
+    """
+    Writes newline-delimited GeoJSON (one feature per line), which can be
+    read in a stream.
+    """
+    extension = "geojsonl"
+
+    def __init__(self, file_path: str) -> None:
+        super().__init__(file_path)
+        self._files = [open(path, "w", encoding="utf-8")
+                       for path in self.paths]
+
+    def write(self, layer: int, geometry: dict, properties: dict) -> None:
+        """
+        Writes feature line.
+
+        Args:
+            layer (int): Layer index (0 - borders, 1 - points)
+            geometry (dict): GeoJSON geometry
+            properties (dict): Feature properties
+        """
+        self._files[layer].write(json.dumps(
+            {"type": "Feature", "geometry": geometry,
+             "properties": properties}, ensure_ascii=False) + "\n")
+
+    def add_border(self, name: str, admin_level: Union[int, None],
+                   polygons: list[tuple[Any, list[Any]]]) -> None:
+        coordinates = [
+            [np.asarray(ring).tolist() for ring in [outer, *inner]]
+            for outer, inner in polygons]
+        if len(coordinates) == 1:
+            geometry = {"type": "Polygon", "coordinates": coordinates[0]}
+        else:
+            geometry = {"type": "MultiPolygon", "coordinates": coordinates}
+        self.write(0, geometry, {"name": name, "admin_level": admin_level})
+
+    def add_points(self, area_name: str, rows: list[dict]) -> None:
+        for row in rows:
+            self.write(
+                1, {"type": "Point", "coordinates": [row["lon"], row["lat"]]},
+                {"area": area_name,
+                 **{key: row.get(key) for key in self.POINT_PROPERTIES[1:]}})
+
+    def close(self) -> None:
+        for file in self._files:
+            file.close()
+
+
+class FlatGeobufExporter(FeatureExporter):
+    """
+    Writes FlatGeobuf layers with packed Hilbert R-tree index, so readers
+    can fetch features intersecting a bounding box without loading the
+    whole file.
+    """
+    extension = "fgb"
+
+    def __init__(self, file_path: str) -> None:
+        super().__init__(file_path)
+        self.borders = flatgeobuf.FlatGeobufWriter(
+            self.paths[0], "borders", flatgeobuf.MULTIPOLYGON,
+            [("name", flatgeobuf.STRING), ("admin_level", flatgeobuf.INT)])
+        self.points = flatgeobuf.FlatGeobufWriter(
+            self.paths[1], "points", flatgeobuf.POINT,
+            [(key, flatgeobuf.STRING) for key in self.POINT_PROPERTIES])
+
+    def add_border(self, name: str, admin_level: Union[int, None],
+                   polygons: list[tuple[Any, list[Any]]]) -> None:
+        self.borders.add(flatgeobuf.geometry(polygons), [name, admin_level],
+                         polygons_box(polygons))
+
+    def add_points(self, area_name: str, rows: list[dict]) -> None:
+        for row in rows:
+            lon, lat = float(row["lon"]), float(row["lat"])
+            self.points.add(
+                flatgeobuf.point(lon, lat),
+                [area_name, *[row.get(key)
+                              for key in self.POINT_PROPERTIES[1:]]],
+                (lon, lat, lon, lat))
+
+    def close(self) -> None:
+        self.borders.close()
+        self.points.close()
+
+    def discard(self) -> None:
+        self.borders.discard()
+        self.points.discard()
+        super().discard()
+
+
+EXPORTERS: dict[str, type[FeatureExporter]] = {
+    exporter.extension: exporter
+    for exporter in (GeoJSONSeqExporter, FlatGeobufExporter)}
+
+
+class FeatureExport():
+    """Exports borders and points of a search object to configured formats.
+    """
+    def __init__(self, Tmp: TempData, obj_name: str) -> None:
+        """
+        Opens exporters of formats listed in 'feature_formats' setting.
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+            obj_name (str): Search object name used in files names
+        """
+        self.exporters: list[FeatureExporter] = []
+        try:
+            for feature_format in Tmp.feature_formats:
+                self.exporters.append(EXPORTERS[feature_format](
+                    os.path.join(Tmp.export_dir, obj_name)))
+        except Exception:
+            self.discard()
+            raise
+
+    def add_border(self, name: str, borders: dict) -> None:
+        """
+        Writes region border to all formats.
+
+        Args:
+            name (str): Region name
+            borders (dict): Prepared borders (see
+                'EarthCrawler.add_region_borders')
+        """
+        if not borders["polygons"]:
+            return
+        for exporter in self.exporters:
+            exporter.add_border(name, borders.get("admin_level"),
+                                borders["polygons"])
+
+    def add_points(self, area_name: str, rows: list[dict]) -> None:
+        """
+        Writes region points to all formats.
+
+        Args:
+            area_name (str): Region name
+            rows (list[dict]): Location rows
+        """
+        for exporter in self.exporters:
+            exporter.add_points(area_name, rows)
+
+    def close(self) -> None:
+        """Finishes all output files.
+        """
+        for exporter in self.exporters:
+            exporter.close()
+
+    def discard(self) -> None:
+        """Removes all unfinished output files.
+        """
+        for exporter in self.exporters:
+            exporter.discard()
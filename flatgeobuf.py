@@ -0,0 +1,395 @@
+import struct
+import tempfile
+import numpy as np
+from typing import Any, BinaryIO, Union
+from geometry import PackedPolygons
+
+# FlatGeobuf file signature, format version 3
+MAGIC = b"fgb\x03fgb\x00"
+NODE_SIZE = 16  # packed R-tree node size
+NODE_ITEM = struct.Struct("<ddddQ")
+
+# Geometry types
+POINT = 1
+POLYGON = 3
+MULTIPOLYGON = 6
+
+# Column types
+INT = 5
+STRING = 11
+
+
+class Table():
+    """FlatBuffers table: list of fields in schema order, None if absent.
+    """
+    def __init__(self, *fields: Union[tuple[str, Any], None]) -> None:
+        """
+        Args:
+            fields (Union[tuple[str, Any], None]): (struct format, value)
+                for scalars, ("offset", child) for strings, vectors and
+                tables
+        """
+        self.fields = fields
+
+
+class Vector():
+    """FlatBuffers vector of scalars.
+    """
+    def __init__(self, fmt: str, values: Any) -> None:
+        """
+        Args:
+            fmt (str): Elements struct format
+            values (Any): Elements (numpy array is written as is)
+        """
+        self.fmt = fmt
+        self.values = values
+
+
+def encode(root: Table) -> bytes:
+    """
+    Encodes FlatBuffers buffer. Objects are laid out front to back: every
+    vtable is placed right before its table and children after their
+    parent, so all references point forward.
+
+    Args:
+        root (Table): Root table
+
+    Returns:
+        bytes: Encoded buffer
+    """
+    buf = bytearray(4)
+
+    def align(size: int, extra: int = 0) -> None:
+        buf.extend(b"\x00" * (-(len(buf) + extra) % size))
+
+    def write(item: Any) -> int:
+        if isinstance(item, str):
+            data = item.encode("utf-8")
+            align(4)
+            pos = len(buf)
+            buf.extend(struct.pack("<I", len(data)) + data + b"\x00")
+            return pos
+        if isinstance(item, Vector):
+            size = struct.calcsize("<" + item.fmt)
+            values = np.asarray(item.values, dtype="<" + item.fmt)
+            align(max(size, 4), 4)
+            pos = len(buf)
+            buf.extend(struct.pack("<I", len(values)) + values.tobytes())
+            return pos
+        if isinstance(item, list):  # vector of tables
+            align(4)
+            pos = len(buf)
+            buf.extend(struct.pack("<I", len(item)) + b"\x00" * 4 * len(item))
+            for i, table in enumerate(item):
+                slot = pos + 4 + 4 * i
+                struct.pack_into("<I", buf, slot, write(table) - slot)
+            return pos
+        return write_table(item)
+
+    def write_table(table: Table) -> int:
+        present = [(i, field) for i, field in enumerate(table.fields)
+                   if field is not None]
+        sizes = {i: 4 if fmt == "offset" else struct.calcsize("<" + fmt)
+                 for i, (fmt, _) in present}
+        offsets = {}
+        inline = 4  # soffset to vtable
+        for i, _ in sorted(present, key=lambda field: -sizes[field[0]]):
+            inline += -inline % sizes[i]
+            offsets[i] = inline
+            inline += sizes[i]
+        table_align = max([4, *sizes.values()])
+        vtable = struct.pack(
+            f"<{2 + len(table.fields)}H", 4 + 2 * len(table.fields), inline,
+            *[offsets.get(i, 0) for i in range(len(table.fields))])
+        align(2)
+        vtable_pos = len(buf)
+        buf.extend(vtable)
+        align(table_align)
+        pos = len(buf)
+        buf.extend(b"\x00" * inline)
+        struct.pack_into("<i", buf, pos, pos - vtable_pos)
+        children = []
+        for i, (fmt, value) in present:
+            if fmt == "offset":
+                children.append((pos + offsets[i], value))
+            else:
+                struct.pack_into("<" + fmt, buf, pos + offsets[i], value)
+        for slot, child in children:
+            struct.pack_into("<I", buf, slot, write(child) - slot)
+        return pos
+
+    struct.pack_into("<I", buf, 0, write_table(root))
+    return bytes(buf)
+
+
+def geometry(polygons: list[tuple[Any, list[Any]]]) -> Table:
+    """
+    Creates MultiPolygon geometry table. Coordinates of every polygon are
+    written straight from the packed array.
+
+    Args:
+        polygons (list[tuple[Any, list[Any]]]): (exterior ring, interior
+            rings) coordinates of every polygon or 'PackedPolygons'
+
+    Returns:
+        Table: Geometry table
+    """
+    packed = PackedPolygons.from_rings(polygons)
+    parts = []
+    for index in range(len(packed)):
+        coords, ends = packed.polygon(index)
+        parts.append(Table(
+            ("offset", Vector("I", ends)),
+            ("offset", Vector("d", coords.ravel())),
+            None, None, None, None, ("B", POLYGON)))
+    return Table(None, None, None, None, None, None, ("B", MULTIPOLYGON),
+                 ("offset", parts))
+
+
+def point(lon: float, lat: float) -> Table:
+    """Creates Point geometry table.
+
+    Args:
+        lon (float): Point longitude
+        lat (float): Point latitude
+
+    Returns:
+        Table: Geometry table
+    """
+    return Table(None, ("offset", Vector("d", [lon, lat])), None, None, None,
+                 None, ("B", POINT))
+
+
+def interleave(i: np.ndarray) -> np.ndarray:
+    """Spreads 16 bits of the number to even bit positions.
+
+    Args:
+        i (np.ndarray): 16 bit numbers
+
+    Returns:
+        np.ndarray: 32 bit numbers
+    """
+    i = (i | (i << 8)) & 0x00FF00FF
+    i = (i | (i << 4)) & 0x0F0F0F0F
+    i = (i | (i << 2)) & 0x33333333
+    return (i | (i << 1)) & 0x55555555
+
+
+def hilbert(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Computes Hilbert curve indexes of 16 bit coordinates (vectorized port
+    of the FlatGeobuf reference implementation).
+
+    Args:
+        x (np.ndarray): X coordinates (0..0xFFFF)
+        y (np.ndarray): Y coordinates (0..0xFFFF)
+
+    Returns:
+        np.ndarray: Hilbert indexes
+    """
+    x = x.astype(np.uint32)
+    y = y.astype(np.uint32)
+    a = x ^ y
+    b = 0xFFFF ^ a
+    c = 0xFFFF ^ (x | y)
+    d = x & (y ^ 0xFFFF)
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+    for shift in (2, 4):
+        a, b, c, d = A, B, C, D
+        A = (a & (a >> shift)) ^ (b & (b >> shift))
+        B = (a & (b >> shift)) ^ (b & ((a ^ b) >> shift))
+        C = C ^ ((a & (c >> shift)) ^ (b & (d >> shift)))
+        D = D ^ ((b & (c >> shift)) ^ ((a ^ b) & (d >> shift)))
+    a, b, c, d = A, B, C, D
+    C = C ^ ((a & (c >> 8)) ^ (b & (d >> 8)))
+    D = D ^ ((b & (c >> 8)) ^ ((a ^ b) & (d >> 8)))
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+    i0 = x ^ y
+    i1 = b | (0xFFFF ^ (i0 | a))
+    return (interleave(i1) << 1) | interleave(i0)
+
+
+def level_bounds(items_number: int) -> list[tuple[int, int]]:
+    """
+    Computes packed R-tree levels nodes ranges. Levels are listed from
+    leaves to root, while root is stored first.
+
+    Args:
+        items_number (int): Number of indexed features
+
+    Returns:
+        list[tuple[int, int]]: (first node, last node + 1) of every level
+    """
+    n = items_number
+    levels = [n]
+    while True:
+        n = -(-n // NODE_SIZE)
+        levels.append(n)
+        if n == 1:
+            break
+    bounds = []
+    end = sum(levels)
+    for size in levels:
+        end -= size
+        bounds.append((end, end + size))
+    return bounds
+
+
+class FlatGeobufWriter():
+    """
+    Writes FlatGeobuf layer with packed Hilbert R-tree spatial index.
+    Encoded features are spooled to a temporary file, because the index
+    (written before features) needs all of them sorted along the Hilbert
+    curve. Only features bounding boxes are kept in memory.
+    """
+    def __init__(self, file_path: str, name: str, geometry_type: int,
+                 columns: list[tuple[str, int]]) -> None:
+        """
+        Args:
+            file_path (str): Output file path
+            name (str): Layer name
+            geometry_type (int): Layer geometry type
+            columns (list[tuple[str, int]]): (name, column type) of
+                features properties
+        """
+        self.file_path = file_path
+        self.name = name
+        self.geometry_type = geometry_type
+        self.columns = columns
+        self._spool: BinaryIO = tempfile.TemporaryFile()  # type: ignore
+        # Features spool offsets, sizes and bounding boxes
+        self.offsets: list[int] = []
+        self.sizes: list[int] = []
+        self.boxes: list[tuple[float, float, float, float]] = []
+
+    def properties(self, values: list[Any]) -> bytes:
+        """
+        Encodes feature properties, missing values are omitted.
+
+        Args:
+            values (list[Any]): Values in columns order
+
+        Returns:
+            bytes: Encoded properties
+        """
+        data = bytearray()
+        for i, ((_, column_type), value) in enumerate(
+                zip(self.columns, values)):
+            if value is None:
+                continue
+            if column_type == STRING:
+                encoded = str(value).encode("utf-8")
+                data += struct.pack("<HI", i, len(encoded)) + encoded
+            else:
+                data += struct.pack("<Hi", i, int(value))
+        return bytes(data)
+
+    def add(self, geometry: Table, values: list[Any],
+            box: tuple[float, float, float, float]) -> None:
+        """
+        Adds feature.
+
+        Args:
+            geometry (Table): Feature geometry table
+            values (list[Any]): Properties in columns order
+            box (tuple[float, float, float, float]): (min x, min y, max x,
+                max y) bounding box
+        """
+        feature = encode(Table(
+            ("offset", geometry),
+            ("offset", Vector("B", np.frombuffer(
+                self.properties(values), dtype=np.uint8)))))
+        self.offsets.append(self._spool.tell())
+        self.sizes.append(len(feature) + 4)
+        self.boxes.append(box)
+        self._spool.write(struct.pack("<I", len(feature)) + feature)
+
+    def header(self, envelope: Union[list[float], None]) -> bytes:
+        """
+        Encodes size prefixed header.
+
+        Args:
+            envelope (Union[list[float], None]): Layer bounding box
+
+        Returns:
+            bytes: Encoded header
+        """
+        columns = [Table(("offset", name), ("B", column_type))
+                   for name, column_type in self.columns]
+        header = encode(Table(
+            ("offset", self.name),
+            ("offset", Vector("d", envelope)) if envelope else None,
+            ("B", self.geometry_type), None, None, None, None,
+            ("offset", columns), ("Q", len(self.boxes)), ("H", NODE_SIZE),
+            ("offset", Table(("offset", "EPSG"), ("i", 4326)))))
+        return struct.pack("<I", len(header)) + header
+
+    def close(self) -> None:
+        """Writes header, spatial index and sorted features.
+        """
+        if self._spool.closed:
+            return
+        boxes = np.array(self.boxes, dtype=float).reshape(-1, 4)
+        envelope = None
+        with open(self.file_path, "wb") as file:
+            if len(boxes):
+                envelope = [*boxes[:, :2].min(axis=0),
+                            *boxes[:, 2:].max(axis=0)]
+            file.write(MAGIC + self.header(envelope))
+            if envelope is not None:
+                order = self.write_index(file, boxes, envelope)
+                for i in order:
+                    self._spool.seek(self.offsets[i])
+                    file.write(self._spool.read(self.sizes[i]))
+        self._spool.close()
+
+    def write_index(self, file: BinaryIO, boxes: np.ndarray,
+                    envelope: list[float]) -> np.ndarray:
+        """
+        Sorts features along the Hilbert curve and writes packed R-tree.
+
+        Args:
+            file (BinaryIO): Output file
+            boxes (np.ndarray): Features bounding boxes
+            envelope (list[float]): Layer bounding box
+
+        Returns:
+            np.ndarray: Features order
+        """
+        width = envelope[2] - envelope[0]
+        height = envelope[3] - envelope[1]
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        x = np.floor(0xFFFF * (centers[:, 0] - envelope[0]) / width) \
+            if width else np.zeros(len(boxes))
+        y = np.floor(0xFFFF * (centers[:, 1] - envelope[1]) / height) \
+            if height else np.zeros(len(boxes))
+        # Descending order, as in the reference implementation
+        order = np.argsort(-hilbert(x, y).astype(np.int64), kind="stable")
+
+        bounds = level_bounds(len(boxes))
+        nodes = np.zeros((bounds[0][1], 4))
+        node_offsets = np.zeros(bounds[0][1], dtype=np.uint64)
+        start, end = bounds[0]
+        nodes[start:end] = boxes[order]
+        sizes = np.asarray(self.sizes)[order]
+        node_offsets[start:end] = np.concatenate(([0], np.cumsum(sizes)))[
+            :-1]
+        for (start, end), (parent, _) in zip(bounds, bounds[1:]):
+            for first in range(start, end, NODE_SIZE):
+                last = min(first + NODE_SIZE, end)
+                nodes[parent] = [*nodes[first:last, :2].min(axis=0),
+                                 *nodes[first:last, 2:].max(axis=0)]
+                node_offsets[parent] = first
+                parent += 1
+        for node, offset in zip(nodes, node_offsets):
+            file.write(NODE_ITEM.pack(*node, int(offset)))
+        return order
+
+    def discard(self) -> None:
+        """Drops spooled features without writing the file.
+        """
+        self._spool.close()
@@ -0,0 +1,348 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import numpy as np
+import shapely
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, Sequence, Union
+from tempdata import TempData
+# imports for types
+from shapely.geometry.base import BaseGeometry
+
+POLYGON_TYPES = ("Polygon", "MultiPolygon")
+
+
+def load_border(data: Union[str, bytes]) -> BaseGeometry:
+    """
+    Parses region border returned by a data source.
+
+    Args:
+        data (Union[str, bytes]): Border wkt or wkb
+
+    Returns:
+        BaseGeometry: Border geometry
+    """
+    if isinstance(data, bytes):
+        return shapely.from_wkb(data)
+    return shapely.from_wkt(data)
+
+
+class PackedPolygons():
+    """
+    Polygons coordinates packed into a single (n, 2) float64 array with
+    rings offsets, about 16 bytes per vertex. It is a sequence of
+    (exterior ring, interior rings) tuples like borders restored from the
+    journal, but its rings are views of the packed array, so borders are
+    handed to the exporters without copying coordinates.
+    """
+    __slots__ = ("coords", "ring_offsets", "polygon_offsets")
+
+    def __init__(self, coords: np.ndarray, ring_offsets: np.ndarray,
+                 polygon_rings: np.ndarray) -> None:
+        """
+        Args:
+            coords (np.ndarray): Coordinates of all rings
+            ring_offsets (np.ndarray): Rings start indexes in "coords" and
+                the end of the last ring
+            polygon_rings (np.ndarray): Number of rings of every polygon
+                (exterior ring first)
+        """
+        self.coords = coords
+        self.ring_offsets = ring_offsets
+        # Index of the first ring of every polygon and the rings number
+        self.polygon_offsets = np.zeros(len(polygon_rings) + 1,
+                                        dtype=np.int64)
+        np.cumsum(polygon_rings, out=self.polygon_offsets[1:])
+
+    @classmethod
+    def from_rings(cls, polygons: Sequence[
+            tuple[Sequence, Sequence[Sequence]]]) -> PackedPolygons:
+        """
+        Packs polygons rings coordinates.
+
+        Args:
+            polygons (Sequence[tuple[Sequence, Sequence[Sequence]]]):
+                (exterior ring, interior rings) coordinates of every polygon
+
+        Returns:
+            PackedPolygons: Packed polygons, the same object if they are
+                packed already
+        """
+        if isinstance(polygons, cls):
+            return polygons
+        rings = [np.asarray(ring, dtype=float).reshape(-1, 2)
+                 for outer, inner in polygons for ring in [outer, *inner]]
+        ring_offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+        np.cumsum([len(ring) for ring in rings], out=ring_offsets[1:])
+        coords = np.concatenate(rings) if rings else np.empty((0, 2))
+        return cls(coords, ring_offsets,
+                   np.array([1 + len(inner) for _, inner in polygons],
+                            dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.polygon_offsets) - 1
+
+    def __getitem__(self, index: int) -> tuple[np.ndarray, list[np.ndarray]]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("polygon index out of range")
+        first, end = self.polygon_offsets[index:index + 2].tolist()
+        return (self.ring(first),
+                [self.ring(ring) for ring in range(first + 1, end)])
+
+    def __iter__(self) -> Iterator[tuple[np.ndarray, list[np.ndarray]]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def ring(self, index: int) -> np.ndarray:
+        """
+        Returns ring coordinates view.
+
+        Args:
+            index (int): Ring index (of all polygons)
+
+        Returns:
+            np.ndarray: (n, 2) coordinates array
+        """
+        start, end = self.ring_offsets[index:index + 2].tolist()
+        return self.coords[start:end]
+
+    def polygon(self, index: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns coordinates of all polygon rings as a single view.
+
+        Args:
+            index (int): Polygon index
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (n, 2) coordinates array and
+                rings ends in it
+        """
+        first, end = self.polygon_offsets[index:index + 2].tolist()
+        start = self.ring_offsets[first]
+        return (self.coords[start:self.ring_offsets[end]],
+                self.ring_offsets[first + 1:end + 1] - start)
+
+    def bounds(self) -> tuple[float, float, float, float]:
+        """
+        Returns bounding box of all polygons.
+
+        Returns:
+            tuple[float, float, float, float]: (min x, min y, max x, max y)
+        """
+        return (*self.coords.min(axis=0).tolist(),
+                *self.coords.max(axis=0).tolist())  # type: ignore
+
+
+def prepare_polygons(geometry: BaseGeometry, tolerance: Union[float, None],
+                     precision: int, holes: bool) -> dict:
+    """
+    Simplifies and rounds (multi)polygon and packs its rings coordinates
+    into a single array, parsed geometry coordinates are never converted
+    into Python objects.
+
+    Args:
+        geometry (BaseGeometry): Polygon or MultiPolygon
+        tolerance (Union[float, None]): Simplification tolerance in
+            degrees, None to keep all vertices
+        precision (int): Rounding decimal digits, -1 to disable rounding
+        holes (bool): Keep interior rings
+
+    Returns:
+        dict: {"polygons": packed polygons, "vertices": (vertices before,
+            vertices after)}
+    """
+    polygons = shapely.get_parts(geometry)
+    polygons = polygons[~shapely.is_empty(polygons)]
+    vertices_before = int(shapely.get_num_coordinates(polygons).sum())
+    if tolerance is not None:
+        polygons = shapely.simplify(polygons, tolerance,
+                                    preserve_topology=True)
+    if precision >= 0:
+        polygons = shapely.transform(
+            polygons, lambda c: np.round(c, precision))
+    vertices_after = int(shapely.get_num_coordinates(polygons).sum())
+    if holes:
+        # 'get_rings' returns exterior ring first for each polygon
+        rings, polygon_index = shapely.get_rings(polygons, return_index=True)
+        polygon_rings = np.bincount(polygon_index, minlength=len(polygons))
+    else:
+        rings = shapely.get_exterior_ring(polygons)
+        polygon_rings = np.ones(len(polygons), dtype=np.int64)
+    ring_offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    np.cumsum(shapely.get_num_coordinates(rings), out=ring_offsets[1:])
+    return {"polygons": PackedPolygons(shapely.get_coordinates(rings),
+                                       ring_offsets, polygon_rings),
+            "vertices": (vertices_before, vertices_after)}
+
+
+def prepare_border(data: Union[str, bytes], tolerance: Union[float, None],
+                   precision: int, holes: bool) -> dict:
+    """
+    Parses region border and prepares its polygons. Runs in geometry
+    worker processes (see 'GeometryPool'), so only plain data and arrays
+    are passed in and out.
+
+    Args:
+        data (Union[str, bytes]): Border wkt or wkb
+        tolerance (Union[float, None]): Simplification tolerance in
+            degrees, None to keep all vertices
+        precision (int): Rounding decimal digits, -1 to disable rounding
+        holes (bool): Keep interior rings
+
+    Returns:
+        dict: {"geom_type": border geometry type} dictionary, updated with
+            'prepare_polygons' result for polygons
+    """
+    geometry = load_border(data)
+    border = {"geom_type": geometry.geom_type}
+    if geometry.geom_type in POLYGON_TYPES:
+        border.update(prepare_polygons(geometry, tolerance, precision, holes))
+    return border
+
+
+class GeometryProcessor():
+    """
+    Prepares region borders for export: topology-preserving simplification
+    with tolerance depending on administrative level, coordinates precision
+    rounding and interior rings (holes) extraction. All polygons of a region
+    are processed at once with shapely 2 vectorized functions.
+    """
+    def __init__(self, Tmp: TempData) -> None:
+        """
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+        """
+        self.Tmp = Tmp
+
+    def tolerance(self, admin_level: Union[int, None]) -> float:
+        """
+        Returns simplification tolerance for the administrative level.
+
+        Args:
+            admin_level (Union[int, None]): Region administrative level
+
+        Returns:
+            float: Tolerance in degrees
+        """
+        return self.Tmp.simplify_tolerance_by_level.get(
+            admin_level, self.Tmp.simplify_tolerance)  # type: ignore
+
+    def options(self, admin_level: Union[int, None] = None) -> tuple[
+            Union[float, None], int, bool]:
+        """
+        Returns 'prepare_polygons' settings for the administrative level.
+
+        Args:
+            admin_level (Union[int, None], optional): Region administrative
+                level. Defaults to None.
+
+        Returns:
+            tuple[Union[float, None], int, bool]: Tolerance, precision and
+                holes export
+        """
+        tolerance = self.tolerance(admin_level) if self.Tmp.simplify else None
+        return (tolerance, self.Tmp.coordinates_precision,
+                self.Tmp.export_holes)
+
+    def unpack(self, packed: dict) -> PackedPolygons:
+        """
+        Logs simplification result of the 'prepare_polygons' result.
+
+        Args:
+            packed (dict): 'prepare_polygons' result
+
+        Returns:
+            PackedPolygons: Prepared polygons
+        """
+        vertices_before, vertices_after = packed["vertices"]
+        if vertices_before:
+            self.Tmp.logger_object.info(
+                f"{self.Tmp.current_sub_obj_name}: {vertices_before} -> "
+                f"{vertices_after} vertices")
+        return packed["polygons"]
+
+    def prepare(self, geometry: BaseGeometry,
+                admin_level: Union[int, None] = None) -> PackedPolygons:
+        """
+        Simplifies and rounds (multi)polygon and packs its rings.
+
+        Args:
+            geometry (BaseGeometry): Polygon or MultiPolygon
+            admin_level (Union[int, None], optional): Region administrative
+                level. Defaults to None.
+
+        Returns:
+            PackedPolygons: (exterior ring, interior rings) coordinates
+                arrays of every polygon
+        """
+        return self.unpack(prepare_polygons(
+            geometry, *self.options(admin_level)))
+
+    def borders(self, border: dict,
+                admin_level: Union[int, None] = None) -> Union[dict, None]:
+        """
+        Creates exported borders from the 'prepare_border' result.
+
+        Args:
+            border (dict): Prepared border
+            admin_level (Union[int, None], optional): Region administrative
+                level. Defaults to None.
+
+        Returns:
+            Union[dict, None]: {"multi": is multi-polygon, "polygons":
+                packed polygons, "admin_level":
+                region administrative level} dictionary or None if border
+                is not a polygon
+        """
+        if border["geom_type"] not in POLYGON_TYPES:
+            return None
+        return {"multi": border["geom_type"] == "MultiPolygon",
+                "polygons": self.unpack(border),
+                "admin_level": admin_level}
+
+
+class GeometryPool():
+    """
+    Process pool preparing region borders ('prepare_border') while the
+    crawler exports previous regions, so parsing and simplification of
+    large borders keep all cores busy. Workers receive border wkt (or wkb)
+    and return 'PackedPolygons' arrays.
+    """
+    def __init__(self, Tmp: TempData) -> None:
+        """
+        Starts worker processes ('geometry_workers' setting, all CPUs if
+        negative).
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+        """
+        self.processor = GeometryProcessor(Tmp)
+        self.workers = Tmp.geometry_workers
+        if self.workers < 0:
+            self.workers = os.cpu_count() or 1
+        # Spawned workers don't inherit crawler threads and their locks
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, data: Union[str, bytes],
+               admin_level: Union[int, None] = None) -> Future:
+        """
+        Schedules region border preparation.
+
+        Args:
+            data (Union[str, bytes]): Border wkt or wkb
+            admin_level (Union[int, None], optional): Region administrative
+                level. Defaults to None.
+
+        Returns:
+            Future: Future of the 'prepare_border' result
+        """
+        return self._executor.submit(
+            prepare_border, data, *self.processor.options(admin_level))
+
+    def close(self) -> None:
+        """Stops worker processes, dropping not started preparations.
+        """
+        self._executor.shutdown(cancel_futures=True)
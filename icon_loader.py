@@ -0,0 +1,106 @@
+import hashlib
+import os
+import threading
+import requests
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+
+class IconLoader():
+    """
+    Downloads search results icons in background threads through a shared
+    connection pool. Icons are cached in memory and on disk by URL, and
+    simultaneous requests of the same URL share a single download.
+    """
+    def __init__(self, cache_dir: str = ".//cache//icons//",
+                 max_workers: int = 4, timeout: float = 10) -> None:
+        """
+        Args:
+            cache_dir (str, optional): Icons disk cache directory.
+                Defaults to ".//cache//icons//".
+            max_workers (int, optional): Number of download threads and
+                pooled connections. Defaults to 4.
+            timeout (float, optional): Download timeout in seconds.
+                Defaults to 10.
+        """
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers,
+                              pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="icon_loader")
+        self._memory: dict[str, bytes] = {}
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def cache_path(self, url: str) -> str:
+        """
+        Returns disk cache file path of the icon.
+
+        Args:
+            url (str): Icon URL
+
+        Returns:
+            str: Cache file path
+        """
+        return os.path.join(self.cache_dir,
+                            hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def load(self, url: str) -> Future:
+        """
+        Starts icon loading. Cached icon is returned in already completed
+        future.
+
+        Args:
+            url (str): Icon URL
+
+        Returns:
+            Future: Future with icon content (bytes)
+        """
+        with self._lock:
+            if url in self._memory:
+                future: Future = Future()
+                future.set_result(self._memory[url])
+                return future
+            if url not in self._in_flight:
+                self._in_flight[url] = self._executor.submit(
+                    self._fetch, url)
+            return self._in_flight[url]
+
+    def _fetch(self, url: str) -> bytes:
+        """
+        Reads icon from disk cache or downloads it.
+
+        Args:
+            url (str): Icon URL
+
+        Returns:
+            bytes: Icon content
+        """
+        try:
+            path = self.cache_path(url)
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    content = file.read()
+            else:
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                content = response.content
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(path, "wb") as file:
+                    file.write(content)
+            with self._lock:
+                self._memory[url] = content
+            return content
+        finally:
+            with self._lock:
+                self._in_flight.pop(url, None)
+
+    def shutdown(self) -> None:
+        """Stops download threads and closes connections.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,164 @@
+import io
+import os
+import zipfile
+from typing import Iterable, Union
+
+# xml.sax.saxutils.escape replacements, without importing urllib with it
+_XML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+
+def escape(text: str) -> str:
+    """Escapes '&', '<' and '>' of XML text.
+    """
+    return text.translate(_XML_ESCAPES)
+
+
+def kml_color(hex_color: str, alpha: str = "ff") -> str:
+    """
+    Converts "#rrggbb" color code into KML "aabbggrr" format.
+
+    Args:
+        hex_color (str): HEX color code
+        alpha (str, optional): HEX alpha value. Defaults to "ff".
+
+    Returns:
+        str: KML color code
+    """
+    rgb = hex_color.lstrip("#")
+    return f"{alpha}{rgb[4:6]}{rgb[2:4]}{rgb[0:2]}".lower()
+
+
+class KMLStreamWriter():
+    """
+    Writes KML (or zipped KMZ) document incrementally: folders, polygons,
+    lines and points are written to disk as soon as they are added, so
+    memory usage doesn't depend on the document size. Border style is
+    declared once and shared by all polygons and lines.
+    """
+    BORDER_STYLE = "border"
+
+    def __init__(self, file_path: str, doc_name: str,
+                 line_color: str, line_width: int, kmz: bool = False) -> None:
+        """
+        Opens output file and writes document header with shared styles.
+
+        Args:
+            file_path (str): Output file path
+            doc_name (str): Document name
+            line_color (str): Borders HEX color code
+            line_width (int): Borders width
+            kmz (bool, optional): Zip document into KMZ archive.
+                Defaults to False.
+        """
+        self.file_path = file_path
+        self.folders_depth = 0
+        self._zip: Union[zipfile.ZipFile, None] = None
+        if kmz:
+            self._zip = zipfile.ZipFile(
+                file_path, "w", compression=zipfile.ZIP_DEFLATED)
+            self._file = io.TextIOWrapper(
+                self._zip.open("doc.kml", "w"), encoding="utf-8")
+        else:
+            self._file = open(file_path, "w", encoding="utf-8")
+        self._file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<kml xmlns="http://www.opengis.net/kml/2.2">\n'
+            f'<Document><name>{escape(doc_name)}</name>\n'
+            f'<Style id="{self.BORDER_STYLE}">'
+            f'<LineStyle><color>{kml_color(line_color)}</color>'
+            f'<width>{line_width}</width></LineStyle>'
+            '<PolyStyle><fill>0</fill></PolyStyle></Style>\n')
+
+    @staticmethod
+    def coordinates(coords: Iterable) -> str:
+        """
+        Formats coordinates into KML 'coordinates' element.
+
+        Args:
+            coords (Iterable): (lon, lat) coordinates or coordinates array
+
+        Returns:
+            str: KML 'coordinates' element
+        """
+        if hasattr(coords, "tolist"):
+            # Python floats are formatted much faster than numpy scalars
+            coords = coords.tolist()  # type: ignore
+        return "<coordinates>" + " ".join(
+            f"{c[0]},{c[1]},0" for c in coords) + "</coordinates>"
+
+    def open_folder(self, name: str) -> None:
+        """Opens new folder. All objects added later are placed into it.
+
+        Args:
+            name (str): Folder name
+        """
+        self._file.write(f"<Folder><name>{escape(str(name))}</name>\n")
+        self.folders_depth += 1
+
+    def close_folder(self) -> None:
+        """Closes last opened folder.
+        """
+        self._file.write("</Folder>\n")
+        self.folders_depth -= 1
+
+    def add_polygon(self, name: str, outer: Iterable,
+                    inner: Iterable[Iterable] = ()) -> None:
+        """Adds not filled polygon with shared border style.
+
+        Args:
+            name (str): Polygon name
+            outer (Iterable): Outer boundary coordinates
+            inner (Iterable[Iterable], optional): Inner boundaries (holes)
+                coordinates. Defaults to ().
+        """
+        holes = "".join(
+            f"<innerBoundaryIs><LinearRing>{self.coordinates(ring)}"
+            "</LinearRing></innerBoundaryIs>" for ring in inner)
+        self._file.write(
+            f"<Placemark><name>{escape(str(name))}</name>"
+            f"<styleUrl>#{self.BORDER_STYLE}</styleUrl><Polygon>"
+            f"<outerBoundaryIs><LinearRing>{self.coordinates(outer)}"
+            f"</LinearRing></outerBoundaryIs>{holes}</Polygon></Placemark>\n")
+
+    def add_linestring(self, name: str, coords: Iterable) -> None:
+        """Adds line with shared border style.
+
+        Args:
+            name (str): Line name
+            coords (Iterable): Line coordinates
+        """
+        self._file.write(
+            f"<Placemark><name>{escape(str(name))}</name>"
+            f"<styleUrl>#{self.BORDER_STYLE}</styleUrl><LineString>"
+            f"{self.coordinates(coords)}</LineString></Placemark>\n")
+
+    def add_point(self, name: str, lon: float, lat: float) -> None:
+        """Adds point.
+
+        Args:
+            name (str): Point name
+            lon (float): Point longitude
+            lat (float): Point latitude
+        """
+        self._file.write(
+            f"<Placemark><name>{escape(str(name))}</name><Point>"
+            f"{self.coordinates([(lon, lat)])}</Point></Placemark>\n")
+
+    def close(self) -> None:
+        """Closes all opened folders, the document and output file.
+        """
+        if self._file.closed:
+            return
+        while self.folders_depth > 0:
+            self.close_folder()
+        self._file.write("</Document>\n</kml>\n")
+        self._file.close()
+        if self._zip is not None:
+            self._zip.close()
+
+    def discard(self) -> None:
+        """Closes and removes unfinished output file.
+        """
+        self.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
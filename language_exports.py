@@ -0,0 +1,93 @@
+from __future__ import annotations
+import os
+from typing import TYPE_CHECKING, Union
+from kml_writer import KMLStreamWriter
+from table_export import TableExport
+
+if TYPE_CHECKING:
+    from earth_crawler import EarthCrawler
+
+
+class LanguageExports():
+    """
+    Kml and locations table exports of a search object in additional
+    languages ('export_languages' setting). Borders and points of every
+    region are exported once more with names translated during the crawl
+    (points rows "names" key), so a single crawl produces all languages.
+    """
+    def __init__(self, Crawler: EarthCrawler, obj_name: str) -> None:
+        """
+        Opens exports of every additional language.
+
+        Args:
+            Crawler (EarthCrawler): Crawler instance, which settings and
+                kml helpers are used
+            obj_name (str): Search object name used in files names
+        """
+        self.Crawler = Crawler
+        Tmp = Crawler.Tmp
+        self.kml_docs: dict[str, KMLStreamWriter] = {}
+        self.tables: dict[str, TableExport] = {}
+        try:
+            for language in Crawler.extra_languages:
+                if Tmp.export_to_kml:
+                    kml_path = os.path.join(
+                        Tmp.export_dir,
+                        Crawler.kml_file_name(obj_name, language))
+                    self.kml_docs[language] = KMLStreamWriter(
+                        kml_path, obj_name, Tmp.line_color, Tmp.line_width,
+                        Tmp.kmz)
+                if Tmp.search_locations and Tmp.export_to_excel:
+                    self.tables[language] = TableExport(
+                        Tmp, f"{Tmp.current_obj_name} ({language})")
+        except Exception:
+            self.discard()
+            raise
+
+    def add_region(self, tags: dict, borders: Union[dict, None],
+                   points: Union[list[dict], None], folder: bool) -> None:
+        """
+        Exports region borders and points in every language.
+
+        Args:
+            tags (dict): Region tags
+            borders (Union[dict, None]): Exported region borders (see
+                'EarthCrawler.add_region_borders')
+            points (Union[list[dict], None]): Exported region points rows
+            folder (bool): Put region into its own kml folder
+        """
+        names = self.Crawler.translated_names(tags)
+        for language in self.Crawler.extra_languages:
+            kml_doc = self.kml_docs.get(language)
+            if folder and kml_doc is not None:
+                kml_doc.open_folder(names[language])
+            if borders is not None and kml_doc is not None:
+                self.Crawler.add_kml_borders(
+                    kml_doc, names[language], borders)
+            if points is not None:
+                rows = [{**row, **row.get("names", {}).get(language, {})}
+                        for row in points]
+                if kml_doc is not None:
+                    for row in rows:
+                        kml_doc.add_point(
+                            row["location"], row["lon"], row["lat"])
+                if language in self.tables:
+                    self.tables[language].add(names[language], rows)
+            if folder and kml_doc is not None:
+                kml_doc.close_folder()
+
+    def close(self) -> None:
+        """Finishes all output files.
+        """
+        for kml_doc in self.kml_docs.values():
+            kml_doc.close()
+        for table in self.tables.values():
+            table.close()
+
+    def discard(self) -> None:
+        """Removes all unfinished output files.
+        """
+        for kml_doc in self.kml_docs.values():
+            kml_doc.discard()
+        for table in self.tables.values():
+            table.discard()
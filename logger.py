@@ -1,38 +1,139 @@
-import logging
-
-
-def set_logger(
-        name: str = __name__, log_level_name: str = "DEBUG") -> logging.Logger:
-    """Creates and configures logger instance.
-
-    Args:
-        name (str, optional):
-            Logger's name. Defaults to __name__.
-        log_level_name (str, optional):
-            Logging level name ("NOTSET", "DEBUG", "INFO", "WARNING",
-            "ERROR", "CRITICAL"). Defaults to "DEBUG".
-
-    Returns:
-        logging.Logger: Logger instance
-    """
-    _log_format = "%(asctime)s - [%(levelname)s] - %(name)s - "\
-        "(%(filename)s).%(funcName)s(%(lineno)d) - %(message)s"
-    formatter = logging.Formatter(_log_format)
-    levels_dict = {"NOTSET": 0, "DEBUG": 10, "INFO": 20, "WARNING": 30,
-                   "ERROR": 40, "CRITICAL": 50}
-    logger = logging.getLogger(name)
-
-    if log_level_name.upper() in levels_dict:
-        log_level = levels_dict[log_level_name]
-    else:
-        log_level = levels_dict["DEBUG"]
-
-    logging.basicConfig(level=log_level, format=_log_format)
-    # logger.setLevel(log_level)
-    file_handler = logging.FileHandler(".//logs//last_run.log", "w")
-    file_handler.setFormatter(formatter)
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
-    return logger
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# Folder of log files
+LOG_DIR = ".//logs//"
+# (logger, queue handler, listener) of every configured logger
+_queues: list[tuple[logging.Logger, QueueHandler, QueueListener]] = []
+# Process running the listener threads, forked processes inherit queue
+# handlers, but not the threads
+_owner_pid = os.getpid()
+# Log files of forked processes are appended to
+_file_mode = "w"
+
+
+def _queue_handler(logger: logging.Logger,
+                   *handlers: logging.Handler) -> QueueHandler:
+    """
+    Attaches non-blocking queue handler to the logger. Records are written
+    to the given handlers by a listener thread, so logging thread never
+    waits for console or file I/O.
+
+    Args:
+        logger (logging.Logger): Logger instance
+        *handlers (logging.Handler): Handlers fed by the listener
+
+    Returns:
+        QueueHandler: Attached queue handler
+    """
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(records)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    logger.addHandler(queue_handler)
+    _queues.append((logger, queue_handler, listener))
+    return queue_handler
+
+
+def stop_logging() -> None:
+    """
+    Writes queued records and stops listener threads. Loggers are
+    configured again by the next 'set_logger' call.
+    """
+    while _queues:
+        logger, queue_handler, listener = _queues.pop()
+        logger.removeHandler(queue_handler)
+        logging.getLogger().removeHandler(queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def flush_logging() -> None:
+    """Waits until all queued records are written.
+    """
+    for _, _, listener in _queues:
+        # Stopping listener writes the queue up to its sentinel
+        listener.stop()
+        listener.start()
+
+
+def _forget_inherited() -> None:
+    """
+    Detaches queue handlers inherited by a forked process. Their
+    listeners run in the parent process, so nothing would write records
+    of this process.
+    """
+    while _queues:
+        logger, queue_handler, _ = _queues.pop()
+        logger.removeHandler(queue_handler)
+        logging.getLogger().removeHandler(queue_handler)
+
+
+atexit.register(stop_logging)
+
+
+def set_logger(
+        name: str = __name__, log_level_name: str = "DEBUG") -> logging.Logger:
+    """
+    Creates and configures logger instance and its "metrics" child,
+    which writes crawl metrics JSON lines to metrics.jsonl. Log files are
+    written to 'LOG_DIR' folder. Records
+    are passed to console and file handlers through a queue. Logger is
+    configured only once per process, later calls just change its level.
+    Forked processes (crawl jobs pool) configure it again, appending to
+    the parent process log files.
+
+    Args:
+        name (str, optional):
+            Logger's name. Defaults to __name__.
+        log_level_name (str, optional):
+            Logging level name ("NOTSET", "DEBUG", "INFO", "WARNING",
+            "ERROR", "CRITICAL"). Defaults to "DEBUG".
+
+    Returns:
+        logging.Logger: Logger instance
+    """
+    _log_format = "%(asctime)s - [%(levelname)s] - %(name)s - "\
+        "(%(filename)s).%(funcName)s(%(lineno)d) - %(message)s"
+    levels_dict = {"NOTSET": 0, "DEBUG": 10, "INFO": 20, "WARNING": 30,
+                   "ERROR": 40, "CRITICAL": 50}
+    logger = logging.getLogger(name)
+
+    if log_level_name.upper() in levels_dict:
+        log_level = levels_dict[log_level_name.upper()]
+    else:
+        log_level = levels_dict["DEBUG"]
+    logger.setLevel(log_level)
+    global _owner_pid, _file_mode
+    if _queues and _owner_pid != os.getpid():
+        _forget_inherited()
+        _file_mode = "a"
+    _owner_pid = os.getpid()
+    if any(isinstance(handler, QueueHandler) for handler in logger.handlers):
+        return logger
+
+    formatter = logging.Formatter(_log_format)
+    file_handler = logging.FileHandler(
+        os.path.join(LOG_DIR, "last_run.log"), _file_mode, encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    queue_handler = _queue_handler(logger, file_handler, stream_handler)
+    logger.propagate = False
+    # Other libraries (OSMPythonTools) log through the same queue
+    logging.basicConfig(
+        level=log_level, format="%(message)s", handlers=[queue_handler])
+
+    # Crawl metrics events are JSON lines kept apart from readable log
+    metrics_logger = logger.getChild("metrics")
+    metrics_logger.propagate = False
+    metrics_logger.setLevel(logging.INFO)
+    metrics_handler = logging.FileHandler(
+        os.path.join(LOG_DIR, "metrics.jsonl"), _file_mode, encoding="utf-8")
+    metrics_handler.setFormatter(logging.Formatter("%(message)s"))
+    _queue_handler(metrics_logger, metrics_handler)
+    return logger
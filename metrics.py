@@ -0,0 +1,215 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Union
+from tempdata import TempData
+
+
+def percentile(values: list[float], fraction: float) -> Union[float, None]:
+    """
+    Computes percentile of values (nearest rank).
+
+    Args:
+        values (list[float]): Values
+        fraction (float): Percentile fraction (0.5 - median)
+
+    Returns:
+        Union[float, None]: Percentile or None if there are no values
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CrawlMetrics():
+    """
+    Thread-safe crawl instrumentation: per-stage wall time and per-endpoint
+    requests, latencies, downloaded bytes, retries and errors. Cache hits
+    and misses are counted by the cache itself in Tmp parameters. Every
+    finished stage and the final summary are written as JSON lines by the
+    "metrics" child of the crawl logger (see 'logger.set_logger').
+    """
+    def __init__(self, Tmp: TempData) -> None:
+        """
+        Resets crawl counters of Tmp parameters, which may be left by the
+        previous crawl (GUI searches share Tmp).
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+        """
+        self.Tmp = Tmp
+        Tmp.regions_done = 0
+        Tmp.points_done = 0
+        Tmp.failed_objects.clear()
+        Tmp.cache_hits.clear()
+        Tmp.cache_misses.clear()
+        self.logger = Tmp.logger_object.getChild("metrics")
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        # Regions throughput clock of the current search object
+        self.regions_started: Union[float, None] = None
+        self.regions_before = 0
+        self.stages: dict[str, dict[str, float]] = {}
+        self.endpoints: dict[str, dict[str, Any]] = {}
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """
+        Writes metrics event as a JSON line.
+
+        Args:
+            event (str): Event name
+            **fields (Any): Event fields
+        """
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(json.dumps(
+                {"event": event, "time": round(time.time(), 3), **fields},
+                ensure_ascii=False))
+
+    @contextmanager
+    def stage(self, name: str, **fields: Any) -> Iterator[None]:
+        """
+        Measures wall time of a crawl stage.
+
+        Args:
+            name (str): Stage name
+            **fields (Any): Additional fields of the stage event
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                stage = self.stages.setdefault(
+                    name, {"count": 0, "seconds": 0.0})
+                stage["count"] += 1
+                stage["seconds"] += elapsed
+            self.emit("stage", stage=name, seconds=round(elapsed, 4),
+                      **fields)
+
+    def _endpoint(self, endpoint: str) -> dict[str, Any]:
+        """
+        Returns endpoint counters. Has to be called with the lock acquired.
+
+        Args:
+            endpoint (str): Endpoint name ("nominatim" or "overpass")
+
+        Returns:
+            dict[str, Any]: Endpoint counters
+        """
+        return self.endpoints.setdefault(endpoint, {
+            "requests": 0, "errors": 0, "retries": 0, "bytes": 0,
+            "latencies": []})
+
+    def record_request(self, endpoint: str, seconds: float, size: int,
+                       failed: bool = False) -> None:
+        """
+        Records downloaded (not cached) request.
+
+        Args:
+            endpoint (str): Endpoint name ("nominatim" or "overpass")
+            seconds (float): Request latency
+            size (int): Response size in bytes
+            failed (bool, optional): Request failed. Defaults to False.
+        """
+        with self._lock:
+            counters = self._endpoint(endpoint)
+            counters["requests"] += 1
+            counters["errors"] += failed
+            counters["bytes"] += size
+            counters["latencies"].append(seconds)
+
+    def record_retry(self, endpoint: str) -> None:
+        """
+        Records retry of a failed query.
+
+        Args:
+            endpoint (str): Endpoint name ("nominatim" or "overpass")
+        """
+        with self._lock:
+            self._endpoint(endpoint)["retries"] += 1
+
+    def start_regions(self) -> None:
+        """Starts regions throughput clock of the next search object.
+        """
+        self.regions_started = time.monotonic()
+        self.regions_before = self.Tmp.regions_done
+
+    def throughput(self) -> Union[tuple[float, Union[float, None]], None]:
+        """
+        Computes regions throughput of the current search object and time
+        left until it is finished.
+
+        Returns:
+            Union[tuple[float, Union[float, None]], None]: (regions per
+                minute, ETA in seconds or None if unknown) or None if no
+                region is exported yet
+        """
+        if self.regions_started is None:
+            return None
+        elapsed = time.monotonic() - self.regions_started
+        regions_done = self.Tmp.regions_done - self.regions_before
+        if regions_done == 0 or elapsed <= 0:
+            return None
+        rate = regions_done / elapsed
+        left = self.Tmp.current_area_obj_number - \
+            self.Tmp.current_area_obj - 1
+        return rate * 60, left / rate if left >= 0 else None
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Summarizes crawl metrics.
+
+        Returns:
+            dict[str, Any]: Elapsed time, regions and points counters,
+                {stage: {"count", "seconds"}} and {endpoint: {"requests",
+                "errors", "retries", "bytes", "p50_ms", "p95_ms",
+                "cache_hits", "cache_misses"}}
+        """
+        with self._lock:
+            endpoints = {}
+            for name in sorted({*self.endpoints, *self.Tmp.cache_hits,
+                                *self.Tmp.cache_misses}):
+                counters = dict(self._endpoint(name))
+                latencies = counters.pop("latencies")
+                endpoints[name] = {
+                    **counters,
+                    **{f"p{int(fraction * 100)}_ms": None if value is None
+                       else round(value * 1000, 1)
+                       for fraction, value in (
+                           (0.5, percentile(latencies, 0.5)),
+                           (0.95, percentile(latencies, 0.95)))},
+                    "cache_hits": self.Tmp.cache_hits.get(name, 0),
+                    "cache_misses": self.Tmp.cache_misses.get(name, 0)}
+            return {
+                "seconds": round(time.monotonic() - self.started, 3),
+                "regions": self.Tmp.regions_done,
+                "points": self.Tmp.points_done,
+                "stages": {name: {"count": stage["count"],
+                                  "seconds": round(stage["seconds"], 3)}
+                           for name, stage in self.stages.items()},
+                "endpoints": endpoints}
+
+    def log_summary(self) -> dict[str, Any]:
+        """
+        Writes crawl summary as a metrics event and a readable log message.
+
+        Returns:
+            dict[str, Any]: Summary (see 'summary')
+        """
+        summary = self.summary()
+        self.emit("summary", **summary)
+        self.Tmp.logger_object.info(
+            f"Crawled {summary['regions']} regions and {summary['points']}"
+            f" points in {summary['seconds']} s")
+        for name, counters in summary["endpoints"].items():
+            self.Tmp.logger_object.info(
+                f"{name}: {counters['requests']} requests "
+                f"(p50 {counters['p50_ms']} ms, p95 {counters['p95_ms']} ms, "
+                f"{counters['bytes']} bytes), {counters['retries']} retries, "
+                f"{counters['errors']} errors, {counters['cache_hits']} "
+                "cache hits")
+        return summary
@@ -0,0 +1,105 @@
+import os
+import threading
+import numpy as np
+from typing import Union
+
+
+class Minimap():
+    """
+    Search results minimap. World base map is rendered by Basemap only
+    once and cached as a raster (in memory and on disk), while result
+    markers are drawn on copies of the cached raster with numpy, so
+    minimaps are created in milliseconds in any thread.
+    """
+    MARKER_COLOR = (255, 0, 0, 255)
+    MARKER_EDGE_COLOR = (0, 0, 255, 255)
+
+    def __init__(self, width: int = 300,
+                 cache_dir: str = ".//cache//") -> None:
+        """
+        Args:
+            width (int, optional): Minimap width in pixels, height is a half
+                of it. Defaults to 300.
+            cache_dir (str, optional): Base map raster cache directory.
+                Defaults to ".//cache//".
+        """
+        self.width = width
+        self.height = width // 2
+        self.marker_radius = max(2, width // 60)
+        self.cache_file = os.path.join(cache_dir, f"minimap_{width}.npy")
+        self._base: Union[np.ndarray, None] = None
+        self._lock = threading.Lock()
+
+    @property
+    def base(self) -> np.ndarray:
+        """Base map RGBA raster, loaded from cache or rendered.
+        """
+        with self._lock:
+            if self._base is None:
+                if os.path.exists(self.cache_file):
+                    self._base = np.load(self.cache_file)
+                else:
+                    self._base = self.render_base()
+                    os.makedirs(os.path.dirname(self.cache_file) or ".",
+                                exist_ok=True)
+                    np.save(self.cache_file, self._base)
+            return self._base
+
+    def render_base(self) -> np.ndarray:
+        """
+        Renders world map in equirectangular projection filling the whole
+        raster. Uses matplotlib object API, so it is safe outside of the
+        main thread.
+
+        Returns:
+            np.ndarray: RGBA raster, (height, width, 4) shaped
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from mpl_toolkits.basemap import Basemap
+
+        dpi = 100
+        fig = Figure(figsize=(self.width / dpi, self.height / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.set_axis_off()
+        m = Basemap(ax=ax)
+        m.drawcoastlines(linewidth=0.3, ax=ax)
+        m.fillcontinents(ax=ax)
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+    def pixel(self, lat: float, lon: float) -> tuple[int, int]:
+        """
+        Converts coordinates into base map pixel.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+
+        Returns:
+            tuple[int, int]: (column, row) pixel
+        """
+        x = (lon + 180) / 360 * (self.width - 1)
+        y = (90 - lat) / 180 * (self.height - 1)
+        return round(x), round(y)
+
+    def render(self, lat: float, lon: float) -> np.ndarray:
+        """
+        Draws point marker on the base map copy.
+
+        Args:
+            lat (float): Point latitude
+            lon (float): Point longitude
+
+        Returns:
+            np.ndarray: RGBA raster, (height, width, 4) shaped
+        """
+        image = self.base.copy()
+        x, y = self.pixel(lat, lon)
+        rows, cols = np.ogrid[:self.height, :self.width]
+        distance = (cols - x)**2 + (rows - y)**2
+        image[distance <= (self.marker_radius + 1)**2] = \
+            self.MARKER_EDGE_COLOR
+        image[distance <= self.marker_radius**2] = self.MARKER_COLOR
+        return image
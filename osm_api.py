@@ -0,0 +1,236 @@
+import datetime
+import multiprocessing
+import random
+import threading
+import time
+import urllib.request
+from typing import Any, Union
+import ujson
+from OSMPythonTools.nominatim import Nominatim
+from OSMPythonTools.overpass import Overpass
+from tempdata import TempData
+from metrics import CrawlMetrics
+
+
+class TokenBucket():
+    """
+    Thread-safe token bucket limiting requests rate of a single endpoint.
+    """
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        """
+        Args:
+            rate (float): Tokens (requests) added per second
+            capacity (float, optional): Maximum number of stored tokens
+                (allowed burst). Defaults to 1.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes one token, borrowing it from the future if the bucket is
+        empty.
+
+        Returns:
+            float: Seconds to wait before the token can be used
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self) -> None:
+        """Blocks until one token is available.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket with capacity 1 shared by processes of a process pool.
+    Requests are scheduled in wall clock time kept in shared memory, so
+    parallel crawl jobs together stay within the endpoint rate limit.
+    """
+    def __init__(self, rate: float) -> None:
+        """
+        Args:
+            rate (float): Tokens (requests) added per second
+        """
+        self.rate = rate
+        self.capacity = 1
+        self.next_free = multiprocessing.Value("d", 0.0)
+
+    def reserve(self) -> float:
+        """
+        Takes the next free request time slot.
+
+        Returns:
+            float: Seconds to wait before the token can be used
+        """
+        with self.next_free.get_lock():
+            now = time.time()
+            start = max(now, self.next_free.value)
+            self.next_free.value = start + 1 / self.rate
+            return start - now
+
+
+# Buckets shared by all crawlers of the process, {endpoint name: bucket}
+_shared_buckets: dict[str, TokenBucket] = {}
+
+
+def use_shared_buckets(buckets: dict[str, TokenBucket]) -> None:
+    """
+    Makes APIs created later in this process use given rate limiters
+    instead of their own ones. Used as a process pool initializer.
+
+    Args:
+        buckets (dict[str, TokenBucket]): {"nominatim" or "overpass":
+            bucket}
+    """
+    _shared_buckets.clear()
+    _shared_buckets.update(buckets)
+
+
+def endpoint_bucket(endpoint: str, rate: float) -> TokenBucket:
+    """
+    Returns shared endpoint rate limiter if set, otherwise a new one.
+
+    Args:
+        endpoint (str): Endpoint name ("nominatim" or "overpass")
+        rate (float): Requests per second of a new bucket
+
+    Returns:
+        TokenBucket: Endpoint rate limiter
+    """
+    bucket: Union[TokenBucket, None] = _shared_buckets.get(endpoint)
+    return bucket if bucket is not None else TokenBucket(rate)
+
+
+class LimitedAPIMixin():
+    """
+    Adds token bucket rate limiting and retries with jittered exponential
+    backoff to OSMPythonTools API classes. Cached responses are returned
+    without waiting for a token. Downloads and retries are recorded in
+    crawl metrics.
+    """
+    def __init__(self, bucket: TokenBucket, max_retries: int,
+                 backoff_base: float, metrics: Union[CrawlMetrics, None],
+                 *args: Any, **kwargs: Any) -> None:
+        """
+        Args:
+            bucket (TokenBucket): Endpoint requests limiter
+            max_retries (int): Number of retries of a failed request
+            backoff_base (float): First retry maximum delay in seconds
+            metrics (Union[CrawlMetrics, None]): Crawl metrics or None
+        """
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.metrics = metrics
+        super().__init__(*args, **kwargs)
+
+    def query(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Queries API, retrying failed requests.
+
+        Returns:
+            Any: OSMPythonTools query result
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return super().query(*args, **kwargs)  # type: ignore
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                if self.metrics is not None:
+                    self.metrics.record_retry(self._prefix)  # type: ignore
+                time.sleep(random.uniform(0, self.backoff_base * 2**attempt))
+
+    def _waitForReady(self) -> Any:
+        """Called by OSMPythonTools right before each download.
+        """
+        self.bucket.acquire()
+        return super()._waitForReady()  # type: ignore
+
+    def _CacheObject__query(self, requestString: str,
+                            params: dict) -> dict:
+        """
+        Download of OSMPythonTools (private 'CacheObject.__query'), timed
+        for crawl metrics along with the size of the received body. If
+        OSMPythonTools renames the method, its own download is used and
+        requests are not recorded.
+
+        Args:
+            requestString (str): Query string
+            params (dict): Query parameters
+
+        Returns:
+            dict: Downloaded response with metadata
+        """
+        request = self._queryRequest(  # type: ignore
+            self._endpoint, requestString, params=params)  # type: ignore
+        if not isinstance(request, urllib.request.Request):
+            request = urllib.request.Request(request)
+        request.headers["User-Agent"] = self._userAgent()  # type: ignore
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(request) as response:
+                body = response.read()
+                encoding = response.info().get_content_charset("utf-8")
+        except Exception as err:
+            if self.metrics is not None:
+                self.metrics.record_request(
+                    self._prefix, time.monotonic() - start,  # type: ignore
+                    0, failed=True)
+            raise Exception(
+                f"The requested data could not be downloaded. {err}", err)
+        if self.metrics is not None:
+            self.metrics.record_request(
+                self._prefix, time.monotonic() - start,  # type: ignore
+                len(body))
+        return {"version": "1.0",
+                "response": ujson.loads(body.decode(encoding)),
+                "timestamp": datetime.datetime.now().isoformat()}
+
+
+class LimitedNominatim(LimitedAPIMixin, Nominatim):
+    """Rate limited Nominatim API.
+    """
+
+
+class LimitedOverpass(LimitedAPIMixin, Overpass):
+    """Rate limited Overpass API.
+    """
+
+
+def create_apis(Tmp: TempData, metrics: Union[CrawlMetrics, None] = None
+                ) -> tuple[LimitedNominatim, LimitedOverpass]:
+    """
+    Creates Nominatim and Overpass APIs instances configured in Tmp
+    parameters.
+
+    Args:
+        Tmp (TempData): Operative data and settings storage instance
+        metrics (Union[CrawlMetrics, None], optional): Crawl metrics.
+            Defaults to None.
+
+    Returns:
+        tuple[LimitedNominatim, LimitedOverpass]: APIs instances
+    """
+    nominatim = LimitedNominatim(
+        endpoint_bucket("nominatim", Tmp.nominatim_rate), Tmp.max_retries,
+        Tmp.backoff_base, metrics, endpoint=Tmp.nominatim_endpoint)
+    overpass = LimitedOverpass(
+        endpoint_bucket("overpass", Tmp.overpass_rate), Tmp.max_retries,
+        Tmp.backoff_base, metrics, endpoint=Tmp.overpass_endpoint)
+    return nominatim, overpass
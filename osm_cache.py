@@ -0,0 +1,156 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Union
+from OSMPythonTools.cachingStrategy.base import CachingStrategyBase
+from tempdata import TempData
+
+
+class SQLiteCache(CachingStrategyBase):
+    """
+    Persistent Nominatim and Overpass responses cache, stored in a single
+    SQLite file. Keys are content hashes of the normalized query string and
+    its sorted parameters (including 'accept-language'), computed by
+    OSMPythonTools. Entries expire after per-endpoint TTL and least
+    recently used ones are evicted when the size budget is exceeded.
+    Incremental crawls ('incremental' setting) ignore entries stored before
+    the crawl started, so refreshed regions get current data.
+    """
+    def __init__(self, Tmp: TempData) -> None:
+        """
+        Opens (or creates) cache database defined in Tmp parameters.
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+        """
+        self.Tmp = Tmp
+        self.ttl = {"nominatim": Tmp.cache_nominatim_ttl_hours * 3600,
+                    "overpass": Tmp.cache_overpass_ttl_hours * 3600}
+        self.max_size = Tmp.cache_max_size_mb * 1024 * 1024
+        # Entries created earlier are treated as expired
+        self.not_before = time.time() if Tmp.incremental else 0.0
+        self._lock = threading.Lock()
+        Tmp.check_folder_existance(os.path.dirname(Tmp.cache_file) or ".")
+        # Cache file may be shared by parallel crawl processes
+        self._connection = sqlite3.connect(
+            Tmp.cache_file, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, endpoint TEXT, data BLOB, "
+            "size INTEGER, created REAL, accessed REAL)")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed "
+            "ON responses (accessed)")
+        self._connection.commit()
+
+    def _count(self, counter: dict[str, int], endpoint: str) -> None:
+        """
+        Increments endpoint counter.
+
+        Args:
+            counter (dict[str, int]): Hits or misses counter
+            endpoint (str): Endpoint name ("nominatim" or "overpass")
+        """
+        counter[endpoint] = counter.get(endpoint, 0) + 1
+
+    def get(self, key: str) -> Union[dict, None]:
+        """
+        Returns cached response if it exists and is not expired.
+
+        Args:
+            key (str): Query key, prefixed with endpoint name
+
+        Returns:
+            Union[dict, None]: Cached data or None
+        """
+        endpoint = key.split("-")[0]
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, created FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is not None and (
+                    now - row[1] > self.ttl.get(endpoint, 0) or
+                    row[1] < self.not_before):
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                row = None
+            if row is None:
+                self._count(self.Tmp.cache_misses, endpoint)
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+        self._count(self.Tmp.cache_hits, endpoint)
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Stores response and evicts least recently used entries if the
+        cache became larger than its size budget.
+
+        Args:
+            key (str): Query key, prefixed with endpoint name
+            value (Any): Response data
+        """
+        data = zlib.compress(json.dumps(value).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, key.split("-")[0], data, len(data), now, now))
+            self.evict()
+            self._connection.commit()
+
+    def size(self) -> int:
+        """
+        Sums sizes of all cached responses, including ones stored by
+        other processes sharing the cache file.
+
+        Returns:
+            int: Cache size in bytes
+        """
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self) -> None:
+        """
+        Deletes least recently used entries until cache size fits into
+        the size budget. Has to be called with the lock acquired, in the
+        transaction of the stored response, so the size can't be changed
+        by other processes meanwhile.
+        """
+        size = self.size()
+        while size > self.max_size:
+            rows = self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed "
+                "LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, entry_size in rows:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key = ?", (key,))
+                size -= entry_size
+                if size <= self.max_size:
+                    break
+
+    def close(self) -> None:
+        """Closes cache database.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class NoCache(CachingStrategyBase):
+    """Caching strategy used when cache is disabled.
+    """
+    def get(self, key: str) -> None:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
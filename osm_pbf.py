@@ -0,0 +1,543 @@
+import struct
+import zlib
+import numpy as np
+import shapely
+from typing import Iterator, Union
+# imports for types
+from shapely.geometry.base import BaseGeometry
+
+# Relation member types
+MEMBER_TYPES = ("node", "way", "relation")
+
+
+def read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """
+    Reads protocol buffers varint.
+
+    Args:
+        data (bytes): Message
+        pos (int): Varint position
+
+    Returns:
+        tuple[int, int]: Value and position after the varint
+    """
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def fields(data: bytes) -> Iterator[tuple[int, Union[int, bytes]]]:
+    """
+    Iterates protocol buffers message fields.
+
+    Args:
+        data (bytes): Message
+
+    Yields:
+        Iterator[tuple[int, Union[int, bytes]]]: Field number and value
+            (integer or bytes of length-delimited and fixed size fields)
+    """
+    pos, end = 0, len(data)
+    while pos < end:
+        key, pos = read_varint(data, pos)
+        wire_type = key & 7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+            yield key >> 3, value
+            continue
+        if wire_type == 2:
+            size, pos = read_varint(data, pos)
+        elif wire_type in (1, 5):
+            size = 8 if wire_type == 1 else 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield key >> 3, data[pos:pos + size]
+        pos += size
+
+
+def signed(value: int) -> int:
+    """Converts varint of int64 field to a signed integer.
+    """
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def unzigzag(value: int) -> int:
+    """Converts varint of sint64 field to a signed integer.
+    """
+    return (value >> 1) ^ -(value & 1)
+
+
+def varints(data: bytes) -> np.ndarray:
+    """
+    Decodes packed varints at once.
+
+    Args:
+        data (bytes): Packed field
+
+    Returns:
+        np.ndarray: Unsigned values
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)
+    if len(ends) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    raw = raw[:ends[-1] + 1]
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = (np.arange(len(raw)) -
+              np.repeat(starts, ends - starts + 1)) * 7
+    values = (raw & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(values, starts)
+
+
+def varints_at(raw: np.ndarray,
+               positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decodes varints starting at given positions at once.
+
+    Args:
+        raw (np.ndarray): Message bytes
+        positions (np.ndarray): Varints positions
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Unsigned values and positions after
+            the varints
+    """
+    values = np.zeros(len(positions), dtype=np.uint64)
+    ends = positions.astype(np.int64)
+    # Varints are decoded byte by byte until the longest of them ends
+    active = np.arange(len(positions))
+    shift = 0
+    while len(active) and shift < 64:
+        indexes = ends[active]
+        # Bytes after the message end are read as varint ends
+        data = np.where(indexes < len(raw),
+                        raw[np.minimum(indexes, len(raw) - 1)], 0)
+        values[active] |= (data & 0x7F).astype(np.uint64) << \
+            np.uint64(shift)
+        ends[active] += 1
+        active = active[data >= 0x80]
+        shift += 7
+    return values, ends
+
+
+def repeated_messages(data: bytes,
+                      number: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds bounds of all messages of a message consisting of a single
+    repeated message field. Bytes equal to the field key are decoded
+    at once as candidate fields, and the chain of fields starting at the
+    message beginning is followed, skipping keys found inside messages.
+
+    Args:
+        data (bytes): Message
+        number (int): Field number (1-15)
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Start and end positions of messages
+    """
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    candidates = np.flatnonzero(raw == (number << 3 | 2))
+    if len(candidates) == 0 or candidates[0] != 0:
+        raise ValueError(f"Message has fields other than {number}")
+    sizes, starts = varints_at(raw, candidates + 1)
+    ends = starts + sizes.astype(np.int64)
+    # Index of the candidate starting right after each field, -1 if none
+    following = np.minimum(np.searchsorted(candidates, ends),
+                           len(candidates) - 1)
+    following[candidates[following] != ends] = -1
+    chain = []
+    link = following.tolist()
+    index = 0
+    while index >= 0:
+        chain.append(index)
+        index = link[index]
+    if ends[chain[-1]] != len(data):
+        raise ValueError(f"Message has fields other than {number}")
+    return starts[chain], ends[chain]
+
+
+def zigzag(values: np.ndarray) -> np.ndarray:
+    """
+    Decodes zigzag encoded (sint64) values.
+
+    Args:
+        values (np.ndarray): Unsigned values
+
+    Returns:
+        np.ndarray: Signed values
+    """
+    return (values >> np.uint64(1)).astype(np.int64) ^ \
+        -(values & np.uint64(1)).astype(np.int64)
+
+
+def deltas(data: bytes) -> np.ndarray:
+    """Decodes packed delta coded sint64 field.
+    """
+    return np.cumsum(zigzag(varints(data)))
+
+
+class PrimitiveBlock():
+    """
+    Decoded OSM PBF data block. Elements are decoded on demand, dense
+    nodes as numpy arrays.
+    """
+    def __init__(self, data: bytes) -> None:
+        """
+        Args:
+            data (bytes): Uncompressed PrimitiveBlock message
+        """
+        self.strings: list[str] = []
+        self.groups: list[bytes] = []
+        self.granularity = 100
+        self.lat_offset = self.lon_offset = 0
+        for number, value in fields(data):
+            if number == 1:
+                self.strings = [s.decode("utf-8")  # type: ignore
+                                for _, s in fields(value)]  # type: ignore
+            elif number == 2:
+                self.groups.append(value)  # type: ignore
+            elif number == 17:
+                self.granularity = value  # type: ignore
+            elif number == 19:
+                self.lat_offset = signed(value)  # type: ignore
+            elif number == 20:
+                self.lon_offset = signed(value)  # type: ignore
+        # Kinds of elements held by the groups (see 'group_items')
+        self.kinds = {read_varint(group, 0)[0] >> 3
+                      for group in self.groups if group}
+
+    def group_items(self, kind: int) -> Iterator[bytes]:
+        """
+        Iterates elements of groups holding given elements kind. Every
+        group holds elements of a single kind.
+
+        Args:
+            kind (int): 1 - nodes, 2 - dense nodes, 3 - ways, 4 - relations
+
+        Yields:
+            Iterator[bytes]: Element messages
+        """
+        for group in self.groups:
+            if group and read_varint(group, 0)[0] >> 3 == kind:
+                for number, value in fields(group):
+                    if number == kind:
+                        yield value  # type: ignore
+
+    def tags(self, keys: bytes, values: bytes) -> dict[str, str]:
+        """Decodes tags from packed string table indexes.
+        """
+        return {self.strings[k]: self.strings[v] for k, v in zip(
+            varints(keys).tolist(), varints(values).tolist())}
+
+    def coordinates(self, lons: np.ndarray,
+                    lats: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Converts block coordinates to degrees.
+        """
+        return (1e-9 * (self.lon_offset + self.granularity * lons),
+                1e-9 * (self.lat_offset + self.granularity * lats))
+
+    def dense_nodes(self) -> Iterator[tuple[np.ndarray, np.ndarray,
+                                            np.ndarray, np.ndarray]]:
+        """
+        Iterates dense nodes groups.
+
+        Yields:
+            Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+                Ids, longitudes, latitudes and packed tags (string indexes
+                of keys and values, 0 after tags of every node)
+        """
+        for dense in self.group_items(2):
+            ids = lats = lons = keys_vals = np.zeros(0, dtype=np.int64)
+            for number, value in fields(dense):
+                if number == 1:
+                    ids = deltas(value)  # type: ignore
+                elif number == 8:
+                    lats = deltas(value)  # type: ignore
+                elif number == 9:
+                    lons = deltas(value)  # type: ignore
+                elif number == 10:
+                    keys_vals = varints(value).astype(  # type: ignore
+                        np.int64)
+            yield (ids, *self.coordinates(lons, lats), keys_vals)
+
+    def dense_tags(self, keys_vals: np.ndarray,
+                   key: str) -> Iterator[tuple[int, dict[str, str]]]:
+        """
+        Decodes tags of dense nodes having the given tag key.
+
+        Args:
+            keys_vals (np.ndarray): Packed tags of 'dense_nodes'
+            key (str): Tag key
+
+        Yields:
+            Iterator[tuple[int, dict[str, str]]]: Node index in the group
+                and its tags
+        """
+        if key not in self.strings or len(keys_vals) == 0:
+            return
+        key_index = self.strings.index(key)
+        ends = np.flatnonzero(keys_vals == 0)
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        for node in np.flatnonzero(ends > starts).tolist():
+            items = keys_vals[starts[node]:ends[node]].tolist()
+            if key_index in items[0::2]:
+                yield node, {self.strings[k]: self.strings[v]
+                             for k, v in zip(items[0::2], items[1::2])}
+
+    def nodes(self) -> Iterator[tuple[int, dict[str, str], float, float]]:
+        """
+        Iterates not dense nodes.
+
+        Yields:
+            Iterator[tuple[int, dict[str, str], float, float]]: Id, tags,
+                longitude and latitude
+        """
+        for node in self.group_items(1):
+            values: dict[int, Union[int, bytes]] = dict(fields(node))
+            lon, lat = self.coordinates(
+                np.array([unzigzag(values.get(9, 0))]),  # type: ignore
+                np.array([unzigzag(values.get(8, 0))]))  # type: ignore
+            yield (unzigzag(values[1]), self.tags(  # type: ignore
+                values.get(2, b""), values.get(3, b"")),  # type: ignore
+                float(lon[0]), float(lat[0]))
+
+    def ways(self) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray,
+                                     bytes]]:
+        """
+        Iterates ways groups. Ids of all ways of a group are decoded at
+        once, node references are decoded by 'way_refs' only for messages
+        of needed ways.
+
+        Yields:
+            Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, bytes]]: Ids,
+                start and end positions of way messages and the group
+        """
+        for group in self.groups:
+            if not group or read_varint(group, 0)[0] >> 3 != 3:
+                continue
+            starts, ends = repeated_messages(group, 3)
+            raw = np.frombuffer(group, dtype=np.uint8)
+            ids = varints_at(raw, starts + 1)[0].astype(np.int64)
+            # Id is the first field of ways written by OSM tools
+            for index in np.flatnonzero(raw[starts] != 0x08).tolist():
+                ids[index] = dict(fields(
+                    group[starts[index]:ends[index]]))[1]
+            yield ids, starts, ends, group
+
+    def way_refs(self, way: bytes) -> np.ndarray:
+        """Decodes node references of the way message.
+        """
+        for number, value in fields(way):
+            if number == 8:
+                return deltas(value)  # type: ignore
+        return np.zeros(0, dtype=np.int64)
+
+    def relations(self) -> Iterator[tuple[
+            int, dict[str, str], list[tuple[str, int, str]]]]:
+        """
+        Iterates relations.
+
+        Yields:
+            Iterator[tuple[int, dict[str, str], list[tuple[str, int, str]]]]:
+                Id, tags and (type, id, role) of members
+        """
+        for relation in self.group_items(4):
+            values: dict[int, Union[int, bytes]] = dict(fields(relation))
+            members = zip(
+                [MEMBER_TYPES[t] for t in varints(
+                    values.get(10, b"")).tolist()],  # type: ignore
+                deltas(values.get(9, b"")).tolist(),  # type: ignore
+                [self.strings[r] for r in varints(
+                    values.get(8, b"")).tolist()])  # type: ignore
+            yield (values[1], self.tags(  # type: ignore
+                values.get(2, b""), values.get(3, b"")),  # type: ignore
+                list(members))
+
+
+class PBFFile():
+    """
+    Sequential reader of OSM PBF files (zlib compressed or raw blobs).
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): .osm.pbf file path
+        """
+        self.path = path
+
+    def blocks(self, offsets: Union[list[int], None] = None
+               ) -> Iterator[tuple[int, PrimitiveBlock]]:
+        """
+        Reads data blocks of the file, or only blocks at given offsets.
+
+        Args:
+            offsets (Union[list[int], None], optional): Offsets of blocks
+                yielded before. Defaults to None (all blocks).
+
+        Yields:
+            Iterator[tuple[int, PrimitiveBlock]]: Block offset in the file
+                and decoded block
+        """
+        with open(self.path, "rb") as file:
+            positions = iter(offsets) if offsets is not None else None
+            while True:
+                if positions is None:
+                    offset = file.tell()
+                else:
+                    offset = next(positions, -1)
+                    if offset < 0:
+                        return
+                    file.seek(offset)
+                size = file.read(4)
+                if len(size) < 4:
+                    return
+                header = dict(fields(file.read(struct.unpack(">I", size)[0])))
+                blob = dict(fields(file.read(header[3])))  # type: ignore
+                if header[1] != b"OSMData":
+                    continue
+                if 1 in blob:
+                    yield offset, PrimitiveBlock(blob[1])  # type: ignore
+                elif 3 in blob:
+                    yield offset, PrimitiveBlock(
+                        zlib.decompress(blob[3]))  # type: ignore
+                else:
+                    raise ValueError(
+                        f"{self.path}: unsupported blob compression")
+
+
+class OSMExtract():
+    """
+    Administrative boundaries and place nodes of an OSM PBF extract. The
+    file is read in three sequential passes: relations and place nodes,
+    then member ways of administrative relations and finally coordinates
+    of their nodes, so memory holds only boundaries and places. The second
+    and third passes read only blocks holding ways and nodes. Relation
+    multipolygons are assembled from member ways with shapely.
+    """
+    def __init__(self, path: str, place_key: str = "place") -> None:
+        """
+        Args:
+            path (str): .osm.pbf file path
+            place_key (str, optional): Tag key of collected nodes.
+                Defaults to "place".
+        """
+        self.path = path
+        # {relation id: tags}, {relation id: (Multi)Polygon}
+        self.relations: dict[int, dict[str, str]] = {}
+        self.geometries: dict[int, BaseGeometry] = {}
+        place_ids: list[int] = []
+        place_lons: list[float] = []
+        place_lats: list[float] = []
+        self.place_tags: list[dict[str, str]] = []
+        members: dict[int, list[tuple[str, int, str]]] = {}
+
+        file = PBFFile(path)
+        way_blocks: list[int] = []
+        node_blocks: list[int] = []
+        for offset, block in file.blocks():
+            if 3 in block.kinds:
+                way_blocks.append(offset)
+            if block.kinds & {1, 2}:
+                node_blocks.append(offset)
+            for ids, lons, lats, keys_vals in block.dense_nodes():
+                for index, tags in block.dense_tags(keys_vals, place_key):
+                    place_ids.append(int(ids[index]))
+                    place_lons.append(float(lons[index]))
+                    place_lats.append(float(lats[index]))
+                    self.place_tags.append(tags)
+            for node_id, tags, lon, lat in block.nodes():
+                if place_key in tags:
+                    place_ids.append(node_id)
+                    place_lons.append(lon)
+                    place_lats.append(lat)
+                    self.place_tags.append(tags)
+            for relation_id, tags, relation_members in block.relations():
+                if tags.get("boundary") == "administrative" and \
+                        "admin_level" in tags:
+                    self.relations[relation_id] = tags
+                    members[relation_id] = relation_members
+        self.place_ids = np.array(place_ids, dtype=np.int64)
+        self.place_lons = np.array(place_lons, dtype=float)
+        self.place_lats = np.array(place_lats, dtype=float)
+
+        needed_ways = np.unique(np.array(
+            [ref for relation_members in members.values()
+             for kind, ref, _ in relation_members if kind == "way"],
+            dtype=np.int64))
+        way_refs: dict[int, np.ndarray] = {}
+        if len(needed_ways):
+            for _, block in file.blocks(way_blocks):
+                for ids, starts, ends, group in block.ways():
+                    positions = np.minimum(np.searchsorted(
+                        needed_ways, ids), len(needed_ways) - 1)
+                    for index in np.flatnonzero(
+                            needed_ways[positions] == ids).tolist():
+                        way_refs[int(ids[index])] = block.way_refs(
+                            group[starts[index]:ends[index]])
+
+        node_ids = np.unique(np.concatenate(
+            [np.zeros(0, dtype=np.int64), *way_refs.values()]))
+        node_lons = np.full(len(node_ids), np.nan)
+        node_lats = np.full(len(node_ids), np.nan)
+        if len(node_ids):
+            for _, block in file.blocks(node_blocks):
+                groups = list(block.dense_nodes()) + [
+                    (np.array([node_id]), np.array([lon]), np.array([lat]),
+                     None) for node_id, _, lon, lat in block.nodes()]
+                for ids, lons, lats, _ in groups:
+                    positions = np.minimum(
+                        np.searchsorted(node_ids, ids), len(node_ids) - 1)
+                    found = node_ids[positions] == ids
+                    node_lons[positions[found]] = lons[found]
+                    node_lats[positions[found]] = lats[found]
+
+        for relation_id, relation_members in members.items():
+            lines: dict[str, list[BaseGeometry]] = {"outer": [], "inner": []}
+            for kind, ref, role in relation_members:
+                if kind != "way" or ref not in way_refs:
+                    continue
+                positions = np.searchsorted(node_ids, way_refs[ref])
+                coords = np.column_stack(
+                    (node_lons[positions], node_lats[positions]))
+                # Nodes missing in the extract are skipped
+                coords = coords[~np.isnan(coords).any(axis=1)]
+                if len(coords) >= 2:
+                    lines["inner" if role == "inner" else "outer"].append(
+                        shapely.linestrings(coords))
+            geometry = assemble_multipolygon(lines["outer"], lines["inner"])
+            if geometry is not None:
+                self.geometries[relation_id] = geometry
+
+
+def assemble_multipolygon(outer: list[BaseGeometry],
+                          inner: list[BaseGeometry]) -> Union[
+                              BaseGeometry, None]:
+    """
+    Assembles (multi)polygon from relation member ways.
+
+    Args:
+        outer (list[BaseGeometry]): Outer ways linestrings
+        inner (list[BaseGeometry]): Inner ways linestrings
+
+    Returns:
+        Union[BaseGeometry, None]: Polygon or MultiPolygon, None if outer
+            ways do not form any closed ring
+    """
+    polygons = shapely.get_parts(shapely.polygonize(outer))
+    if len(polygons) == 0:
+        return None
+    geometry = shapely.union_all(polygons)
+    holes = shapely.get_parts(shapely.polygonize(inner))
+    if len(holes):
+        geometry = shapely.difference(geometry, shapely.union_all(holes))
+    if geometry.geom_type not in ("Polygon", "MultiPolygon") or \
+            geometry.is_empty:
+        return None
+    return geometry
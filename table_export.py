@@ -0,0 +1,409 @@
+import csv
+import os
+import re
+import sqlite3
+import struct
+import xlsxwriter
+from array import array
+from typing import Any, Iterator, Union
+from tempdata import TempData
+
+
+class LocationColumns():
+    """
+    Typed column buffers of region location rows: names are kept as
+    strings, coordinates as float64 arrays and address parts as
+    categorical codes (int32 arrays with per-column categories), so
+    repeated county/state/region/country values are stored once.
+    """
+    TEXT_COLUMN = "location"
+    CATEGORY_COLUMNS = ("county", "state", "region", "country")
+    COORDINATE_COLUMNS = ("lon", "lat")
+    COLUMNS = (TEXT_COLUMN, *CATEGORY_COLUMNS, *COORDINATE_COLUMNS)
+
+    def __init__(self, rows: Union[list[dict], None] = None) -> None:
+        """
+        Args:
+            rows (Union[list[dict], None], optional): Location rows to
+                append. Defaults to None.
+        """
+        self.location: list[str] = []
+        self.coordinates = {name: array("d")
+                            for name in self.COORDINATE_COLUMNS}
+        self.codes = {name: array("i") for name in self.CATEGORY_COLUMNS}
+        # {column: {value: code}}, code -1 means missing value
+        self.categories: dict[str, dict[str, int]] = {
+            name: {} for name in self.CATEGORY_COLUMNS}
+        for row in rows or []:
+            self.append(row)
+
+    def __len__(self) -> int:
+        return len(self.location)
+
+    def append(self, row: dict) -> None:
+        """
+        Appends location row.
+
+        Args:
+            row (dict): Location row (see 'COLUMNS')
+        """
+        self.location.append(str(row[self.TEXT_COLUMN]))
+        for name in self.COORDINATE_COLUMNS:
+            self.coordinates[name].append(float(row[name]))
+        for name in self.CATEGORY_COLUMNS:
+            value = row.get(name)
+            if value is None:
+                self.codes[name].append(-1)
+            else:
+                self.codes[name].append(self.categories[name].setdefault(
+                    str(value), len(self.categories[name])))
+
+    def category_values(self, name: str) -> list[Union[str, None]]:
+        """
+        Decodes categorical column.
+
+        Args:
+            name (str): Column name
+
+        Returns:
+            list[Union[str, None]]: Column values
+        """
+        values: list[Union[str, None]] = list(self.categories[name])
+        values.append(None)  # code -1
+        return [values[code] for code in self.codes[name]]
+
+    def rows(self) -> Iterator[tuple]:
+        """
+        Iterates over rows in 'COLUMNS' order.
+
+        Returns:
+            Iterator[tuple]: Row values
+        """
+        return zip(self.location,
+                   *[self.category_values(name)
+                     for name in self.CATEGORY_COLUMNS],
+                   *self.coordinates.values())
+
+
+class TableExporter():
+    """
+    Base class of location table exporters. Rows are written region by
+    region, so an exporter never keeps more than a single region in memory.
+    """
+    extension = ""
+
+    def __init__(self, file_path: str) -> None:
+        """
+        Args:
+            file_path (str): Output file path
+        """
+        self.file_path = file_path
+
+    def add(self, area_name: str, columns: LocationColumns) -> None:
+        """
+        Writes region locations.
+
+        Args:
+            area_name (str): Region name
+            columns (LocationColumns): Region locations
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Finishes output file.
+        """
+        raise NotImplementedError
+
+    def discard(self) -> None:
+        """Closes and removes unfinished output file.
+        """
+        self.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class ExcelTableExporter(TableExporter):
+    """
+    Writes every region into a separate sheet with xlsxwriter in constant
+    memory mode. Sheet names are made valid and unique, and regions
+    exceeding the Excel row limit are split into several sheets.
+    """
+    extension = "xlsx"
+    MAX_ROWS = 1048576  # including header
+    MAX_SHEET_NAME = 31
+
+    def __init__(self, file_path: str,
+                 max_rows: Union[int, None] = None) -> None:
+        """
+        Args:
+            file_path (str): Output file path
+            max_rows (Union[int, None], optional): Sheet rows limit.
+                Defaults to Excel limit.
+        """
+        super().__init__(file_path)
+        self.max_rows = max_rows or self.MAX_ROWS
+        self.workbook = xlsxwriter.Workbook(
+            file_path, {"constant_memory": True})
+        self.sheet_names: set[str] = set()
+
+    def sheet_name(self, name: str) -> str:
+        """
+        Makes valid sheet name, which isn't used yet.
+
+        Args:
+            name (str): Desired sheet name
+
+        Returns:
+            str: Sheet name
+        """
+        name = re.sub(r"[\[\]:*?/\\]", "_", str(name)).strip("'") or "Sheet"
+        unique = name[:self.MAX_SHEET_NAME]
+        number = 1
+        while unique.lower() in self.sheet_names:
+            number += 1
+            suffix = f" ({number})"
+            unique = name[:self.MAX_SHEET_NAME - len(suffix)] + suffix
+        self.sheet_names.add(unique.lower())
+        return unique
+
+    def add(self, area_name: str, columns: LocationColumns) -> None:
+        worksheet = None
+        row_number = 0
+        for row in columns.rows():
+            if worksheet is None or row_number == self.max_rows:
+                worksheet = self.workbook.add_worksheet(
+                    self.sheet_name(area_name))
+                worksheet.write_row(0, 0, LocationColumns.COLUMNS)
+                row_number = 1
+            worksheet.write_row(row_number, 0, row)
+            row_number += 1
+
+    def close(self) -> None:
+        if self.workbook.fileclosed:
+            return
+        if not self.workbook.worksheets():
+            self.workbook.add_worksheet().write_row(
+                0, 0, LocationColumns.COLUMNS)
+        self.workbook.close()
+
+
+class CSVTableExporter(TableExporter):
+    """Writes locations of all regions into a single CSV table.
+    """
+    extension = "csv"
+
+    def __init__(self, file_path: str) -> None:
+        super().__init__(file_path)
+        self._file = open(file_path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self._file)
+        self.writer.writerow(("area", *LocationColumns.COLUMNS))
+
+    def add(self, area_name: str, columns: LocationColumns) -> None:
+        self.writer.writerows(
+            (area_name, *row) for row in columns.rows())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetTableExporter(TableExporter):
+    """
+    Writes locations of all regions into a single Parquet table, one row
+    group per region. Address parts are dictionary encoded.
+    """
+    extension = "parquet"
+
+    def __init__(self, file_path: str) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError(
+                "Parquet export requires 'pyarrow' package") from error
+        super().__init__(file_path)
+        self.pa = pyarrow
+        category = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        self.schema = pyarrow.schema(
+            [("area", category), (LocationColumns.TEXT_COLUMN,
+                                  pyarrow.string())]
+            + [(name, category) for name in LocationColumns.CATEGORY_COLUMNS]
+            + [(name, pyarrow.float64())
+               for name in LocationColumns.COORDINATE_COLUMNS])
+        self.writer: Any = pyarrow.parquet.ParquetWriter(
+            file_path, self.schema)
+
+    def add(self, area_name: str, columns: LocationColumns) -> None:
+        pa = self.pa
+        arrays = [
+            pa.DictionaryArray.from_arrays(
+                pa.array([0] * len(columns), pa.int32()),
+                pa.array([area_name], pa.string())),
+            pa.array(columns.location, pa.string())]
+        for name in LocationColumns.CATEGORY_COLUMNS:
+            codes = pa.array([code if code >= 0 else None
+                              for code in columns.codes[name]], pa.int32())
+            arrays.append(pa.DictionaryArray.from_arrays(
+                codes, pa.array(list(columns.categories[name]), pa.string())))
+        for name in LocationColumns.COORDINATE_COLUMNS:
+            arrays.append(pa.array(columns.coordinates[name], pa.float64()))
+        self.writer.write_table(
+            pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        if self.writer.is_open:
+            self.writer.close()
+
+
+class GeoPackageTableExporter(TableExporter):
+    """
+    Writes locations of all regions as a GeoPackage (OGC SQLite based
+    format) point layer in WGS 84 coordinates.
+    """
+    extension = "gpkg"
+    SRS_ID = 4326
+    SRS_DEFINITION = (
+        'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,'
+        '298.257223563]],PRIMEM["Greenwich",0],'
+        'UNIT["degree",0.0174532925199433]]')
+
+    def __init__(self, file_path: str) -> None:
+        super().__init__(file_path)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        self.table = "locations"
+        self.extent = [float("inf"), float("inf"),
+                       float("-inf"), float("-inf")]
+        self._connection: Union[sqlite3.Connection, None] = \
+            sqlite3.connect(file_path)
+        self._connection.executescript(f"""
+            PRAGMA application_id = 1196444487;
+            PRAGMA user_version = 10300;
+            CREATE TABLE gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY,
+                organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL,
+                definition TEXT NOT NULL, description TEXT);
+            CREATE TABLE gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY,
+                data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+                description TEXT DEFAULT '',
+                last_change DATETIME NOT NULL DEFAULT
+                    (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE,
+                srs_id INTEGER);
+            CREATE TABLE gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL,
+                geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL,
+                z TINYINT NOT NULL, m TINYINT NOT NULL,
+                PRIMARY KEY (table_name, column_name));
+            INSERT INTO gpkg_spatial_ref_sys VALUES
+                ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', ''),
+                ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', '');
+            CREATE TABLE {self.table} (
+                fid INTEGER PRIMARY KEY AUTOINCREMENT, geom POINT,
+                area TEXT, location TEXT, county TEXT, state TEXT,
+                region TEXT, country TEXT, lon DOUBLE, lat DOUBLE);
+            INSERT INTO gpkg_contents (table_name, data_type, identifier,
+                                       srs_id)
+                VALUES ('{self.table}', 'features', '{self.table}',
+                        {self.SRS_ID});
+            INSERT INTO gpkg_geometry_columns VALUES
+                ('{self.table}', 'geom', 'POINT', {self.SRS_ID}, 0, 0);
+            """)
+        self._connection.execute(
+            "INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+            ("WGS 84 geodetic", self.SRS_ID, "EPSG", self.SRS_ID,
+             self.SRS_DEFINITION, ""))
+
+    def point(self, lon: float, lat: float) -> bytes:
+        """
+        Encodes point into GeoPackage geometry blob: header without
+        envelope followed by little endian WKB.
+
+        Args:
+            lon (float): Point longitude
+            lat (float): Point latitude
+
+        Returns:
+            bytes: Geometry blob
+        """
+        return b"GP" + struct.pack("<BBi", 0, 1, self.SRS_ID) + \
+            struct.pack("<BIdd", 1, 1, lon, lat)
+
+    def add(self, area_name: str, columns: LocationColumns) -> None:
+        if len(columns) == 0:
+            return
+        lon, lat = columns.coordinates["lon"], columns.coordinates["lat"]
+        self.extent = [min(self.extent[0], min(lon)),
+                       min(self.extent[1], min(lat)),
+                       max(self.extent[2], max(lon)),
+                       max(self.extent[3], max(lat))]
+        self._connection.executemany(  # type: ignore
+            f"INSERT INTO {self.table} (geom, area, location, county, state, "
+            "region, country, lon, lat) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((self.point(row[-2], row[-1]), area_name, *row)
+             for row in columns.rows()))
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        if self.extent[0] != float("inf"):
+            self._connection.execute(
+                "UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, "
+                "max_y = ? WHERE table_name = ?",
+                (*self.extent, self.table))
+        self._connection.commit()
+        self._connection.close()
+        self._connection = None
+
+
+EXPORTERS: dict[str, type[TableExporter]] = {
+    exporter.extension: exporter for exporter in (
+        ExcelTableExporter, CSVTableExporter, ParquetTableExporter,
+        GeoPackageTableExporter)}
+
+
+class TableExport():
+    """Exports locations table of a search object to configured formats.
+    """
+    def __init__(self, Tmp: TempData, obj_name: str) -> None:
+        """
+        Opens exporters of formats listed in 'table_formats' setting.
+
+        Args:
+            Tmp (TempData): Operative data and settings storage instance
+            obj_name (str): Search object name used in files names
+        """
+        self.exporters: list[TableExporter] = []
+        try:
+            for table_format in Tmp.table_formats:
+                self.exporters.append(EXPORTERS[table_format](
+                    os.path.join(Tmp.export_dir,
+                                 f"{obj_name}.{table_format}")))
+        except Exception:
+            self.discard()
+            raise
+
+    def add(self, area_name: str, rows: list[dict]) -> None:
+        """
+        Writes region locations to all formats.
+
+        Args:
+            area_name (str): Region name
+            rows (list[dict]): Location rows
+        """
+        columns = LocationColumns(rows)
+        for exporter in self.exporters:
+            exporter.add(area_name, columns)
+
+    def close(self) -> None:
+        """Finishes all output files.
+        """
+        for exporter in self.exporters:
+            exporter.close()
+
+    def discard(self) -> None:
+        """Removes all unfinished output files.
+        """
+        for exporter in self.exporters:
+            exporter.discard()
@@ -1,174 +1,367 @@
-import configparser
-from typing import Any
-from os import path, makedirs
-import logger
-from webcolors import name_to_hex, normalize_hex
-
-
-class TempData():
-    """Operative data and settings storage.
-    """
-    def __init__(self, mode: str = "script") -> None:
-        """
-        Initializes temporary parameters and loads configurations
-        from 'config.ini'.
-
-        Args:
-            mode (str, optional): Running program mode. Defaults to "script".
-        """
-        self.mode = mode.lower()
-        self.config = configparser.RawConfigParser(
-            inline_comment_prefixes=("#"))
-        self.config.read("config.ini")
-
-        # Pulls from config
-        self.search_type = "world"
-        self.search_locations = True
-        self.search_places_list = ["locality", "isolated_dwelling", "hamlet",
-                                   "village", "town", "city"]  # GUI only
-        self.search_places_choice = ["isolated_dwelling", "hamlet", "village",
-                                     "town", "city"]
-        self.search_borders = True
-        self.polygons_to_lines = False
-        self.line_width = 3
-        self.line_color = "#ff0000"
-        self.export_to_kml = True
-        self.export_to_excel = True
-        self.objects_language = "ru"
-        self.obj_lang_dict = {'en': 'English', 'ru': 'Русский',
-                              'de': 'Deutsch', 'fr': 'French', 'it': 'Italian'}
-        self.obj_lang_combo_list: list[str] = []
-        self.stages_list = ["Regions search", "Locations search", "Export",
-                            "Finished"]
-        self.choose_from_results = True  # GUI only
-
-        # Proccess specific
-        self.current_thread = Any
-        # self.current_stage = 0
-        self.current_stage_num = 0
-        self.processing_choises_num = 0
-        # Top progress bar variables
-        self.obj_number = 0
-        self.current_obj_name = ""  # can be pulled directly pulled from json
-        # self.current_obj = 0  not needed, comes from signal
-
-        self.current_area_obj_number = 0
-        self.current_area_obj = 0
-        self.current_area_obj_name = ""
-        self.current_sub_obj_name = ""
-        self.sub_obj_number = 0
-        self.current_sub_obj = 0
-        self.current_search_json: list[Any] = []  # Complex list
-        self.current_search_chosen_index = 0
-        self.error_found = 0
-        self.logging_level = "DEBUG"
-        self.search_line = "Russia"  # "Russia"
-
-        # self.search_mode = 0
-        self.process_paused = True  # GUI only
-        self.check_necessary_folders()
-        self.get_settings()
-        self.set_logger()
-
-    @property
-    def current_obj(self):
-        return self._current_obj
-
-    @current_obj.setter
-    def current_obj(self, value: int):
-        self._current_obj = value
-        if self.mode == "gui":
-            self.current_thread._PB_Thread_sub_obj_signal.emit(  # type: ignore
-                                value)
-
-    @property
-    def current_stage(self):
-        return self._current_stage
-
-    @current_stage.setter
-    def current_stage(self, index: int):
-        self._current_stage = index
-        if self.mode == "gui":
-            self.current_thread.processing_stages_signal.emit(  # type: ignore
-                                index)
-
-    def check_folder_existance(self, folder: str) -> None:
-        """
-        Checks whether folder exists or not. If not - creates new one.
-
-        Args:
-            folder (str): Folder path.
-        """
-        exists = path.exists(folder)
-        if not exists:
-            makedirs(folder)
-
-    def check_necessary_folders(self) -> None:
-        """
-        Checks whether important folders exist or not (creates if missing).
-        """
-        self.check_folder_existance(".//logs//")
-        self.check_folder_existance(".//export//")
-
-    def get_settings(self) -> None:
-        """
-        Loads settings from config.ini and converts them
-        into certain data types.
-        """
-        # [Search]
-        self.search_type = str(self.config["Search"]["search_type"])
-        self.objects_language = str(self.config["Search"]["objects_language"])
-        self.search_borders = self.config["Search"].\
-            getboolean("search_borders")
-        self.search_locations = self.config["Search"].getboolean(
-            "search_locations")
-        self.search_places_list = list(map(
-            str.strip, self.config["Search"]["search_places_list"].split(',')
-            ))
-        self.search_places_choice = list(map(
-            str.strip, self.config["Search"]["search_places_choice"].split(',')
-            ))
-
-        # [KML]
-        self.polygons_to_lines = self.config["KML"].getboolean(
-            "polygons_to_lines")
-        self.line_color = self.get_color(str(self.config["KML"]["line_color"]))
-        self.line_width = int(self.config["KML"]["line_width"])
-
-        # [Export]
-        self.export_to_kml = self.config["Export"].getboolean("export_to_kml")
-        self.export_to_excel = self.config["Export"].getboolean(
-            "export_to_excel")
-        # [Logging]
-        self.logging_level = self.config["Logging"]["logging_level"].upper()
-
-    def set_logger(self) -> None:
-        """Creates logger instance as self.logger_object.
-        """
-        print(self.logging_level)
-        self.logger_object = logger.set_logger(
-            log_level_name=self.logging_level)
-
-    def get_color(self, color_str: str) -> str:
-        """
-        Converts CSS3 color name or normalizes HEX color code to
-        format accepted by QT.
-
-        Args:
-            color_str (str): String with HEX color code or CSS3 color name
-
-        Returns:
-            str: Normalized HEX color code string
-        """
-        try:
-            normal_hex = normalize_hex(f"#{color_str}").lower()
-            return normal_hex
-        except ValueError:
-            pass
-        try:
-            normal_hex = name_to_hex(color_str).lower()
-            return normal_hex
-        except ValueError:
-            print("Parameter 'line_color' from 'config.ini' set incorrectly, "
-                  "using default 'red' (#ff0000) value instead")
-            return "#ff0000"
+import configparser
+import threading
+from typing import Any, Union
+from os import path, makedirs
+import logger
+from webcolors import name_to_hex, normalize_hex
+
+
+class CrawlCancelled(BaseException):
+    """
+    Raised at cancellation checkpoints of the crawl. Derived from
+    BaseException (like asyncio.CancelledError), so it isn't swallowed by
+    stages error handlers.
+    """
+
+
+class TempData():
+    """Operative data and settings storage.
+    """
+    def __init__(self, mode: str = "script", config_file: str = "config.ini",
+                 overrides: Union[dict[str, str], None] = None) -> None:
+        """
+        Initializes temporary parameters and loads configurations
+        from 'config.ini'.
+
+        Args:
+            mode (str, optional): Running program mode. Defaults to "script".
+            config_file (str, optional): Configuration file path.
+                Defaults to "config.ini".
+            overrides (Union[dict[str, str], None], optional): Configuration
+                values overriding the file ones, {"key" or "Section.key":
+                value}. Defaults to None.
+        """
+        self.mode = mode.lower()
+        self.config = configparser.RawConfigParser(
+            inline_comment_prefixes=("#"))
+        self.config.read(config_file)
+        self.override_config(overrides or {})
+
+        # Pulls from config
+        self.search_type = "world"
+        self.search_locations = True
+        self.search_places_list = ["locality", "isolated_dwelling", "hamlet",
+                                   "village", "town", "city"]  # GUI only
+        self.search_places_choice = ["isolated_dwelling", "hamlet", "village",
+                                     "town", "city"]
+        self.search_borders = True
+        self.polygons_to_lines = False
+        self.line_width = 3
+        self.line_color = "#ff0000"
+        self.kmz = False
+        self.simplify = True
+        self.simplify_tolerance = 0.0005  # degrees
+        # {admin level: tolerance in degrees}
+        self.simplify_tolerance_by_level: dict[int, float] = {}
+        self.coordinates_precision = 6  # decimal digits, -1 to disable
+        self.export_holes = False
+        # Borders preparation processes, -1 for all CPUs, 0 to disable
+        self.geometry_workers = 0
+        self.export_to_kml = True
+        self.export_to_excel = True  # locations table export
+        self.table_formats = ["xlsx"]  # xlsx, csv, parquet, gpkg
+        self.feature_formats: list[str] = []  # geojsonl, fgb
+        # Names languages exported in addition to 'objects_language'
+        self.export_languages: list[str] = []
+        self.objects_language = "ru"
+        self.obj_lang_dict = {'en': 'English', 'ru': 'Русский',
+                              'de': 'Deutsch', 'fr': 'French', 'it': 'Italian'}
+        self.obj_lang_combo_list: list[str] = []
+        self.stages_list = ["Regions search", "Locations search", "Export",
+                            "Finished"]
+        self.choose_from_results = True  # GUI only
+        self.combined_admin_query = True
+        # Borders assembled from Overpass geometry instead of Nominatim wkt
+        self.overpass_borders = False
+        # Locations addresses from loaded borders instead of Overpass/Nominatim
+        self.local_addresses = True
+        self.pbf_file = ""  # offline extract instead of Nominatim/Overpass
+
+        # Proccess specific
+        self.current_thread = Any
+        # self.current_stage = 0
+        self.current_stage_num = 0
+        self.processing_choises_num = 0
+        # Top progress bar variables
+        self.obj_number = 0
+        self.current_obj_name = ""  # can be pulled directly pulled from json
+        # self.current_obj = 0  not needed, comes from signal
+
+        self.current_area_obj_number = 0
+        self.current_area_obj = 0
+        self.current_area_obj_name = ""
+        self.current_sub_obj_name = ""
+        self.sub_obj_number = 0
+        self.current_sub_obj = 0
+        self.current_search_json: list[Any] = []  # Complex list
+        self.current_search_chosen_index = 0
+        self.error_found = 0
+        self.logging_level = "DEBUG"
+        self.use_cache = True
+        self.cache_file = ".//cache//osm_cache.sqlite"
+        self.cache_nominatim_ttl_hours = 720.0
+        self.cache_overpass_ttl_hours = 168.0
+        self.cache_max_size_mb = 512.0
+        # Administrative relations and borders of crawled objects
+        self.boundary_index = True
+        self.boundary_index_file = ".//cache//boundaries.sqlite"
+        # Keep crawl journals, crawl again only regions changed since then
+        self.incremental = False
+        # Journal completed regions, so an interrupted crawl can be resumed
+        self.resumable = False
+        self.cache_hits: dict[str, int] = {}  # {endpoint: hits number}
+        self.cache_misses: dict[str, int] = {}
+        self.nominatim_endpoint = "https://nominatim.openstreetmap.org/"
+        self.overpass_endpoint = "https://overpass-api.de/api/"
+        self.nominatim_rate = 1.0  # requests per second
+        self.overpass_rate = 1.0
+        self.max_concurrent_requests = 4
+        self.max_retries = 3
+        self.backoff_base = 2.0  # seconds
+        self.overpass_timeout = 60  # seconds, places query
+        self.search_line = "Russia"  # "Russia"
+        self.export_dir = ".//export//"
+        self.resume = False  # skip regions completed in the previous run
+        # Crawl results counters
+        self.regions_done = 0
+        self.points_done = 0
+        self.failed_objects: list[str] = []
+
+        # self.search_mode = 0
+        # GUI only: set when search result is chosen or crawl is cancelled
+        self.choice_made = threading.Event()
+        self.cancel_requested = threading.Event()
+        self.check_necessary_folders()
+        self.get_settings()
+        self.set_logger()
+
+    @property
+    def current_obj(self):
+        return self._current_obj
+
+    @current_obj.setter
+    def current_obj(self, value: int):
+        self._current_obj = value
+        if self.mode == "gui":
+            self.current_thread._PB_Thread_sub_obj_signal.emit(  # type: ignore
+                                value)
+
+    @property
+    def current_stage(self):
+        return self._current_stage
+
+    @current_stage.setter
+    def current_stage(self, index: int):
+        self._current_stage = index
+        if self.mode == "gui":
+            self.current_thread.processing_stages_signal.emit(  # type: ignore
+                                index)
+
+    def choose_search_result(self, index: int) -> None:
+        """
+        Confirms search result choise, waited by 'wait_for_choice'.
+
+        Args:
+            index (int): Chosen search result index
+        """
+        self.current_search_chosen_index = index
+        self.choice_made.set()
+
+    def wait_for_choice(self) -> None:
+        """
+        Blocks crawl thread until search result is chosen or crawl is
+        cancelled.
+
+        Raises:
+            CrawlCancelled: Crawl was cancelled
+        """
+        self.choice_made.wait()
+        self.choice_made.clear()
+        self.check_cancelled()
+
+    def request_cancel(self) -> None:
+        """Asks crawl thread to stop at the next cancellation checkpoint.
+        """
+        self.cancel_requested.set()
+        self.choice_made.set()
+
+    def check_cancelled(self) -> None:
+        """
+        Cancellation checkpoint.
+
+        Raises:
+            CrawlCancelled: Crawl was cancelled
+        """
+        if self.cancel_requested.is_set():
+            raise CrawlCancelled()
+
+    def check_folder_existance(self, folder: str) -> None:
+        """
+        Checks whether folder exists or not. If not - creates new one.
+
+        Args:
+            folder (str): Folder path.
+        """
+        exists = path.exists(folder)
+        if not exists:
+            makedirs(folder)
+
+    def check_necessary_folders(self) -> None:
+        """
+        Checks whether important folders exist or not (creates if missing).
+        """
+        self.check_folder_existance(logger.LOG_DIR)
+        self.check_folder_existance(".//export//")
+        self.check_folder_existance(".//cache//")
+
+    def override_config(self, overrides: dict[str, str]) -> None:
+        """
+        Overrides loaded configuration values.
+
+        Args:
+            overrides (dict[str, str]): {"key" or "Section.key": value}
+                dictionary. Key without section is searched in all sections.
+
+        Raises:
+            KeyError: Unknown configuration key
+        """
+        for name, value in overrides.items():
+            if "." in name:
+                section, key = name.split(".", 1)
+                sections = [section] if self.config.has_option(
+                    section, key) else []
+            else:
+                key = name
+                sections = [sec for sec in self.config.sections()
+                            if self.config.has_option(sec, key)]
+            if len(sections) != 1:
+                raise KeyError(f"Unknown or ambiguous config key '{name}'")
+            self.config[sections[0]][key] = value
+
+    def get_settings(self) -> None:
+        """
+        Loads settings from config.ini and converts them
+        into certain data types.
+        """
+        # [Search]
+        self.search_type = str(self.config["Search"]["search_type"])
+        self.objects_language = str(self.config["Search"]["objects_language"])
+        self.search_borders = self.config["Search"].\
+            getboolean("search_borders")
+        self.search_locations = self.config["Search"].getboolean(
+            "search_locations")
+        self.search_places_list = list(map(
+            str.strip, self.config["Search"]["search_places_list"].split(',')
+            ))
+        self.search_places_choice = list(map(
+            str.strip, self.config["Search"]["search_places_choice"].split(',')
+            ))
+        self.combined_admin_query = self.config["Search"].getboolean(
+            "combined_admin_query")
+        self.overpass_borders = self.config["Search"].getboolean(
+            "overpass_borders")
+        self.local_addresses = self.config["Search"].getboolean(
+            "local_addresses")
+        self.pbf_file = str(self.config["Search"]["pbf_file"])
+
+        # [KML]
+        self.polygons_to_lines = self.config["KML"].getboolean(
+            "polygons_to_lines")
+        self.line_color = self.get_color(str(self.config["KML"]["line_color"]))
+        self.line_width = int(self.config["KML"]["line_width"])
+        self.kmz = self.config["KML"].getboolean("kmz")
+
+        # [Geometry]
+        self.simplify = self.config["Geometry"].getboolean("simplify")
+        self.simplify_tolerance = self.config["Geometry"].getfloat(
+            "simplify_tolerance")
+        self.simplify_tolerance_by_level = {}
+        for item in self.config["Geometry"][
+                "simplify_tolerance_by_level"].split(','):
+            if ":" in item:
+                level, tolerance = item.split(":")
+                self.simplify_tolerance_by_level[int(level)] = float(
+                    tolerance)
+        self.coordinates_precision = self.config["Geometry"].getint(
+            "coordinates_precision")
+        self.export_holes = self.config["Geometry"].getboolean(
+            "export_holes")
+        self.geometry_workers = self.config["Geometry"].getint(
+            "geometry_workers")
+
+        # [Export]
+        self.export_to_kml = self.config["Export"].getboolean("export_to_kml")
+        self.export_to_excel = self.config["Export"].getboolean(
+            "export_to_excel")
+        self.table_formats = [
+            item.strip().lower()
+            for item in self.config["Export"]["table_formats"].split(",")
+            if item.strip()]
+        self.feature_formats = [
+            item.strip().lower()
+            for item in self.config["Export"]["feature_formats"].split(",")
+            if item.strip()]
+        self.export_languages = [
+            item.strip()
+            for item in self.config["Export"]["export_languages"].split(",")
+            if item.strip()]
+        # [Cache]
+        self.use_cache = self.config["Cache"].getboolean("use_cache")
+        self.cache_file = str(self.config["Cache"]["cache_file"])
+        self.cache_nominatim_ttl_hours = self.config["Cache"].getfloat(
+            "nominatim_ttl_hours")
+        self.cache_overpass_ttl_hours = self.config["Cache"].getfloat(
+            "overpass_ttl_hours")
+        self.cache_max_size_mb = self.config["Cache"].getfloat("max_size_mb")
+        self.boundary_index = self.config["Cache"].getboolean(
+            "boundary_index")
+        self.boundary_index_file = str(
+            self.config["Cache"]["boundary_index_file"])
+        self.incremental = self.config["Cache"].getboolean("incremental")
+        self.resumable = self.config["Cache"].getboolean("resumable")
+        # [Network]
+        self.nominatim_endpoint = str(
+            self.config["Network"]["nominatim_endpoint"])
+        self.overpass_endpoint = str(
+            self.config["Network"]["overpass_endpoint"])
+        self.nominatim_rate = self.config["Network"].getfloat(
+            "nominatim_rate")
+        self.overpass_rate = self.config["Network"].getfloat("overpass_rate")
+        self.max_concurrent_requests = self.config["Network"].getint(
+            "max_concurrent_requests")
+        self.max_retries = self.config["Network"].getint("max_retries")
+        self.backoff_base = self.config["Network"].getfloat("backoff_base")
+        self.overpass_timeout = self.config["Network"].getint(
+            "overpass_timeout")
+        # [Logging]
+        self.logging_level = self.config["Logging"]["logging_level"].upper()
+
+    def set_logger(self) -> None:
+        """Creates logger instance as self.logger_object.
+        """
+        self.logger_object = logger.set_logger(
+            log_level_name=self.logging_level)
+
+    def get_color(self, color_str: str) -> str:
+        """
+        Converts CSS3 color name or normalizes HEX color code to
+        format accepted by QT.
+
+        Args:
+            color_str (str): String with HEX color code or CSS3 color name
+
+        Returns:
+            str: Normalized HEX color code string
+        """
+        try:
+            normal_hex = normalize_hex(f"#{color_str}").lower()
+            return normal_hex
+        except ValueError:
+            pass
+        try:
+            normal_hex = name_to_hex(color_str).lower()
+            return normal_hex
+        except ValueError:
+            print("Parameter 'line_color' from 'config.ini' set incorrectly, "
+                  "using default 'red' (#ff0000) value instead")
+            return "#ff0000"
@@ -0,0 +1,15 @@
+import pytest
+import os
+import sys
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+
+import logger  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def log_dir(tmp_path_factory) -> str:
+    """Keeps logs of the test session out of the repository logs folder.
+    """
+    logger.LOG_DIR = str(tmp_path_factory.mktemp("logs"))
+    return logger.LOG_DIR
@@ -0,0 +1,368 @@
+import json
+import math
+import os
+import random
+import re
+import struct
+import zlib
+from typing import Any, Union
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+AREA_OFFSET = 3600000000  # Overpass area id of a relation
+
+
+def load_fixture(name: str) -> dict[str, Any]:
+    """
+    Loads recorded fixture: Nominatim and Overpass responses of a single
+    search object.
+
+    Args:
+        name (str): Fixture file name without extension
+
+    Returns:
+        dict[str, Any]: Fixture with "search" (Nominatim search results),
+            "lookup" ({"R1": Nominatim lookup result}), "admin" (Overpass
+            administrative relations) and "places" ({area id: Overpass
+            'points_query' elements}) keys
+    """
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"),
+              encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_fixture(fixture: dict[str, Any], name: str) -> None:
+    """Saves fixture into fixtures directory.
+
+    Args:
+        fixture (dict[str, Any]): Fixture (see 'load_fixture')
+        name (str): Fixture file name without extension
+    """
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "w",
+              encoding="utf-8") as file:
+        json.dump(fixture, file, ensure_ascii=False, indent=1)
+
+
+def circle_wkt(lon: float, lat: float, radius: float, vertices: int) -> str:
+    """Creates polygon WKT approximating a circle.
+
+    Args:
+        lon (float): Center longitude
+        lat (float): Center latitude
+        radius (float): Radius in degrees
+        vertices (int): Number of vertices
+
+    Returns:
+        str: Polygon WKT
+    """
+    coords = [(lon + radius * math.cos(2 * math.pi * i / vertices),
+               lat + radius * math.sin(2 * math.pi * i / vertices))
+              for i in range(vertices)]
+    coords.append(coords[0])
+    return "POLYGON((" + ", ".join(f"{x} {y}" for x, y in coords) + "))"
+
+
+def synthetic_country(relations: int = 2000, places: int = 100000,
+                      vertices: int = 200, seed: int = 0) -> dict[str, Any]:
+    """
+    Generates fixture of a large country: administrative level 4 relations
+    laid out in a grid, each with a round border and its share of place
+    nodes. Every place lies in its region and country areas, except 1% of
+    them, which are left to Nominatim lookup.
+
+    Args:
+        relations (int, optional): Number of regions. Defaults to 2000.
+        places (int, optional): Number of place nodes. Defaults to 100000.
+        vertices (int, optional): Border vertices of every region.
+            Defaults to 200.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        dict[str, Any]: Fixture (see 'load_fixture')
+    """
+    rng = random.Random(seed)
+    side = math.ceil(math.sqrt(relations))
+    country_id = 10
+    country_area = {"type": "area", "id": AREA_OFFSET + country_id,
+                    "tags": {"admin_level": "2", "boundary": "administrative",
+                             "name": "Country", "name:ru": "Country"}}
+    fixture: dict[str, Any] = {
+        "search": [{"osm_type": "relation", "osm_id": country_id,
+                    "display_name": "Country", "lat": "0", "lon": "0",
+                    "class": "boundary", "type": "administrative",
+                    "address": {"country": "Country"}}],
+        "lookup": {}, "admin": [], "places": {}}
+    for i in range(1, relations + 1):
+        lon, lat = (i % side) * 0.5, (i // side) * 0.5
+        name = f"Region {i}"
+        fixture["admin"].append({
+            "type": "relation", "id": i,
+            "tags": {"boundary": "administrative", "admin_level": "4",
+                     "name": name, "name:ru": name}})
+        fixture["lookup"][f"R{i}"] = {
+            "osm_type": "relation", "osm_id": i,
+            "geotext": circle_wkt(lon, lat, 0.2, vertices)}
+        fixture["places"][str(AREA_OFFSET + i)] = []
+    for node_id in range(1, places + 1):
+        region = node_id % relations + 1
+        lon = (region % side) * 0.5 + rng.uniform(-0.1, 0.1)
+        lat = (region // side) * 0.5 + rng.uniform(-0.1, 0.1)
+        elements = fixture["places"][str(AREA_OFFSET + region)]
+        elements.append({
+            "type": "node", "id": node_id, "lat": lat, "lon": lon,
+            "tags": {"place": rng.choice(["village", "hamlet", "town"]),
+                     "name": f"Place {node_id}"}})
+        if node_id % 100 == 0:
+            fixture["lookup"][f"N{node_id}"] = {
+                "osm_type": "node", "osm_id": node_id, "lat": str(lat),
+                "lon": str(lon), "address": {
+                    "village": f"Place {node_id}",
+                    "state": f"Region {region}", "country": "Country"}}
+            continue
+        elements.append({
+            "type": "area", "id": AREA_OFFSET + region,
+            "tags": {"admin_level": "4", "boundary": "administrative",
+                     "name": f"Region {region}",
+                     "name:ru": f"Region {region}"}})
+        elements.append(country_area)
+    return fixture
+
+
+def member_ways(border_wkt: str, first_way_id: int,
+                parts: int = 3) -> list[dict]:
+    """
+    Splits border rings into relation member ways with geometry, as
+    Overpass returns them with 'out geom'. Every ring is drawn by several
+    ways, every second of them in reverse direction.
+
+    Args:
+        border_wkt (str): Polygon or MultiPolygon WKT
+        first_way_id (int): Id of the first way
+        parts (int, optional): Ways per ring. Defaults to 3.
+
+    Returns:
+        list[dict]: Overpass relation members
+    """
+    import shapely
+
+    members = []
+    for polygon in shapely.get_parts(shapely.from_wkt(border_wkt)):
+        rings = [("outer", polygon.exterior)] + [
+            ("inner", ring) for ring in polygon.interiors]
+        for role, ring in rings:
+            coords = list(ring.coords)
+            step = math.ceil((len(coords) - 1) / parts)
+            for start in range(0, len(coords) - 1, step):
+                way = coords[start:start + step + 1]
+                if len(members) % 2:
+                    way.reverse()
+                members.append({
+                    "type": "way", "ref": first_way_id + len(members),
+                    "role": role, "geometry": [
+                        {"lat": lat, "lon": lon} for lon, lat in way]})
+    return members
+
+
+def overpass_responder(fixture: dict[str, Any]):
+    """
+    Creates Overpass response function of 'OSMStubServer' answering
+    queries from the fixture.
+
+    Args:
+        fixture (dict[str, Any]): Fixture (see 'load_fixture')
+
+    Returns:
+        Callable[[str], Union[dict, None]]: Response function
+    """
+    def with_geometry(element: dict) -> dict:
+        border = fixture["lookup"].get(f"R{element['id']}")
+        if border is None:
+            return element
+        return {**element, "members": member_ways(
+            border["geotext"], element["id"] * 1000)}
+
+    def respond(query: str) -> Union[dict, None]:
+        ids = re.search(r"relation\(id:([\d,]+)\)", query)
+        if ids is not None:
+            wanted = set(map(int, ids.group(1).split(",")))
+            return {"elements": [with_geometry(e) for e in fixture["admin"]
+                                 if e["id"] in wanted]}
+        if "node[place=" in query:
+            area_id = re.search(  # type: ignore
+                r"area\((\d+)\)", query).group(1)
+            elements = fixture["places"].get(area_id, [])
+            if "is_in" not in query:
+                elements = [e for e in elements if e["type"] == "node"]
+            return {"elements": elements}
+        level = re.search(r'"admin_level"="(\d+)"', query)
+        elements = [
+            e for e in fixture["admin"]
+            if level is None or e["tags"]["admin_level"] == level.group(1)]
+        if "out geom" in query:
+            elements = [with_geometry(e) for e in elements]
+        return {"elements": elements}
+    return respond
+
+
+def serve_fixture(Server: Any, fixture: dict[str, Any]) -> None:
+    """Makes 'OSMStubServer' answer requests from the fixture.
+
+    Args:
+        Server (OSMStubServer): Stub server
+        fixture (dict[str, Any]): Fixture (see 'load_fixture')
+    """
+    Server.search_results = fixture["search"]
+    Server.lookup_results = fixture["lookup"]
+    Server.overpass_response = overpass_responder(fixture)
+
+
+def _varint(value: int) -> bytes:
+    value &= (1 << 64) - 1
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _field(number: int, value: Union[int, bytes]) -> bytes:
+    if isinstance(value, int):
+        return _varint(number << 3) + _varint(value)
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+
+def _packed(values: list[int], delta: bool = False) -> bytes:
+    previous = 0
+    out = bytearray()
+    for value in values:
+        if delta:
+            value, previous = _zigzag(value - previous), value
+        out += _varint(value)
+    return bytes(out)
+
+
+def write_pbf(path: str, nodes: list[tuple[int, float, float, dict]],
+              ways: list[tuple[int, list[int]]],
+              relations: list[tuple[int, dict, list[tuple[str, int, str]]]],
+              dense: bool = True) -> None:
+    """
+    Writes minimal OSM PBF file: header block and a zlib compressed block
+    for every elements kind.
+
+    Args:
+        path (str): File path
+        nodes (list[tuple[int, float, float, dict]]): (id, lon, lat, tags)
+        ways (list[tuple[int, list[int]]]): (id, node ids)
+        relations (list[tuple[int, dict, list[tuple[str, int, str]]]]):
+            (id, tags, [(member type, member id, role)])
+        dense (bool, optional): Write nodes as dense nodes. Defaults to
+            True.
+    """
+    strings = [""]
+
+    def sid(string: str) -> int:
+        if string not in strings:
+            strings.append(string)
+        return strings.index(string)
+
+    def block(group: bytes) -> bytes:
+        table = b"".join(_field(1, s.encode("utf-8")) for s in strings)
+        return _field(1, table) + _field(2, group)
+
+    def blob(kind: str, data: bytes) -> bytes:
+        body = _field(2, len(data)) + _field(3, zlib.compress(data))
+        header = _field(1, kind.encode()) + _field(3, len(body))
+        return struct.pack(">I", len(header)) + header + body
+
+    if dense:
+        keys_vals: list[int] = []
+        for _, _, _, tags in nodes:
+            for key, value in tags.items():
+                keys_vals += [sid(key), sid(value)]
+            keys_vals.append(0)
+        group = _field(2, _field(1, _packed(
+            [n[0] for n in nodes], True)) + _field(8, _packed(
+                [round(n[2] * 1e7) for n in nodes], True)) + _field(9, _packed(
+                    [round(n[1] * 1e7) for n in nodes], True)) + _field(
+                        10, _packed(keys_vals)))
+    else:
+        group = b"".join(_field(1, _field(1, _zigzag(node_id)) + _field(
+            2, _packed([sid(k) for k in tags])) + _field(
+                3, _packed([sid(v) for v in tags.values()])) + _field(
+                    8, _zigzag(round(lat * 1e7))) + _field(
+                        9, _zigzag(round(lon * 1e7))))
+            for node_id, lon, lat, tags in nodes)
+    blocks = [block(group)]
+    strings[1:] = []
+    blocks.append(block(b"".join(
+        _field(3, _field(1, way_id) + _field(8, _packed(refs, True)))
+        for way_id, refs in ways)))
+    group = b""
+    for relation_id, tags, members in relations:
+        group += _field(4, _field(1, relation_id) + _field(
+            2, _packed([sid(k) for k in tags])) + _field(
+                3, _packed([sid(v) for v in tags.values()])) + _field(
+                    8, _packed([sid(m[2]) for m in members])) + _field(
+                        9, _packed([m[1] for m in members], True)) + _field(
+                            10, _packed([("node", "way", "relation").index(
+                                m[0]) for m in members])))
+    blocks.append(block(group))
+    with open(path, "wb") as file:
+        file.write(blob("OSMHeader", _field(4, b"OsmSchema-V0.6")))
+        for data in blocks:
+            file.write(blob("OSMData", data))
+
+
+def pbf_country(path: str, dense: bool = True) -> None:
+    """
+    Writes PBF extract of a rectangular country (0-4, 0-2 degrees) with
+    two states, a county and a hole in the eastern state, and six places.
+
+    Args:
+        path (str): File path
+        dense (bool, optional): Write nodes as dense nodes. Defaults to
+            True.
+    """
+    nodes: list[tuple[int, float, float, dict]] = []
+    ways: list[tuple[int, list[int]]] = []
+
+    def ring(way_id: int, coords: list[tuple[float, float]]) -> list[int]:
+        refs = []
+        for lon, lat in coords:
+            nodes.append((len(nodes) + 1, lon, lat, {}))
+            refs.append(len(nodes))
+        ways.append((way_id, refs))
+        return refs
+
+    # Country border is split into two ways sharing end nodes
+    south = ring(10, [(0, 0), (4, 0), (4, 2)])
+    north = ring(11, [(4, 2), (0, 2), (0, 0)])
+    ways[-1] = (11, [south[-1], *north[1:-1], south[0]])
+    ring(20, [(0, 0), (2, 0), (2, 2), (0, 2), (0, 0)])
+    ring(30, [(2, 0), (4, 0), (4, 2), (2, 2), (2, 0)])
+    ring(31, [(2.5, 0.5), (3.5, 0.5), (3.5, 1.5), (2.5, 1.5), (2.5, 0.5)])
+    ring(40, [(0, 0), (1, 0), (1, 2), (0, 2), (0, 0)])
+    places = [("Town", "town", 0.5, 1), ("Village", "village", 1.5, 1),
+              ("City", "city", 2.2, 1), ("Hamlet", "hamlet", 3, 1),
+              ("Locality", "locality", 2.2, 0.2),
+              ("Edge", "village", 3.8, 1.8)]
+    for i, (name, place, lon, lat) in enumerate(places):
+        nodes.append((1000 + i, lon, lat, {"place": place, "name": name,
+                                           "name:ru": f"{name} ru"}))
+
+    def admin(level: int, name: str) -> dict:
+        return {"boundary": "administrative", "admin_level": str(level),
+                "type": "boundary", "name": name, "name:en": name}
+
+    relations = [
+        (1, admin(2, "Country"), [("way", 10, "outer"), ("way", 11, "outer"),
+                                  ("node", 1000, "label")]),
+        (2, admin(4, "West"), [("way", 20, "outer")]),
+        (3, admin(4, "East"), [("way", 30, "outer"), ("way", 31, "inner")]),
+        (4, admin(6, "County"), [("way", 40, "outer")]),
+        (5, {"type": "route", "name": "Road"}, [("way", 10, "")])]
+    write_pbf(path, nodes, ways, relations, dense)
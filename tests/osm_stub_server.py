@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Union
+from urllib.parse import parse_qs, urlparse
+
+
+class OSMStubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for Nominatim and Overpass endpoints, which counts
+    received requests.
+    """
+    def __init__(self) -> None:
+        super(OSMStubServer, self).__init__(("127.0.0.1", 0), _StubHandler)
+        self.requests: Counter = Counter()
+        # Sent response bodies sizes {path: bytes}
+        self.sent: Counter = Counter()
+        self.lookup_ids: list[list[str]] = []
+        self.search_results: list[dict] = []
+        self.lookup_results: dict[str, dict] = {}
+        # Returns Overpass response json or None to reply with an error
+        self.overpass_response: Callable[[str], Union[dict, None]] = \
+            lambda query: {"elements": []}
+        # Static files {path: content}, served with 'files_delay' seconds
+        self.files: dict[str, bytes] = {}
+        self.files_delay = 0.0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def __enter__(self) -> "OSMStubServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: OSMStubServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _reply(self, data: Any, content_type: str = "application/json"
+               ) -> None:
+        body = data if isinstance(data, bytes) else \
+            json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.sent[urlparse(self.path).path] += len(body)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        self.server.requests[url.path] += 1
+        if url.path == "/status":
+            self._reply(b"Rate limit: 0\n", "text/plain")
+        elif url.path == "/lookup":
+            ids = params["osm_ids"][0].split(",")
+            self.server.lookup_ids.append(ids)
+            self._reply([self.server.lookup_results[i] for i in ids
+                         if i in self.server.lookup_results])
+        elif url.path == "/search":
+            self._reply(self.server.search_results)
+        elif url.path in self.server.files:
+            time.sleep(self.server.files_delay)
+            self._reply(self.server.files[url.path], "image/png")
+        else:
+            self.send_error(404)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        self.server.requests[url.path] += 1
+        length = int(self.headers["Content-Length"])
+        query = parse_qs(self.rfile.read(length).decode("utf-8"))["data"][0]
+        response = self.server.overpass_response(query)
+        if response is None:
+            self.send_error(500)
+        else:
+            self._reply(response)
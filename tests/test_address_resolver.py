@@ -0,0 +1,127 @@
+import pytest
+import os
+import sys
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from OSMPythonTools.nominatim import Nominatim  # noqa: E402
+from OSMPythonTools.overpass import Overpass  # noqa: E402
+from tempdata import TempData   # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+
+
+def area(admin_level: int, name: str) -> dict:
+    return {"type": "area", "id": 3600000000 + admin_level,
+            "tags": {"boundary": "administrative",
+                     "admin_level": str(admin_level), "name": name,
+                     "name:en": f"{name}_en"}}
+
+
+def node(node_id: int, tags: dict) -> dict:
+    return {"type": "node", "id": node_id, "lat": 55.0, "lon": 37.0,
+            "tags": tags}
+
+
+@pytest.fixture
+def Server() -> OSMStubServer:
+    with OSMStubServer() as Server:
+        yield Server
+
+
+@pytest.fixture
+def Crawler(Server: OSMStubServer) -> EarthCrawler:
+    Tmp = TempData()
+    Tmp.objects_language = "en"
+    Tmp.use_cache = False
+    Tmp.search_places_choice = ["village", "town"]
+    Tmp.local_addresses = False
+    Crawler = EarthCrawler(Tmp)
+    Crawler.nominatim = Nominatim(endpoint=Server.endpoint)
+    Crawler.overpass = Overpass(endpoint=Server.endpoint)
+    return Crawler
+
+
+def test_points_query(Crawler: EarthCrawler) -> None:
+    query = Crawler.address_resolver.points_query(3600000042)
+    assert query.startswith("area(3600000042)->.a1;")
+    assert "node[place='village'](area.a1);" in query
+    assert "node[place='town'](area.a1);" in query
+    assert ".p is_in->.i;" in query
+
+
+def test_resolve_from_overpass_areas(Crawler: EarthCrawler,
+                                     Server: OSMStubServer) -> None:
+    elements = []
+    for i in range(1, 101):
+        elements += [node(i, {"place": "village", "name": f"V{i}",
+                              "name:en": f"V{i}_en"}),
+                     area(2, "Country"), area(4, "State"), area(6, "County")]
+    Server.overpass_response = lambda query: {"elements": elements}
+    points = Crawler.overpass.query(
+        Crawler.address_resolver.points_query(3600000042))
+    nodes, containers = Crawler.address_resolver.split_result(points)
+    addresses = Crawler.address_resolver.resolve(nodes, containers)
+    assert len(nodes) == 100
+    assert addresses[7] == {"location": "V7_en", "county": "County_en",
+                            "state": "State_en", "country": "Country_en"}
+    assert Server.requests["/interpreter"] == 1
+    assert Server.requests["/lookup"] == 0
+
+
+def test_resolve_falls_back_to_batched_lookup(Crawler: EarthCrawler,
+                                              Server: OSMStubServer) -> None:
+    elements = [node(i, {"place": "town"}) for i in range(1, 121)]
+    Server.overpass_response = lambda query: {"elements": elements}
+    Server.lookup_results = {
+        f"N{i}": {"osm_type": "node", "osm_id": i,
+                  "address": {"town": f"T{i}", "state": "State",
+                              "country": "Country"}}
+        for i in range(1, 121)}
+    points = Crawler.overpass.query(
+        Crawler.address_resolver.points_query(3600000042))
+    addresses = Crawler.address_resolver.resolve(
+        *Crawler.address_resolver.split_result(points))
+    assert addresses[120] == {"location": "T120", "state": "State",
+                              "country": "Country"}
+    assert Server.requests["/lookup"] == 3
+    assert [len(ids) for ids in Server.lookup_ids] == [50, 50, 20]
+
+
+def test_resolve_locally(Crawler: EarthCrawler, Server: OSMStubServer) -> None:
+    Crawler.Tmp.local_addresses = True
+    Crawler.Tmp.search_type = "world"
+    relations = [(1, 4, "POLYGON((0 0, 10 0, 10 10, 0 10, 0 0))"),
+                 (2, 6, "POLYGON((0 0, 5 0, 5 5, 0 5, 0 0))"),
+                 (3, 6, "POLYGON((5 5, 10 5, 10 10, 5 10, 5 5))")]
+    Server.search_results = [{"osm_type": "relation", "osm_id": 42,
+                              "display_name": "Country",
+                              "address": {"country": "Country"}}]
+    Server.lookup_results = {
+        f"R{i}": {"osm_type": "relation", "osm_id": i, "geotext": text}
+        for i, _, text in relations}
+    nodes = [{"type": "node", "id": i, "lat": i, "lon": i,
+              "tags": {"place": "village", "name": f"V{i}"}}
+             for i in range(1, 10)]
+    Server.overpass_response = lambda query: {"elements": [
+        {"type": "relation", "id": i, "tags": {
+            "boundary": "administrative", "admin_level": str(level),
+            "name": f"L{level}-{i}"}}
+        for i, level, _ in relations]} if "relation" in query else {
+        "elements": nodes}
+    Crawler.first_nominatim_search(("Country", 4))
+    regions = Crawler.overpass_search("r42", ("Country", 4))
+    assert Crawler.address_resolver.borders == {1: relations[0][2]}
+    points = Crawler.overpass.query(
+        Crawler.address_resolver.points_query(3600000001))
+    addresses = Crawler.address_resolver.resolve(
+        *Crawler.address_resolver.split_result(points))
+    assert addresses[2] == {"location": "V2", "county": "L6-2",
+                            "state": "L4-1", "country": "Country"}
+    assert addresses[7] == {"location": "V7", "county": "L6-3",
+                            "state": "L4-1", "country": "Country"}
+    # Single batch of borders, exported region border is reused
+    assert Server.lookup_ids == [["R1", "R2", "R3"]]
+    assert Crawler.fetch_region_wkt(regions.relations()[0]) == \
+        relations[0][2]
+    assert Server.requests["/lookup"] == 1
@@ -0,0 +1,33 @@
+import os
+import sys
+from shapely import box
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from admin_areas import AdminAreaIndex  # noqa: E402
+
+
+def test_assign() -> None:
+    Index = AdminAreaIndex()
+    assert Index.assign([0.5], [0.5]) == [{}]
+    Index.add(box(0, 0, 10, 10), "country", "Country")
+    Index.add(box(0, 0, 5, 10), "state", "West")
+    Index.add(box(5, 0, 10, 10), "state", "East")
+    Index.add(box(0, 0, 2, 2), "county", "Corner")
+    addresses = Index.assign([1, 7, 20], [1, 7, 20])
+    assert addresses == [
+        {"country": "Country", "state": "West", "county": "Corner"},
+        {"country": "Country", "state": "East"}, {}]
+    # Areas added later are indexed too
+    Index.add(box(6, 6, 8, 8), "county", "Middle")
+    assert Index.assign([7], [7]) == [
+        {"country": "Country", "state": "East", "county": "Middle"}]
+
+
+def test_overlapping_areas() -> None:
+    Index = AdminAreaIndex()
+    Index.add(box(0, 0, 10, 10), "state", "Large")
+    Index.add(box(0, 0, 1, 1), "state", "Small")
+    # The smallest area wins, border points belong to areas too
+    assert Index.assign([0.5, 5, 10], [0.5, 5, 5]) == [
+        {"state": "Small"}, {"state": "Large"}, {"state": "Large"}]
@@ -0,0 +1,220 @@
+import pytest
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData, CrawlCancelled  # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from osm_api import TokenBucket  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+
+
+def overpass_response(query: str) -> dict:
+    if "node[place=" in query:
+        area_id = int(query[query.index("(") + 1:query.index(")")])
+        return {"elements": [
+            {"type": "node", "id": area_id, "lat": 1.5, "lon": 1.5,
+             "tags": {"place": "village", "name": f"V{area_id}"}},
+            {"type": "area", "id": 3600000002,
+             "tags": {"admin_level": "2", "name": "Country"}}]}
+    return {"elements": [
+        {"type": "relation", "id": i,
+         "tags": {"boundary": "administrative", "admin_level": "4",
+                  "name": f"R{i}", "name:ru": f"R{i}"}}
+        for i in range(1, 4)]}
+
+
+@pytest.fixture
+def Server() -> OSMStubServer:
+    with OSMStubServer() as Server:
+        Server.search_results = [{"osm_type": "relation", "osm_id": 10,
+                                  "display_name": "Country"}]
+        Server.lookup_results = {
+            f"R{i}": {"osm_type": "relation", "osm_id": i,
+                      "geotext": "POLYGON((1 1, 2 1, 2 2, 1 1))"}
+            for i in range(1, 4)}
+        Server.overpass_response = overpass_response
+        yield Server
+
+
+@pytest.fixture
+def Crawler(Server: OSMStubServer, tmp_path) -> EarthCrawler:
+    Tmp = TempData()
+    Tmp.use_cache = False
+    Tmp.search_line = "A; B"
+    Tmp.search_type = "world"
+    Tmp.export_to_kml = True
+    Tmp.polygons_to_lines = False
+    Tmp.kmz = False
+    Tmp.export_dir = str(tmp_path)
+    Tmp.export_to_excel = False
+    Tmp.local_addresses = False
+    Tmp.nominatim_endpoint = Server.endpoint
+    Tmp.overpass_endpoint = Server.endpoint
+    Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+    return EarthCrawler(Tmp)
+
+
+def test_token_bucket() -> None:
+    Bucket = TokenBucket(rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        Bucket.acquire()
+    assert time.monotonic() - start >= 0.19
+
+
+def test_crawl(Crawler: EarthCrawler, Server: OSMStubServer) -> None:
+    Crawler.request_and_proccess_data()
+    # Crawl is not resumable, so no journal is written
+    assert not os.path.exists(os.path.join(Crawler.Tmp.export_dir, ".state"))
+    assert Server.requests["/search"] == 2
+    assert Server.requests["/lookup"] == 6
+    assert Crawler.Tmp.error_found == 0
+    ns = {"kml": "http://www.opengis.net/kml/2.2"}
+    for name in ["A", "B"]:
+        doc = ET.parse(os.path.join(Crawler.Tmp.export_dir,
+                                    f"{name} (polygons).kml"))
+        folders = doc.findall("kml:Document/kml:Folder", ns)
+        assert [f.findtext("kml:name", namespaces=ns) for f in folders] == [
+            "R1", "R2", "R3"]
+        assert [f.findtext("kml:Placemark[kml:Point]/kml:name",
+                           namespaces=ns) for f in folders] == [
+            "V3600000001", "V3600000002", "V3600000003"]
+
+
+def test_resume(Crawler: EarthCrawler, Server: OSMStubServer) -> None:
+    Crawler.Tmp.search_line = "A"
+    Crawler.Tmp.max_retries = 0
+    Crawler.Tmp.resumable = True
+    Server.overpass_response = lambda query: None \
+        if "area(3600000003)" in query else overpass_response(query)
+    Crawler = EarthCrawler(Crawler.Tmp)
+    Crawler.request_and_proccess_data()
+    kml_path = os.path.join(Crawler.Tmp.export_dir, "A (polygons).kml")
+    assert not os.path.exists(kml_path)
+    assert Server.requests["/lookup"] == 3
+
+    Server.overpass_response = overpass_response
+    Crawler.Tmp.resume = True
+    Crawler = EarthCrawler(Crawler.Tmp)
+    Crawler.request_and_proccess_data()
+    assert Server.requests["/lookup"] == 4  # Only the failed region
+    doc = ET.parse(kml_path)
+    names = [e.text for e in doc.iter("{http://www.opengis.net/kml/2.2}name")]
+    assert names == ["A", "R1", "R1", "V3600000001", "R2", "R2",
+                     "V3600000002", "R3", "R3", "V3600000003"]
+    assert not os.listdir(os.path.join(Crawler.Tmp.export_dir, ".state"))
+
+
+def test_incremental(Crawler: EarthCrawler, Server: OSMStubServer) -> None:
+    Crawler.Tmp.search_line = "A"
+    Crawler.Tmp.incremental = True
+    Crawler.request_and_proccess_data()
+    assert Server.requests["/lookup"] == 3
+    state_path = os.path.join(Crawler.Tmp.export_dir, ".state", "A.jsonl")
+    with open(state_path, encoding="utf-8") as file:
+        crawled = json.loads(file.readline())["crawled"]
+    assert crawled is not None
+
+    queries = []
+
+    def changes_response(query: str) -> dict:
+        if "newer:" not in query:
+            return overpass_response(query)
+        queries.append(query)
+        # R2 border has changed, the only place of R3 is deleted
+        return {"elements": [
+            {"type": "relation", "id": 2},
+            {"type": "node", "id": 3600000001},
+            {"type": "node", "id": 3600000002}]}
+
+    Server.overpass_response = changes_response
+    Server.lookup_results["R2"] = {"osm_type": "relation", "osm_id": 2,
+                                   "geotext": "POLYGON((5 5, 6 5, 6 6, 5 5))"}
+    interpreter = Server.requests["/interpreter"]
+    Crawler = EarthCrawler(Crawler.Tmp)
+    Crawler.request_and_proccess_data()
+    assert len(queries) == 1 and f'(newer:"{crawled}")' in queries[0]
+    # Only changed regions R2 and R3 are requested: regions, changes and
+    # places queries, borders lookups
+    assert Server.requests["/lookup"] == 5
+    assert Server.requests["/interpreter"] - interpreter == 4
+    doc = ET.parse(os.path.join(Crawler.Tmp.export_dir, "A (polygons).kml"))
+    names = [e.text for e in doc.iter("{http://www.opengis.net/kml/2.2}name")]
+    assert names == ["A", "R1", "R1", "V3600000001", "R2", "R2",
+                     "V3600000002", "R3", "R3", "V3600000003"]
+    coords = [e.text for e in doc.iter(
+        "{http://www.opengis.net/kml/2.2}coordinates")]
+    assert coords[0] != coords[2] and coords[2].startswith("5")
+    with open(state_path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert [record.get("id") for record in records[1:]] == [1, 2, 3]
+
+
+def test_cancel(Crawler: EarthCrawler) -> None:
+    Crawler.Tmp.search_line = "A"
+    Crawler.Tmp.resumable = True
+    add_locations = Crawler.add_locations
+
+    def add_and_cancel(kml_doc, dict_list) -> None:
+        add_locations(kml_doc, dict_list)
+        Crawler.Tmp.request_cancel()
+
+    Crawler.add_locations = add_and_cancel  # type: ignore
+    with pytest.raises(CrawlCancelled):
+        Crawler.request_and_proccess_data()
+    # Exported region is kept in a valid document and in the journal
+    doc = ET.parse(os.path.join(Crawler.Tmp.export_dir, "A (polygons).kml"))
+    names = [e.text for e in doc.iter("{http://www.opengis.net/kml/2.2}name")]
+    assert names == ["A", "R1", "R1", "V3600000001"]
+    assert os.listdir(os.path.join(Crawler.Tmp.export_dir, ".state")) == [
+        "A.jsonl"]
+
+
+def test_crawl_tables(Crawler: EarthCrawler) -> None:
+    Crawler.Tmp.search_line = "A"
+    Crawler.Tmp.export_to_excel = True
+    Crawler.Tmp.table_formats = ["csv", "xlsx"]
+    Crawler.request_and_proccess_data()
+    # Tables are named after the chosen Nominatim result
+    with open(os.path.join(Crawler.Tmp.export_dir, "Country.csv"),
+              encoding="utf-8") as file:
+        rows = [line.split(",")[:2] for line in file.read().splitlines()]
+    assert rows == [["area", "location"], ["R1", "V3600000001"],
+                    ["R2", "V3600000002"], ["R3", "V3600000003"]]
+    assert os.path.exists(os.path.join(Crawler.Tmp.export_dir,
+                                       "Country.xlsx"))
+
+
+def test_crawl_features(Crawler: EarthCrawler) -> None:
+    Crawler.Tmp.search_line = "A"
+    Crawler.Tmp.feature_formats = ["geojsonl", "fgb"]
+    Crawler.request_and_proccess_data()
+    for layer in ["borders", "points"]:
+        with open(os.path.join(Crawler.Tmp.export_dir,
+                               f"A {layer}.geojsonl"),
+                  encoding="utf-8") as file:
+            features = [json.loads(line) for line in file]
+        assert [f["properties"]["name" if layer == "borders" else "area"]
+                for f in features] == ["R1", "R2", "R3"]
+        assert os.path.exists(os.path.join(Crawler.Tmp.export_dir,
+                                           f"A {layer}.fgb"))
+    assert features[0]["properties"]["location"] == "V3600000001"
+
+
+def test_crawl_geometry_workers(Crawler: EarthCrawler) -> None:
+    Crawler.Tmp.search_line = "A"
+    Crawler.request_and_proccess_data()
+    kml_path = os.path.join(Crawler.Tmp.export_dir, "A (polygons).kml")
+    with open(kml_path, encoding="utf-8") as file:
+        expected = file.read()
+    os.remove(kml_path)
+    Crawler.Tmp.geometry_workers = 2
+    Crawler = EarthCrawler(Crawler.Tmp)
+    Crawler.request_and_proccess_data()
+    with open(kml_path, encoding="utf-8") as file:
+        assert file.read() == expected
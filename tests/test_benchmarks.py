@@ -0,0 +1,164 @@
+"""
+Crawl benchmarks against the local OSM stub server, fed with a synthetic
+large country (scaled by EARTH_CRAWLER_BENCH_SCALE environment variable,
+1 = 2000 regions and 100k places). Besides wall time measured by
+pytest-benchmark, every benchmark stores requests per round and peak RSS
+in 'extra_info'. Results are compared across commits with:
+
+    pytest tests/test_benchmarks.py --benchmark-autosave
+    pytest tests/test_benchmarks.py --benchmark-compare
+
+Run the rest of the tests with '--benchmark-skip'.
+"""
+import pytest
+import os
+import sys
+from collections import Counter
+from typing import Any, Callable, Union
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+pytest.importorskip("pytest_benchmark")
+from tempdata import TempData  # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+from osm_fixtures import serve_fixture, synthetic_country  # noqa: E402
+
+SCALE = float(os.environ.get("EARTH_CRAWLER_BENCH_SCALE", "1"))
+REQUEST = ("Country", 4)
+
+
+def reset_peak_rss() -> None:
+    """Resets process peak RSS (Linux only).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> Union[float, None]:
+    """
+    Returns process peak RSS: since the last 'reset_peak_rss' on Linux,
+    since the process start on other Unix systems.
+
+    Returns:
+        Union[float, None]: Peak RSS in megabytes, None if unknown
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+@pytest.fixture(scope="module")
+def Server() -> OSMStubServer:
+    with OSMStubServer() as Server:
+        serve_fixture(Server, synthetic_country(
+            relations=max(1, int(2000 * SCALE)),
+            places=max(1, int(100000 * SCALE))))
+        yield Server
+
+
+def make_crawler(Server: OSMStubServer, export_dir: str) -> EarthCrawler:
+    Tmp = TempData()
+    Tmp.use_cache = False
+    Tmp.search_line = REQUEST[0]
+    Tmp.search_type = "world"
+    Tmp.export_dir = export_dir
+    Tmp.export_to_kml = True
+    Tmp.export_to_excel = False
+    Tmp.feature_formats = []
+    Tmp.logging_level = "WARNING"
+    Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+    Tmp.nominatim_rate = Tmp.overpass_rate = 1e6
+    Tmp.logger_object.setLevel("WARNING")
+    return EarthCrawler(Tmp)
+
+
+def run(benchmark: Any, Server: OSMStubServer,
+        setup: Callable[[], tuple[tuple, dict]], func: Callable,
+        rounds: int = 1) -> Any:
+    """
+    Benchmarks function, recording requests per round and peak RSS.
+
+    Args:
+        benchmark (Any): pytest-benchmark fixture
+        Server (OSMStubServer): Stub server
+        setup (Callable[[], tuple[tuple, dict]]): Returns function
+            arguments of a round
+        func (Callable): Benchmarked function
+        rounds (int, optional): Number of rounds. Defaults to 1.
+
+    Returns:
+        Any: Function result
+    """
+    def round_setup() -> tuple[tuple, dict]:
+        args = setup()
+        Server.requests.clear()
+        reset_peak_rss()
+        return args
+
+    result = benchmark.pedantic(func, setup=round_setup, rounds=rounds,
+                                iterations=1)
+    benchmark.extra_info["requests"] = dict(Counter(Server.requests))
+    benchmark.extra_info["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def test_first_nominatim_search(benchmark: Any, Server: OSMStubServer,
+                                tmp_path) -> None:
+    Crawler = make_crawler(Server, str(tmp_path))
+    result = run(benchmark, Server, lambda: ((REQUEST,), {}),
+                 Crawler.first_nominatim_search, rounds=20)
+    assert result == "r10"
+
+
+def test_overpass_search(benchmark: Any, Server: OSMStubServer,
+                         tmp_path) -> None:
+    Crawler = make_crawler(Server, str(tmp_path))
+    result = run(benchmark, Server, lambda: (("r10", REQUEST), {}),
+                 Crawler.overpass_search, rounds=5)
+    assert len(result.relations()) == max(1, int(2000 * SCALE))
+
+
+def test_second_nominatim_search(benchmark: Any, Server: OSMStubServer,
+                                 tmp_path) -> None:
+    Crawler = make_crawler(Server, str(tmp_path))
+
+    def setup() -> tuple[tuple, dict]:
+        Crawler.first_nominatim_search(REQUEST)
+        return (Crawler.overpass_search("r10", REQUEST),), {}
+
+    run(benchmark, Server, setup, Crawler.second_nominatim_search)
+    Crawler.export_results(REQUEST)
+    assert Crawler.Tmp.points_done == max(1, int(100000 * SCALE))
+
+
+def test_crawl_exports(benchmark: Any, Server: OSMStubServer,
+                       tmp_path) -> None:
+    Crawler = make_crawler(Server, str(tmp_path))
+
+    def setup() -> tuple[tuple, dict]:
+        Crawler.Tmp.export_to_excel = True
+        Crawler.Tmp.table_formats = ["xlsx", "csv", "gpkg"]
+        Crawler.Tmp.feature_formats = ["geojsonl", "fgb"]
+        return (), {}
+
+    run(benchmark, Server, setup, Crawler.request_and_proccess_data)
+    assert Crawler.Tmp.failed_objects == []
+    assert sorted(os.listdir(tmp_path)) == sorted([
+        "Country.csv", "Country.gpkg", "Country.xlsx",
+        "Country (polygons).kml", "Country borders.fgb",
+        "Country borders.geojsonl", "Country points.fgb",
+        "Country points.geojsonl"])
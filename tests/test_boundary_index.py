@@ -0,0 +1,121 @@
+import pytest
+import os
+import shapely
+import sqlite3
+import sys
+import time
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData  # noqa: E402
+from boundary_index import BoundaryIndex  # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+from osm_fixtures import serve_fixture, synthetic_country  # noqa: E402
+
+
+@pytest.fixture
+def Tmp(tmp_path) -> TempData:
+    Tmp = TempData()
+    Tmp.boundary_index_file = str(tmp_path / "boundaries.sqlite")
+    return Tmp
+
+
+def relation(relation_id: int, level: int) -> dict:
+    return {"type": "relation", "id": relation_id,
+            "tags": {"boundary": "administrative",
+                     "admin_level": str(level), "name": f"R{relation_id}",
+                     "name:de": f"R{relation_id} de"}}
+
+
+def box(x1: float, y1: float, x2: float, y2: float) -> str:
+    return f"POLYGON(({x1} {y1}, {x2} {y1}, {x2} {y2}, {x1} {y2}, {x1} {y1}))"
+
+
+def test_children(Tmp: TempData) -> None:
+    Index = BoundaryIndex(Tmp)
+    assert Index.children(10) is None
+    # Combined search of the country 10: two states and their counties
+    Index.add_relations(10, None, [
+        relation(1, 4), relation(2, 4), relation(11, 6), relation(21, 6)])
+    assert [e["id"] for e in Index.children(10, 4)] == [1, 2]
+    assert Index.children(10)[2]["tags"]["name:de"] == "R11 de"
+    # Counties of the state 1 are known only with all borders
+    assert Index.children(1, 6) is None
+    Index.add_borders({1: box(0, 0, 2, 2), 2: box(2, 0, 4, 2),
+                       11: box(0, 0, 1, 1)})
+    assert Index.children(1, 6) is None
+    Index.add_borders({21: box(2, 0, 3, 1)})
+    assert [e["id"] for e in Index.children(1, 6)] == [11]
+    assert Index.children(2, 5) == []
+    borders = Index.borders([1, 99])
+    assert list(borders) == [1]
+    assert shapely.from_wkb(borders[1]).equals(
+        shapely.from_wkt(box(0, 0, 2, 2)))
+    Index.close()
+
+
+def test_expiry(Tmp: TempData, monkeypatch) -> None:
+    Index = BoundaryIndex(Tmp)
+    Index.add_search(["world|bayern"], [{"osm_id": 1}])
+    Index.add_relations(10, None, [relation(1, 4), relation(2, 4)])
+    Index.add_borders({1: box(0, 0, 2, 2), 2: box(2, 0, 4, 2)})
+    now = time.time()
+    # Overpass data expires earlier than Nominatim searches
+    monkeypatch.setattr(
+        time, "time", lambda: now + Tmp.cache_overpass_ttl_hours * 3600 + 1)
+    assert Index.search("world|bayern") == [{"osm_id": 1}]
+    assert Index.children(10, 4) is None
+    assert Index.borders([1, 2]) == {}
+    assert Index.stored_borders([1, 2]) == set()
+    # Search again replaces relations found before
+    Index.add_relations(10, None, [relation(2, 4), relation(3, 4)])
+    assert [e["id"] for e in Index.children(10, 4)] == [2, 3]
+    assert Index.stored_borders([1, 2]) == set()
+    Index.add_borders({2: box(2, 0, 4, 2)})
+    assert Index.stored_borders([1, 2]) == {2}
+    monkeypatch.setattr(
+        time, "time", lambda: now + Tmp.cache_nominatim_ttl_hours * 3600 + 1)
+    assert Index.search("world|bayern") is None
+    Index.close()
+
+
+def test_search(Tmp: TempData) -> None:
+    Index = BoundaryIndex(Tmp)
+    assert Index.search("world|bayern") is None
+    Index.add_search(["world|bayern", "world|bayern|de"], [{"osm_id": 1}])
+    assert Index.search("world|bayern|de") == [{"osm_id": 1}]
+    Index.close()
+
+
+def test_repeated_crawl(tmp_path) -> None:
+    fixture = synthetic_country(relations=3, places=30)
+    fixture["search"][0].update(
+        addresstype="country", display_name="Country",
+        namedetails={"name": "Country", "name:en": "Country en"})
+    with OSMStubServer() as Server:
+        serve_fixture(Server, fixture)
+        for language, lines in [("ru", False), ("en", True)]:
+            Tmp = TempData()
+            Tmp.cache_file = str(tmp_path / "osm_cache.sqlite")
+            Tmp.boundary_index_file = str(tmp_path / "boundaries.sqlite")
+            Tmp.search_line = "Country"
+            Tmp.search_type = "world"
+            Tmp.objects_language = language
+            Tmp.polygons_to_lines = lines
+            Tmp.export_dir = str(tmp_path)
+            Tmp.export_to_excel = False
+            Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+            Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+            Server.requests.clear()
+            Crawler = EarthCrawler(Tmp)
+            Crawler.request_and_proccess_data()
+            # Index connection is closed with the crawl
+            with pytest.raises(sqlite3.ProgrammingError):
+                Crawler.source.index.search("world|country")
+            assert Tmp.regions_done == 3
+            assert Tmp.points_done == 30
+    # Regions and borders come from the index, places query does not
+    # depend on language and comes from the responses cache
+    assert sum(Server.requests.values()) == 0
+    assert Tmp.current_obj_name == "Country en"
@@ -0,0 +1,75 @@
+import pytest
+import json
+import os
+import sys
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from cli import main, EXIT_OK, EXIT_USAGE, EXIT_FAILED  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+from test_async_crawler import overpass_response  # noqa: E402
+
+
+@pytest.fixture
+def Server() -> OSMStubServer:
+    with OSMStubServer() as Server:
+        Server.search_results = [{"osm_type": "relation", "osm_id": 10,
+                                  "display_name": "Country"}]
+        Server.lookup_results = {
+            f"R{i}": {"osm_type": "relation", "osm_id": i,
+                      "geotext": "POLYGON((1 1, 2 1, 2 2, 1 1))"}
+            for i in range(1, 4)}
+        Server.overpass_response = overpass_response
+        yield Server
+
+
+def crawl_args(Server: OSMStubServer, tmp_path) -> list[str]:
+    return ["crawl", "-o", str(tmp_path),
+            "--summary", str(tmp_path / "summary.json"),
+            "--set", "use_cache=False", "--set", "export_to_excel=False",
+            "--set", "search_type=world",
+            "--set", f"Network.nominatim_endpoint={Server.endpoint}",
+            "--set", f"overpass_endpoint={Server.endpoint}",
+            "--set", "nominatim_rate=1000", "--set", "overpass_rate=1000"]
+
+
+def test_crawl_jobs(Server: OSMStubServer, tmp_path) -> None:
+    jobs_file = tmp_path / "jobs.txt"
+    jobs_file.write_text('# comment\nB\n{"search": "C"}\n', encoding="utf-8")
+    args = crawl_args(Server, tmp_path) + [
+        "A", "-f", str(jobs_file), "-w", "2"]
+    assert main(args) == EXIT_OK
+    summary = json.loads((tmp_path / "summary.json").read_text("utf-8"))
+    assert [job["search"] for job in summary["jobs"]] == ["A", "B", "C"]
+    assert summary["total"] == {**summary["total"], "jobs": 3, "failed": 0,
+                                "regions": 9, "points": 9}
+    for name in ["A", "B", "C"]:
+        assert os.path.exists(tmp_path / f"{name} (polygons).kml")
+
+
+def test_crawl_failed(Server: OSMStubServer, tmp_path) -> None:
+    Server.overpass_response = lambda query: {"elements": []}
+    assert main(crawl_args(Server, tmp_path) + ["A"]) == EXIT_FAILED
+    summary = json.loads((tmp_path / "summary.json").read_text("utf-8"))
+    assert summary["jobs"][0]["failed_objects"] == ["A"]
+
+
+@pytest.mark.parametrize("before_command", [True, False])
+def test_crawl_resume(Server: OSMStubServer, tmp_path,
+                      before_command: bool) -> None:
+    Server.overpass_response = lambda query: None \
+        if "area(3600000003)" in query else overpass_response(query)
+    args = crawl_args(Server, tmp_path) + [
+        "--set", "max_retries=0", "--set", "local_addresses=False",
+        "--set", "resumable=True", "A"]
+    assert main(args) == EXIT_FAILED
+    assert Server.requests["/lookup"] == 3
+    Server.overpass_response = overpass_response
+    args = ["--resume", *args] if before_command else [*args, "--resume"]
+    assert main(args) == EXIT_OK
+    assert Server.requests["/lookup"] == 4  # Only the failed region
+
+
+def test_crawl_usage(tmp_path) -> None:
+    assert main(["crawl", "A", "--set", "no_such_key=1"]) == EXIT_USAGE
+    assert main(["crawl", "--set", "use_cache=False"]) == EXIT_USAGE
@@ -1,43 +1,64 @@
-import pytest
-import os
-import sys
-# Path hack to make tests work.
-sys.path.insert(1, os.path.join(sys.path[0], '..'))
-
-from tempdata import TempData   # noqa: E402
-from earth_crawler import EarthCrawler  # noqa: E402
-
-
-@pytest.fixture
-def Tmp() -> TempData:
-    Tmp = TempData()
-    return Tmp
-
-
-@pytest.fixture
-def Crawler(Tmp) -> EarthCrawler:
-    Crawler = EarthCrawler(Tmp)
-    return Crawler
-
-
-def test_admin_level_try_list_creator(Crawler: EarthCrawler) -> None:
-    assert Crawler.admin_level_try_list_creator(
-        6, [4, 5, 6, 7, 8, 9, 10, 3]) == [6, 4, 5, 7, 8, 9, 10, 3]
-
-
-def test_search_line_proccessing(Crawler: EarthCrawler, Tmp: TempData) -> None:
-    Tmp.search_line = "USA=5; China=6; Russia=4"
-    test_list = Crawler.search_line_proccessing()
-    assert test_list == [("USA", 5), ("China", 6), ("Russia", 4)]
-
-
-def test_choose_name_from_tag(Crawler: EarthCrawler, Tmp: TempData) -> None:
-    tags = {
-        "name": "Int_name", "name:en": "En_name", "name:de": "De_name",
-        "name:ru": "Ru_name"}
-    Tmp.objects_language = "de"
-    res = Crawler.choose_name_from_tag(tags)
-    assert res == "De_name"
-    Tmp.objects_language = ""
-    res = Crawler.choose_name_from_tag(tags)
-    assert res == "Int_name"
+import pytest
+import os
+import sys
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData   # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+
+
+@pytest.fixture
+def Tmp(tmp_path) -> TempData:
+    Tmp = TempData()
+    Tmp.cache_file = str(tmp_path / "osm_cache.sqlite")
+    Tmp.boundary_index_file = str(tmp_path / "boundaries.sqlite")
+    return Tmp
+
+
+@pytest.fixture
+def Crawler(Tmp) -> EarthCrawler:
+    Crawler = EarthCrawler(Tmp)
+    return Crawler
+
+
+def test_admin_level_try_list_creator(Crawler: EarthCrawler) -> None:
+    assert Crawler.admin_level_try_list_creator(
+        6, [4, 5, 6, 7, 8, 9, 10, 3]) == [6, 4, 5, 7, 8, 9, 10, 3]
+
+
+def test_search_line_proccessing(Crawler: EarthCrawler, Tmp: TempData) -> None:
+    Tmp.search_line = "USA=5; China=6; Russia=4"
+    test_list = Crawler.search_line_proccessing()
+    assert test_list == [("USA", 5), ("China", 6), ("Russia", 4)]
+
+
+def test_choose_name_from_tag(Crawler: EarthCrawler, Tmp: TempData) -> None:
+    tags = {
+        "name": "Int_name", "name:en": "En_name", "name:de": "De_name",
+        "name:ru": "Ru_name"}
+    Tmp.objects_language = "de"
+    res = Crawler.choose_name_from_tag(tags)
+    assert res == "De_name"
+    Tmp.objects_language = ""
+    res = Crawler.choose_name_from_tag(tags)
+    assert res == "Int_name"
+
+
+def test_combined_overpass_search(Tmp: TempData) -> None:
+    elements = [
+        {"type": "relation", "id": i, "tags": {
+            "boundary": "administrative", "admin_level": str(level)}}
+        for i, level in enumerate([3, 6, 6, 8, 6])]
+    with OSMStubServer() as Server:
+        Server.overpass_response = lambda query: {"elements": elements}
+        Tmp.use_cache = False
+        Tmp.local_addresses = False
+        Tmp.overpass_endpoint = Server.endpoint
+        Crawler = EarthCrawler(Tmp)
+        regions = Crawler.overpass_search("r42", ("Test", 5))
+        assert Server.requests["/interpreter"] == 1
+    assert [r.id() for r in regions.relations()] == [1, 2, 4]
+    assert Tmp.current_area_obj_number == 3
+    assert sorted(Crawler.admin_relations["r42"]) == [3, 6, 8]
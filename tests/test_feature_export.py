@@ -0,0 +1,186 @@
+import json
+import math
+import os
+import pytest
+import shapely
+import struct
+import sys
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import flatgeobuf  # noqa: E402
+from feature_export import GeoJSONSeqExporter, \
+    FlatGeobufExporter  # noqa: E402
+
+
+def square(x: float, y: float) -> list:
+    return [(x, y), (x + 1, y), (x + 1, y + 1), (x, y + 1), (x, y)]
+
+
+ROWS = [{"location": f"V{i}", "county": None, "state": "S",
+         "region": "R", "country": "C", "lon": i + 0.5, "lat": 0.5}
+        for i in range(40)]
+
+
+class FlatBuffer():
+    """Minimal FlatBuffers reader for the tests."""
+    def __init__(self, buf: bytes, pos: int = 0) -> None:
+        self.buf = buf
+        self.pos = pos + struct.unpack_from("<I", buf, pos)[0]
+
+    def field(self, index: int) -> int:
+        vtable = self.pos - struct.unpack_from("<i", self.buf, self.pos)[0]
+        size = struct.unpack_from("<H", self.buf, vtable)[0]
+        if 4 + 2 * index >= size:
+            return 0
+        offset = struct.unpack_from("<H", self.buf, vtable + 4 + 2 * index)[0]
+        return self.pos + offset if offset else 0
+
+    def scalar(self, index: int, fmt: str, default=None):
+        pos = self.field(index)
+        return struct.unpack_from("<" + fmt, self.buf, pos)[0] if pos \
+            else default
+
+    def table(self, index: int) -> "FlatBuffer":
+        return FlatBuffer(self.buf, self.field(index))
+
+    def vector(self, index: int, fmt: str = "") -> list:
+        pos = self.field(index)
+        pos += struct.unpack_from("<I", self.buf, pos)[0]
+        length = struct.unpack_from("<I", self.buf, pos)[0]
+        if fmt == "s":
+            return self.buf[pos + 4:pos + 4 + length].decode("utf-8")
+        if fmt:
+            return list(struct.unpack_from(f"<{length}{fmt}", self.buf,
+                                           pos + 4))
+        return [FlatBuffer(self.buf, pos + 4 + 4 * i) for i in range(length)]
+
+
+def read_fgb(path: str, box: tuple) -> tuple[FlatBuffer, list]:
+    """Reads header and features intersecting the box via the index."""
+    with open(path, "rb") as file:
+        data = file.read()
+    assert data[:8] == flatgeobuf.MAGIC
+    header_size = struct.unpack_from("<I", data, 8)[0]
+    header = FlatBuffer(data[12:12 + header_size])
+    count = header.scalar(8, "Q")
+    bounds = flatgeobuf.level_bounds(count)
+    index_pos = 12 + header_size
+    features_pos = index_pos + bounds[0][1] * 40
+    found, queue = [], [(0, len(bounds) - 1)]
+    while queue:
+        node, level = queue.pop()
+        end = min(node + flatgeobuf.NODE_SIZE, bounds[level][1])
+        for i in range(node, end):
+            *node_box, offset = flatgeobuf.NODE_ITEM.unpack_from(
+                data, index_pos + i * 40)
+            if node_box[0] > box[2] or node_box[2] < box[0] or \
+                    node_box[1] > box[3] or node_box[3] < box[1]:
+                continue
+            if level == 0:
+                found.append(FlatBuffer(data, features_pos + offset + 4))
+            else:
+                queue.append((offset, level - 1))
+    return header, found
+
+
+def test_geojsonseq(tmp_path) -> None:
+    Exporter = GeoJSONSeqExporter(str(tmp_path / "A"))
+    Exporter.add_border("R1", 4, [(square(0, 0), [])])
+    Exporter.add_border("R2", None, [(square(0, 0), [square(0.2, 0.2)]),
+                                     (square(5, 5), [])])
+    Exporter.add_points("R1", ROWS[:2])
+    Exporter.close()
+    with open(tmp_path / "A borders.geojsonl", encoding="utf-8") as file:
+        borders = [json.loads(line) for line in file]
+    assert [f["geometry"]["type"] for f in borders] == [
+        "Polygon", "MultiPolygon"]
+    assert borders[0]["properties"] == {"name": "R1", "admin_level": 4}
+    assert len(borders[1]["geometry"]["coordinates"][0]) == 2
+    with open(tmp_path / "A points.geojsonl", encoding="utf-8") as file:
+        points = [json.loads(line) for line in file]
+    assert points[1]["geometry"]["coordinates"] == [1.5, 0.5]
+    assert points[1]["properties"]["area"] == "R1"
+
+
+def test_flatgeobuf(tmp_path) -> None:
+    Exporter = FlatGeobufExporter(str(tmp_path / "A"))
+    for i in range(3):
+        Exporter.add_border(f"R{i}", 4, [(square(i * 10, 0), [])])
+    Exporter.add_border("Holes", None, [
+        (square(0, 10), [square(0.2, 10.2)]), (square(5, 15), [])])
+    Exporter.add_points("R0", ROWS)
+    Exporter.close()
+
+    header, found = read_fgb(str(tmp_path / "A borders.fgb"),
+                             (9.5, -1, 10.5, 1))
+    assert header.vector(0, "s") == "borders"
+    assert header.scalar(2, "B") == flatgeobuf.MULTIPOLYGON
+    assert header.vector(1, "d") == [0, 0, 21, 16]
+    assert [c.vector(0, "s") for c in header.vector(7)] == [
+        "name", "admin_level"]
+    assert len(found) == 1
+    properties = bytes(found[0].vector(1, "B"))
+    assert properties == struct.pack("<HI", 0, 2) + b"R1" + \
+        struct.pack("<Hi", 1, 4)
+    polygon = found[0].table(0).vector(7)[0]
+    assert polygon.vector(0, "I") == [5]
+    assert polygon.vector(1, "d")[:4] == [10, 0, 11, 0]
+
+    _, found = read_fgb(str(tmp_path / "A borders.fgb"), (0, 10, 1, 11))
+    polygons = found[0].table(0).vector(7)
+    assert [p.vector(0, "I") for p in polygons] == [[5, 10], [5]]
+
+    # Points need two index levels
+    header, found = read_fgb(str(tmp_path / "A points.fgb"),
+                             (20, 0, 25, 1))
+    assert header.scalar(8, "Q") == 40
+    assert sorted(f.table(0).vector(1, "d")[0] for f in found) == [
+        20.5, 21.5, 22.5, 23.5, 24.5]
+
+
+def test_discard(tmp_path) -> None:
+    for Exporter in [GeoJSONSeqExporter(str(tmp_path / "A")),
+                     FlatGeobufExporter(str(tmp_path / "B"))]:
+        Exporter.add_points("R0", ROWS)
+        Exporter.discard()
+    assert os.listdir(tmp_path) == []
+
+
+def test_flatgeobuf_gdal(tmp_path) -> None:
+    pyogrio = pytest.importorskip("pyogrio")
+    Exporter = FlatGeobufExporter(str(tmp_path / "A"))
+    for i in range(3):
+        Exporter.add_border(f"R{i}", 4, [(square(i * 10, 0), [])])
+    Exporter.add_border("Holes", None, [
+        (square(0, 10), [square(0.2, 10.2)]), (square(5, 15), [])])
+    Exporter.add_points("R0", ROWS)
+    Exporter.close()
+
+    path = str(tmp_path / "A borders.fgb")
+    info = pyogrio.read_info(path)
+    assert info["geometry_type"] == "MultiPolygon"
+    assert info["features"] == 4
+    assert list(info["fields"]) == ["name", "admin_level"]
+    # Features are stored in the index order
+    assert sorted(pyogrio.read_bounds(path)[1].T.tolist()) == [
+        [0, 0, 1, 1], [0, 10, 6, 16], [10, 0, 11, 1], [20, 0, 21, 1]]
+    # GDAL answers bounding box queries with the packed index
+    _, _, geometry, fields = pyogrio.raw.read(path, bbox=(9.5, -1, 10.5, 1))
+    assert fields[0].tolist() == ["R1"]
+    assert fields[1].tolist() == [4]
+    polygon = shapely.from_wkb(geometry[0])
+    assert polygon.equals(shapely.MultiPolygon([(square(10, 0), [])]))
+    _, _, geometry, fields = pyogrio.raw.read(path, bbox=(0, 10, 1, 11))
+    assert fields[0].tolist() == ["Holes"]
+    # Missing admin level is read as null
+    assert math.isnan(fields[1][0])
+    polygons = shapely.from_wkb(geometry[0]).geoms
+    assert [len(p.interiors) for p in polygons] == [1, 0]
+    assert list(polygons[0].interiors[0].coords) == square(0.2, 10.2)
+
+    path = str(tmp_path / "A points.fgb")
+    _, _, geometry, fields = pyogrio.raw.read(path, bbox=(20, 0, 25, 1))
+    assert sorted(shapely.from_wkb(geometry).tolist(),
+                  key=lambda p: p.x)[0].coords[0] == (20.5, 0.5)
+    assert len(geometry) == 5
@@ -0,0 +1,118 @@
+import pytest
+import os
+import sys
+import numpy as np
+from shapely import wkt
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData   # noqa: E402
+from geometry import GeometryProcessor, GeometryPool, PackedPolygons, \
+    prepare_border  # noqa: E402
+
+
+@pytest.fixture
+def Tmp() -> TempData:
+    Tmp = TempData()
+    Tmp.simplify = True
+    Tmp.simplify_tolerance = 0.01
+    Tmp.simplify_tolerance_by_level = {4: 0.5}
+    Tmp.coordinates_precision = 2
+    Tmp.export_holes = True
+    return Tmp
+
+
+def test_tolerance(Tmp: TempData) -> None:
+    Processor = GeometryProcessor(Tmp)
+    assert Processor.tolerance(4) == 0.5
+    assert Processor.tolerance(8) == 0.01
+    assert Processor.tolerance(None) == 0.01
+
+
+def test_prepare(Tmp: TempData) -> None:
+    # Square with 400 nearly collinear vertices per side and a hole
+    side = np.linspace(0, 10, 401)
+    noise = np.sin(side * 50) * 0.001
+    exterior = np.concatenate([
+        np.column_stack([side, noise]),
+        np.column_stack([10 + noise, side]),
+        np.column_stack([side[::-1], 10 + noise]),
+        np.column_stack([noise, side[::-1]]),
+        [[0, 0]]])
+    square = ", ".join(f"{x} {y}" for x, y in exterior)
+    geometry = wkt.loads(
+        f"MULTIPOLYGON((({square}), (4 4, 6 4, 6 6, 4 6, 4 4)),"
+        "((20.123 20.123, 21 20, 21 21, 20.123 20.123)))")
+    prepared = GeometryProcessor(Tmp).prepare(geometry, 4)
+    assert len(prepared) == 2
+    outer, inner = prepared[0]
+    assert len(outer) < 10
+    assert len(inner) == 1 and len(inner[0]) == 5
+    outer, inner = prepared[1]
+    assert inner == []
+    assert outer[0].tolist() == [20.12, 20.12]
+
+
+def test_prepare_without_holes(Tmp: TempData) -> None:
+    Tmp.export_holes = False
+    geometry = wkt.loads(
+        "POLYGON((0 0, 10 0, 10 10, 0 10, 0 0), (4 4, 6 4, 6 6, 4 6, 4 4))")
+    prepared = GeometryProcessor(Tmp).prepare(geometry)
+    assert len(prepared) == 1 and prepared[0][1] == []
+
+
+def test_prepare_border(Tmp: TempData) -> None:
+    geometry = wkt.loads(
+        "MULTIPOLYGON(((0 0, 10 0, 10 10, 0 10, 0 0), (4 4, 6 4, 6 6, 4 4)),"
+        "((20 20, 21 20, 21 21, 20 20)))")
+    Processor = GeometryProcessor(Tmp)
+    border = prepare_border(geometry.wkb, *Processor.options())
+    # All rings are packed into a single array
+    packed = border["polygons"]
+    assert packed.coords.shape == (13, 2)
+    assert packed.ring_offsets.tolist() == [0, 5, 9, 13]
+    borders = Processor.borders(border, 6)
+    assert borders["multi"] and borders["admin_level"] == 6
+    expected = Processor.prepare(geometry)
+    for (outer, inner), (outer_expected, inner_expected) in zip(
+            borders["polygons"], expected):
+        assert outer.base is packed.coords
+        assert outer.tolist() == outer_expected.tolist()
+        assert [ring.tolist() for ring in inner] == [
+            ring.tolist() for ring in inner_expected]
+    assert Processor.borders(prepare_border(
+        "LINESTRING(0 0, 1 1)", *Processor.options())) is None
+
+
+def test_geometry_pool(Tmp: TempData) -> None:
+    Tmp.geometry_workers = 2
+    Pool = GeometryPool(Tmp)
+    try:
+        futures = [Pool.submit(f"POLYGON((0 0, {i} 0, {i} {i}, 0 0))", 4)
+                   for i in range(1, 5)]
+        assert [f.result()["polygons"].coords[1].tolist()
+                for f in futures] == [
+            [i, 0] for i in range(1, 5)]
+    finally:
+        Pool.close()
+
+
+def test_packed_polygons() -> None:
+    polygons = [([(0, 0), (4, 0), (4, 4), (0, 0)],
+                 [[(1, 1), (2, 1), (2, 2), (1, 1)]]),
+                ([(5, 5), (6, 5), (6, 6), (5, 5)], [])]
+    packed = PackedPolygons.from_rings(polygons)
+    assert PackedPolygons.from_rings(packed) is packed
+    assert len(packed) == 2 and packed
+    assert [(outer.tolist(), [ring.tolist() for ring in inner])
+            for outer, inner in packed] == [
+        ([list(c) for c in outer], [[list(c) for c in ring] for ring in inner])
+        for outer, inner in polygons]
+    outer, inner = packed[-1]
+    assert outer.base is packed.coords and inner == []
+    coords, ends = packed.polygon(0)
+    assert coords.shape == (8, 2) and ends.tolist() == [4, 8]
+    assert packed.bounds() == (0, 0, 6, 6)
+    with pytest.raises(IndexError):
+        packed[2]
+    assert not PackedPolygons.from_rings([])
@@ -0,0 +1,35 @@
+import pytest
+import os
+import sys
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+pytest.importorskip("requests")
+from icon_loader import IconLoader  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+
+
+def test_icon_loader(tmp_path) -> None:
+    with OSMStubServer() as Server:
+        Server.files["/icon.png"] = b"png"
+        Server.files_delay = 0.2
+        url = Server.endpoint + "icon.png"
+        Loader = IconLoader(cache_dir=str(tmp_path))
+        # Simultaneous requests share a single download
+        futures = [Loader.load(url) for _ in range(5)]
+        assert [f.result() for f in futures] == [b"png"] * 5
+        assert Server.requests["/icon.png"] == 1
+        assert Loader.load(url).done()
+        Loader.shutdown()
+
+        # Disk cache is used by a new loader
+        Loader = IconLoader(cache_dir=str(tmp_path))
+        assert Loader.load(url).result() == b"png"
+        assert Server.requests["/icon.png"] == 1
+        Loader.shutdown()
+
+        Loader = IconLoader(cache_dir=str(tmp_path))
+        assert isinstance(
+            Loader.load(Server.endpoint + "missing.png").exception(),
+            Exception)
+        Loader.shutdown()
@@ -0,0 +1,65 @@
+import os
+import sys
+import zipfile
+import numpy as np
+import xml.etree.ElementTree as ET
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from kml_writer import KMLStreamWriter, kml_color  # noqa: E402
+
+NS = {"kml": "http://www.opengis.net/kml/2.2"}
+
+
+def write_document(Writer: KMLStreamWriter) -> None:
+    Writer.open_folder("Region <1>")
+    Writer.add_polygon("Border", [(0, 0), (1, 0), (1, 1), (0, 0)],
+                       [[(0.1, 0.1), (0.2, 0.1), (0.2, 0.2), (0.1, 0.1)]])
+    Writer.add_linestring("Line", [(0, 0), (1, 1)])
+    Writer.add_point("Town & Village", 0.5, 0.5)
+    Writer.close()
+
+
+def test_kml_color() -> None:
+    assert kml_color("#ff8800") == "ff0088ff"
+
+
+def test_kml(tmp_path) -> None:
+    path = str(tmp_path / "test.kml")
+    write_document(KMLStreamWriter(path, "Test", "#ff0000", 3))
+    doc = ET.parse(path).getroot()
+    assert doc.findtext("kml:Document/kml:Style/kml:LineStyle/kml:color",
+                        namespaces=NS) == "ff0000ff"
+    folder = doc.find("kml:Document/kml:Folder", NS)
+    assert folder.findtext("kml:name", namespaces=NS) == "Region <1>"
+    placemarks = folder.findall("kml:Placemark", NS)
+    assert [p.findtext("kml:styleUrl", namespaces=NS)
+            for p in placemarks] == ["#border", "#border", None]
+    assert placemarks[0].find(
+        "kml:Polygon/kml:innerBoundaryIs", NS) is not None
+    assert placemarks[2].findtext(
+        "kml:Point/kml:coordinates", namespaces=NS) == "0.5,0.5,0"
+
+
+def test_kmz(tmp_path) -> None:
+    path = str(tmp_path / "test.kmz")
+    write_document(KMLStreamWriter(path, "Test", "#ff0000", 3, kmz=True))
+    with zipfile.ZipFile(path) as kmz:
+        doc = ET.fromstring(kmz.read("doc.kml"))
+    assert doc.findtext("kml:Document/kml:Folder/kml:Placemark/kml:name",
+                        namespaces=NS) == "Border"
+
+
+def test_discard(tmp_path) -> None:
+    path = str(tmp_path / "test.kml")
+    Writer = KMLStreamWriter(path, "Test", "#ff0000", 3)
+    Writer.open_folder("Unfinished")
+    Writer.discard()
+    assert not os.path.exists(path)
+
+
+def test_coordinates_array() -> None:
+    coords = [(0.1, 2.5), (30.123456, -1.0)]
+    assert KMLStreamWriter.coordinates(np.array(coords)) == \
+        KMLStreamWriter.coordinates(coords) == \
+        "<coordinates>0.1,2.5,0 30.123456,-1.0,0</coordinates>"
@@ -0,0 +1,123 @@
+import pytest
+import os
+import sys
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData  # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+from osm_fixtures import serve_fixture, synthetic_country  # noqa: E402
+
+
+def translated_country() -> dict:
+    fixture = synthetic_country(relations=4, places=40)
+    for relation in fixture["admin"]:
+        relation["tags"]["name:en"] = relation["tags"]["name"] + " en"
+    for elements in fixture["places"].values():
+        for element in elements:
+            # Areas tags may be shared by several places
+            tags = element["tags"]
+            tags.setdefault("name:en", tags["name"] + " en")
+    return fixture
+
+
+@pytest.mark.parametrize("local_addresses, country", [
+    # Country comes from the search result in 'objects_language' only
+    (True, "Country"),
+    # Country area tags are returned with places
+    (False, "Country en")])
+def test_export_languages(tmp_path, local_addresses: bool,
+                          country: str) -> None:
+    with OSMStubServer() as Server:
+        serve_fixture(Server, translated_country())
+        Tmp = TempData()
+        Tmp.use_cache = False
+        Tmp.local_addresses = local_addresses
+        Tmp.search_line = "Country"
+        Tmp.search_type = "world"
+        Tmp.objects_language = "ru"
+        Tmp.export_languages = ["ru", "en"]
+        Tmp.export_dir = str(tmp_path)
+        Tmp.export_to_excel = True
+        Tmp.table_formats = ["csv"]
+        Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+        Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+        Crawler = EarthCrawler(Tmp)
+        Crawler.request_and_proccess_data()
+        # Regions and places are requested once for both languages
+        assert Server.requests["/interpreter"] == 5
+    assert sorted(os.listdir(tmp_path)) == [
+        "Country (en) (polygons).kml", "Country (en).csv",
+        "Country (polygons).kml", "Country.csv"]
+    with open(tmp_path / "Country (en).csv", encoding="utf-8") as file:
+        rows = file.read().splitlines()
+    assert len(rows) == 41
+    assert any(row.startswith(f"Region 1 en,Place 4 en,,Region 1 en,,"
+                              f"{country},") for row in rows)
+    with open(tmp_path / "Country.csv", encoding="utf-8") as file:
+        assert "Region 1,Place 4,,Region 1,,Country," in file.read()
+    with open(tmp_path / "Country (en) (polygons).kml",
+              encoding="utf-8") as file:
+        kml = file.read()
+    assert "<name>Region 2 en</name>" in kml
+    assert "<name>Place 2 en</name>" in kml
+
+
+def test_export_languages_without_kml(tmp_path, monkeypatch) -> None:
+    def no_kml(*args, **kwargs) -> None:
+        raise AssertionError("KML writer created with KML export disabled")
+
+    monkeypatch.setattr("earth_crawler.KMLStreamWriter", no_kml)
+    monkeypatch.setattr("language_exports.KMLStreamWriter", no_kml)
+    with OSMStubServer() as Server:
+        serve_fixture(Server, translated_country())
+        Tmp = TempData()
+        Tmp.use_cache = False
+        Tmp.local_addresses = False
+        Tmp.search_line = "Country"
+        Tmp.search_type = "world"
+        Tmp.objects_language = "ru"
+        Tmp.export_languages = ["ru", "en"]
+        Tmp.export_dir = str(tmp_path)
+        Tmp.export_to_kml = False
+        Tmp.export_to_excel = True
+        Tmp.table_formats = ["csv"]
+        Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+        Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+        Crawler = EarthCrawler(Tmp)
+        Crawler.request_and_proccess_data()
+    assert sorted(os.listdir(tmp_path)) == ["Country (en).csv", "Country.csv"]
+    with open(tmp_path / "Country (en).csv", encoding="utf-8") as file:
+        assert len(file.read().splitlines()) == 41
+
+
+def test_export_results_sequence(tmp_path) -> None:
+    # Searches run one by one, as the GUI does
+    with OSMStubServer() as Server:
+        serve_fixture(Server, translated_country())
+        Tmp = TempData()
+        Tmp.use_cache = False
+        Tmp.local_addresses = False
+        Tmp.search_line = "Country"
+        Tmp.search_type = "world"
+        Tmp.objects_language = "ru"
+        Tmp.export_languages = ["ru", "en"]
+        Tmp.export_dir = str(tmp_path)
+        Tmp.export_to_excel = True
+        Tmp.table_formats = ["csv"]
+        Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+        Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+        Crawler = EarthCrawler(Tmp)
+        notified = []
+        for single_obj_req in Crawler.search_line_proccessing():
+            area_id = Crawler.first_nominatim_search(single_obj_req)
+            regions = Crawler.overpass_search(area_id, single_obj_req)
+            Crawler.second_nominatim_search(regions)
+            Crawler.export_results(single_obj_req, notified.append)
+    assert notified == [[0, "Excel"], [1, "Excel"], [0, "KML"], [1, "KML"]]
+    with open(tmp_path / "Country (en) (polygons).kml",
+              encoding="utf-8") as file:
+        assert file.read().rstrip().endswith("</kml>")
+    with open(tmp_path / "Country (en).csv", encoding="utf-8") as file:
+        assert len(file.read().splitlines()) == 41
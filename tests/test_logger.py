@@ -0,0 +1,80 @@
+import pytest
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import logger  # noqa: E402
+from tempdata import TempData  # noqa: E402
+
+
+def queue_handlers(test_logger: logging.Logger) -> int:
+    # pytest adds its own capturing handlers
+    return sum(isinstance(handler, QueueHandler)
+               for handler in test_logger.handlers)
+
+
+def test_set_logger_idempotent() -> None:
+    TempData()
+    Tmp = TempData()
+    assert queue_handlers(Tmp.logger_object) == 1
+    assert queue_handlers(Tmp.logger_object.getChild("metrics")) == 1
+    assert logger.set_logger(log_level_name="error").level == 40
+    assert queue_handlers(Tmp.logger_object) == 1
+
+
+def test_queued_records() -> None:
+    test_logger = logger.set_logger("queued_test", "INFO")
+    test_logger.debug("Skipped debug message")
+    test_logger.info("Info message %s", 1)
+    try:
+        raise ValueError("Test error")
+    except ValueError:
+        test_logger.exception("Failed")
+    # Stopping listeners writes all queued records
+    logger.stop_logging()
+    assert queue_handlers(test_logger) == 0
+    with open(os.path.join(logger.LOG_DIR, "last_run.log"),
+              encoding="utf-8") as file:
+        log = file.read()
+    assert "Skipped debug message" not in log
+    assert "[INFO] - queued_test - (test_logger.py).test_queued_records" \
+        in log
+    assert "Info message 1" in log
+    assert "ValueError: Test error" in log
+    # Next call configures logger again
+    assert queue_handlers(logger.set_logger("queued_test")) == 1
+    logger.stop_logging()
+
+
+def log_from_worker(name: str) -> int:
+    worker_logger = logger.set_logger(name, "INFO")
+    worker_logger.info("Worker message %s", os.getpid())
+    worker_logger.getChild("metrics").info('{"worker": %s}', os.getpid())
+    logger.flush_logging()
+    return os.getpid()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fork is not available")
+def test_forked_worker_records() -> None:
+    test_logger = logger.set_logger("pool_test", "INFO")
+    test_logger.info("Parent message")
+    logger.flush_logging()
+    with ProcessPoolExecutor(
+            2, mp_context=multiprocessing.get_context("fork")) as pool:
+        pids = set(pool.map(log_from_worker, ["pool_test"] * 4))
+    logger.stop_logging()
+    with open(os.path.join(logger.LOG_DIR, "last_run.log"),
+              encoding="utf-8") as file:
+        log = file.read()
+    with open(os.path.join(logger.LOG_DIR, "metrics.jsonl"),
+              encoding="utf-8") as file:
+        metrics = file.read()
+    assert "Parent message" in log
+    for pid in pids:
+        assert f"Worker message {pid}" in log
+        assert f'{{"worker": {pid}}}' in metrics
@@ -0,0 +1,128 @@
+import pytest
+import os
+import sys
+import time
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData  # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from metrics import CrawlMetrics, percentile  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+from osm_fixtures import serve_fixture, synthetic_country  # noqa: E402
+from OSMPythonTools.internal.cacheObject import CacheObject  # noqa: E402
+
+
+@pytest.fixture
+def Tmp() -> TempData:
+    return TempData()
+
+
+def test_percentile() -> None:
+    assert percentile([], 0.5) is None
+    values = [float(i) for i in range(100, 0, -1)]
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.95) == 96
+
+
+def test_summary(Tmp: TempData) -> None:
+    Metrics = CrawlMetrics(Tmp)
+    for latency in [0.1, 0.2, 0.3]:
+        Metrics.record_request("nominatim", latency, 100)
+    Metrics.record_request("overpass", 1.0, 0, failed=True)
+    Metrics.record_retry("overpass")
+    Tmp.cache_hits["nominatim"] = 5
+    with Metrics.stage("export"):
+        pass
+    summary = Metrics.summary()
+    assert summary["stages"]["export"]["count"] == 1
+    assert summary["endpoints"]["nominatim"] == {
+        "requests": 3, "errors": 0, "retries": 0, "bytes": 300,
+        "p50_ms": 200.0, "p95_ms": 300.0, "cache_hits": 5,
+        "cache_misses": 0}
+    assert summary["endpoints"]["overpass"]["errors"] == 1
+    assert summary["endpoints"]["overpass"]["retries"] == 1
+
+
+def test_throughput(Tmp: TempData) -> None:
+    Metrics = CrawlMetrics(Tmp)
+    assert Metrics.throughput() is None
+    Tmp.regions_done = 5  # regions of the previous object
+    Metrics.start_regions()
+    Metrics.regions_started -= 60  # type: ignore
+    Tmp.regions_done = 15
+    Tmp.current_area_obj = 9
+    Tmp.current_area_obj_number = 30
+    rate, eta = Metrics.throughput()  # type: ignore
+    assert rate == pytest.approx(10, rel=0.01)
+    assert eta == pytest.approx(120, rel=0.01)
+
+
+def test_crawl_metrics(tmp_path) -> None:
+    with OSMStubServer() as Server:
+        fixture = synthetic_country(relations=3, places=30)
+        serve_fixture(Server, fixture)
+        # First Overpass request fails and is retried
+        failures = [True]
+        respond = Server.overpass_response
+        Server.overpass_response = lambda query: \
+            None if failures and failures.pop() else respond(query)
+        Tmp = TempData()
+        Tmp.use_cache = False
+        Tmp.search_line = "Country"
+        Tmp.search_type = "world"
+        Tmp.export_dir = str(tmp_path)
+        Tmp.export_to_excel = False
+        Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+        Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+        Tmp.backoff_base = 0.01
+        Crawler = EarthCrawler(Tmp)
+        Crawler.request_and_proccess_data()
+    summary = Crawler.metrics.summary()
+    assert summary["regions"] == 3
+    assert set(summary["stages"]) == {
+        "first_search", "overpass_search", "admin_areas", "locations",
+        "region_export", "export"}
+    assert summary["stages"]["region_export"]["count"] == 3
+    nominatim = summary["endpoints"]["nominatim"]
+    assert nominatim["requests"] == Server.requests["/search"] + \
+        Server.requests["/lookup"]
+    # Received bodies are counted as sent by the server
+    assert nominatim["bytes"] == Server.sent["/search"] + \
+        Server.sent["/lookup"]
+    assert nominatim["p95_ms"] is not None
+    overpass = summary["endpoints"]["overpass"]
+    assert overpass["requests"] == Server.requests["/interpreter"] == 5
+    assert overpass["bytes"] == Server.sent["/interpreter"]
+    assert overpass["errors"] == overpass["retries"] == 1
+
+
+def test_download_hook() -> None:
+    # Requests are recorded by 'LimitedAPIMixin' only while OSMPythonTools
+    # downloads through its private 'CacheObject.__query'
+    assert hasattr(CacheObject, "_CacheObject__query")
+    assert "_CacheObject__query" in CacheObject.query.__code__.co_names
+
+
+def test_repeated_crawls(tmp_path) -> None:
+    with OSMStubServer() as Server:
+        serve_fixture(Server, synthetic_country(relations=3, places=30))
+        # GUI keeps the same Tmp for all searches
+        Tmp = TempData()
+        Tmp.use_cache = False
+        Tmp.search_line = "Country"
+        Tmp.search_type = "world"
+        Tmp.export_dir = str(tmp_path)
+        Tmp.export_to_excel = False
+        Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+        Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+        summaries = []
+        for _ in range(2):
+            Crawler = EarthCrawler(Tmp)
+            created = time.monotonic()
+            time.sleep(0.05)  # Search result is being chosen
+            Crawler.request_and_proccess_data()
+            assert Crawler.metrics.regions_started >= created + 0.05
+            summaries.append(Crawler.metrics.summary())
+    assert summaries[0]["regions"] == summaries[1]["regions"] == 3
+    assert summaries[0]["points"] == summaries[1]["points"] > 0
@@ -0,0 +1,25 @@
+import os
+import sys
+import numpy as np
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from minimap import Minimap  # noqa: E402
+
+
+def test_render(tmp_path) -> None:
+    Map = Minimap(width=120, cache_dir=str(tmp_path))
+    base = np.full((60, 120, 4), 255, dtype=np.uint8)
+    np.save(Map.cache_file, base)
+    assert Map.pixel(90, -180) == (0, 0)
+    assert Map.pixel(-90, 180) == (119, 59)
+
+    image = Map.render(0, 0)
+    x, y = Map.pixel(0, 0)
+    assert tuple(image[y, x]) == Minimap.MARKER_COLOR
+    assert tuple(image[y, x + Map.marker_radius + 1]) == \
+        Minimap.MARKER_EDGE_COLOR
+    assert tuple(image[0, 0]) == (255, 255, 255, 255)
+    # Cached base map isn't changed by markers
+    assert (Map.base == base).all()
+    assert Map.render(0, 0) is not image
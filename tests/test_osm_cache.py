@@ -0,0 +1,70 @@
+import pytest
+import os
+import sys
+import time
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData   # noqa: E402
+from osm_cache import SQLiteCache  # noqa: E402
+
+
+@pytest.fixture
+def Tmp(tmp_path) -> TempData:
+    Tmp = TempData()
+    Tmp.cache_file = str(tmp_path / "osm_cache.sqlite")
+    return Tmp
+
+
+def test_get_and_set(Tmp: TempData) -> None:
+    Cache = SQLiteCache(Tmp)
+    assert Cache.get("nominatim-abc") is None
+    Cache.set("nominatim-abc", {"response": [1, 2, 3]})
+    assert Cache.get("nominatim-abc") == {"response": [1, 2, 3]}
+    Cache.close()
+    Cache = SQLiteCache(Tmp)  # Persists between sessions
+    assert Cache.get("nominatim-abc") == {"response": [1, 2, 3]}
+    assert Tmp.cache_hits == {"nominatim": 2}
+    assert Tmp.cache_misses == {"nominatim": 1}
+
+
+def test_ttl(Tmp: TempData) -> None:
+    Tmp.cache_overpass_ttl_hours = 0
+    Cache = SQLiteCache(Tmp)
+    Cache.set("overpass-abc", {"response": "x"})
+    Cache.set("nominatim-abc", {"response": "x"})
+    time.sleep(0.01)
+    assert Cache.get("overpass-abc") is None
+    assert Cache.get("nominatim-abc") == {"response": "x"}
+
+
+def test_lru_eviction(Tmp: TempData) -> None:
+    Cache = SQLiteCache(Tmp)
+    value = {"response": os.urandom(2000).hex()}
+    Cache.set("nominatim-1", value)
+    entry_size = Cache.size()
+    Cache.max_size = entry_size * 2
+    Cache.set("nominatim-2", value)
+    time.sleep(0.01)
+    Cache.get("nominatim-1")  # "nominatim-2" becomes least recently used
+    Cache.set("nominatim-3", value)
+    assert Cache.get("nominatim-2") is None
+    assert Cache.get("nominatim-1") == value
+    assert Cache.get("nominatim-3") == value
+    assert Cache.size() <= Cache.max_size
+
+
+def test_shared_eviction(Tmp: TempData) -> None:
+    # Crawl processes share the cache file
+    Caches = [SQLiteCache(Tmp), SQLiteCache(Tmp)]
+    value = {"response": os.urandom(2000).hex()}
+    Caches[0].set("nominatim-1", value)
+    for Cache in Caches:
+        Cache.max_size = Cache.size() * 2
+    time.sleep(0.01)
+    Caches[1].set("nominatim-2", value)
+    time.sleep(0.01)
+    Caches[0].set("nominatim-3", value)
+    assert Caches[1].get("nominatim-1") is None
+    assert Caches[1].get("nominatim-2") == value
+    assert Caches[0].size() <= Caches[0].max_size
@@ -0,0 +1,126 @@
+import pytest
+import json
+import os
+import sys
+import shapely
+import shapely.geometry
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from tempdata import TempData  # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from data_sources import relation_border  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+from osm_fixtures import load_fixture, member_ways, serve_fixture, \
+    synthetic_country  # noqa: E402
+
+
+@pytest.fixture
+def Server() -> OSMStubServer:
+    with OSMStubServer() as Server:
+        yield Server
+
+
+def crawler(Server: OSMStubServer, tmp_path) -> EarthCrawler:
+    Tmp = TempData()
+    Tmp.use_cache = False
+    Tmp.search_line = "Country"
+    Tmp.search_type = "world"
+    Tmp.export_dir = str(tmp_path)
+    Tmp.export_to_excel = False
+    Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+    Tmp.nominatim_rate = Tmp.overpass_rate = 1000
+    return EarthCrawler(Tmp)
+
+
+@pytest.mark.parametrize("local_addresses, lookups", [
+    # 20 borders and a batch of 5 places lacking containing areas, which
+    # all lie in the first region
+    (False, 21),
+    # Single batch of borders, places are located with them
+    (True, 1)])
+def test_synthetic_country(Server: OSMStubServer, tmp_path,
+                           local_addresses: bool, lookups: int) -> None:
+    serve_fixture(Server, synthetic_country(relations=20, places=500))
+    Crawler = crawler(Server, tmp_path)
+    Crawler.Tmp.local_addresses = local_addresses
+    Crawler.Tmp.table_formats = ["csv"]
+    Crawler.Tmp.export_to_excel = True
+    Crawler.request_and_proccess_data()
+    assert Crawler.Tmp.failed_objects == []
+    assert Crawler.Tmp.regions_done == 20
+    assert Crawler.Tmp.points_done == 500
+    assert Server.requests["/lookup"] == lookups
+    assert Server.requests["/interpreter"] == 21
+    with open(tmp_path / "Country.csv", encoding="utf-8") as file:
+        rows = file.read().splitlines()
+    assert rows[0] == "area,location,county,state,region,country,lon,lat"
+    # Place 100 is looked up with Nominatim if areas come from Overpass
+    assert any(row.startswith("Region 1,Place 100,,Region 1,,Country,")
+               for row in rows)
+
+
+def test_recorded_fixture(Server: OSMStubServer, tmp_path) -> None:
+    serve_fixture(Server, load_fixture("small_country"))
+    Crawler = crawler(Server, tmp_path)
+    Crawler.request_and_proccess_data()
+    assert Crawler.Tmp.regions_done == 4
+    assert Crawler.Tmp.points_done == 24
+
+
+def crawled_borders(Crawler: EarthCrawler) -> dict:
+    Crawler.Tmp.feature_formats = ["geojsonl"]
+    Crawler.Tmp.coordinates_precision = -1
+    Crawler.Tmp.simplify = False
+    Crawler.request_and_proccess_data()
+    path = os.path.join(Crawler.Tmp.export_dir, "Country borders.geojsonl")
+    with open(path, encoding="utf-8") as file:
+        features = [json.loads(line) for line in file]
+    os.remove(path)
+    return {f["properties"]["name"]: shapely.geometry.shape(f["geometry"])
+            for f in features}
+
+
+@pytest.mark.parametrize("combined, local_addresses", [
+    (True, True), (True, False), (False, False)])
+def test_overpass_borders(Server: OSMStubServer, tmp_path, combined: bool,
+                          local_addresses: bool) -> None:
+    fixture = load_fixture("small_country")
+    serve_fixture(Server, fixture)
+    Crawler = crawler(Server, tmp_path)
+    Crawler.Tmp.combined_admin_query = combined
+    Crawler.Tmp.local_addresses = local_addresses
+    expected = crawled_borders(Crawler)
+    Server.requests.clear()
+    Crawler.Tmp.overpass_borders = True
+    borders = crawled_borders(EarthCrawler(Crawler.Tmp))
+    # Borders assembled from member ways match Nominatim wkt
+    assert borders.keys() == expected.keys()
+    for name, border in borders.items():
+        assert border.equals(expected[name])
+    assert Server.requests["/lookup"] == 0
+
+
+def test_overpass_borders_batches(Server: OSMStubServer, tmp_path) -> None:
+    serve_fixture(Server, synthetic_country(relations=60, places=0))
+    Crawler = crawler(Server, tmp_path)
+    Crawler.Tmp.overpass_borders = True
+    Crawler.Tmp.search_locations = False
+    Crawler.request_and_proccess_data()
+    assert Crawler.Tmp.regions_done == 60
+    # Regions query and two batches of borders geometry
+    assert Server.requests["/interpreter"] == 3
+    assert Server.requests["/lookup"] == 0
+
+
+def test_relation_border() -> None:
+    element = {"type": "relation", "id": 1, "members": [
+        {"type": "node", "ref": 1, "role": "admin_centre",
+         "lat": 1, "lon": 1}, *member_ways(
+            "MULTIPOLYGON(((0 0, 4 0, 4 4, 0 4, 0 0), (1 1, 2 1, 2 2, 1 1)),"
+            "((5 5, 6 5, 6 6, 5 5)))", 10)]}
+    border = shapely.from_wkb(relation_border(element))
+    assert border.geom_type == "MultiPolygon"
+    assert border.area == pytest.approx(16 - 0.5 + 0.5)
+    element["members"] = element["members"][:2]
+    assert relation_border(element) is None
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+import pytest
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import osm_pbf  # noqa: E402
+from tempdata import TempData  # noqa: E402
+from earth_crawler import EarthCrawler  # noqa: E402
+from osm_stub_server import OSMStubServer  # noqa: E402
+from osm_fixtures import pbf_country, _field, _packed  # noqa: E402
+
+
+def test_varints() -> None:
+    values = [0, 1, 127, 128, 300, 2 ** 35]
+    assert osm_pbf.varints(_packed(values)).tolist() == values
+    assert osm_pbf.deltas(_packed(
+        [5, -3, 10 ** 10, 0], delta=True)).tolist() == [5, -3, 10 ** 10, 0]
+
+
+def test_ways() -> None:
+    # Delta 13 of node references is written as byte 0x1A, the key of ways
+    ways = [_field(1, way_id) + _field(8, _packed(
+        [13 * i for i in range(1, 40)], True)) for way_id in (26, 2 ** 40)]
+    # Id of the last way is not its first field
+    ways.append(_field(8, _packed([26], True)) + _field(1, 7))
+    group = b"".join(_field(3, way) for way in ways)
+    block = osm_pbf.PrimitiveBlock(_field(2, group))
+    [(ids, starts, ends, data)] = list(block.ways())
+    assert ids.tolist() == [26, 2 ** 40, 7]
+    assert [data[i:j] for i, j in zip(starts, ends)] == ways
+    assert block.way_refs(ways[0]).tolist()[:2] == [13, 26]
+    with pytest.raises(ValueError):
+        osm_pbf.repeated_messages(group + _field(1, 5), 3)
+
+
+def test_extract_passes(tmp_path, monkeypatch) -> None:
+    path = str(tmp_path / "country.osm.pbf")
+    pbf_country(path)
+    decoded = []
+    init = osm_pbf.PrimitiveBlock.__init__
+
+    def count(self, data: bytes) -> None:
+        init(self, data)
+        decoded.append(self.kinds)
+
+    monkeypatch.setattr(osm_pbf.PrimitiveBlock, "__init__", count)
+    osm_pbf.OSMExtract(path)
+    # Ways and nodes passes read only blocks holding them
+    assert decoded == [{2}, {3}, {4}, {3}, {2}]
+
+
+@pytest.mark.parametrize("dense", [True, False])
+def test_extract(tmp_path, dense: bool) -> None:
+    path = str(tmp_path / "country.osm.pbf")
+    pbf_country(path, dense)
+    extract = osm_pbf.OSMExtract(path)
+    # Route relation is not an administrative boundary
+    assert set(extract.relations) == {1, 2, 3, 4}
+    assert extract.geometries[1].area == pytest.approx(8)
+    assert extract.geometries[3].area == pytest.approx(3)
+    assert extract.geometries[3].geom_type == "Polygon"
+    assert extract.place_ids.tolist() == list(range(1000, 1006))
+    assert extract.place_lons[2] == pytest.approx(2.2)
+    assert extract.place_tags[0]["name:ru"] == "Town ru"
+
+
+@pytest.mark.parametrize("local_addresses", [True, False])
+def test_pbf_crawl(tmp_path, local_addresses: bool) -> None:
+    path = str(tmp_path / "country.osm.pbf")
+    pbf_country(path)
+    with OSMStubServer() as Server:
+        Tmp = TempData()
+        Tmp.pbf_file = path
+        Tmp.use_cache = False
+        Tmp.local_addresses = local_addresses
+        Tmp.search_line = "country"
+        Tmp.search_type = "world"
+        Tmp.objects_language = "en"
+        Tmp.export_dir = str(tmp_path)
+        Tmp.export_to_excel = False
+        Tmp.feature_formats = ["geojsonl"]
+        Tmp.nominatim_endpoint = Tmp.overpass_endpoint = Server.endpoint
+        Crawler = EarthCrawler(Tmp)
+        Crawler.request_and_proccess_data()
+    assert sum(Server.requests.values()) == 0
+    assert Tmp.current_search_json[0]["display_name"] == "Country"
+    assert Tmp.regions_done == 2
+    with open(tmp_path / "country points.geojsonl", encoding="utf-8") as file:
+        points = {row["properties"]["location"]: row["properties"]
+                  for row in map(json.loads, file)}
+    # Locality is not chosen, hamlet lies in the hole of the East state
+    assert set(points) == {"Town", "Village", "City", "Edge"}
+    assert points["Town"]["county"] == "County"
+    assert points["Town"]["state"] == "West"
+    assert points["Edge"]["state"] == "East"
+    assert points["City"]["country"] == "Country"
+    with open(tmp_path / "country borders.geojsonl",
+              encoding="utf-8") as file:
+        borders = [json.loads(line)["properties"]["name"] for line in file]
+    assert sorted(borders) == ["East", "West"]
@@ -0,0 +1,62 @@
+"""
+Startup benchmarks: modules of the script and GUI modes are imported in a
+fresh interpreter, which has to stay within the import time budget
+(EARTH_CRAWLER_IMPORT_BUDGET environment variable, seconds) and must not
+import heavy dependencies, which are deferred to the crawl stages using
+them.
+"""
+import pytest
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BUDGET = float(os.environ.get("EARTH_CRAWLER_IMPORT_BUDGET", "0.5"))
+HEAVY_MODULES = ["shapely", "numpy", "pandas", "OSMPythonTools", "bs4",
+                 "xlsxwriter", "pyarrow", "simplekml", "mpl_toolkits",
+                 "asyncio", "requests"]
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def import_module(module: str, rounds: int = 3) -> tuple[float, list[str]]:
+    """Imports the module in fresh interpreters.
+
+    Args:
+        module (str): Module name
+        rounds (int, optional): Number of imports. Defaults to 3.
+
+    Returns:
+        tuple[float, list[str]]: Best import time and heavy modules
+            imported with the module
+    """
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    times = []
+    for _ in range(rounds):
+        result = subprocess.run(
+            [sys.executable, "-c",
+             IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+        duration, imported = result.stdout.splitlines()[-2:]
+        times.append(float(duration))
+    return min(times), [name for name in imported.split(",") if name]
+
+
+def test_crawler_import() -> None:
+    duration, imported = import_module("earth_crawler")
+    assert imported == []
+    assert duration < BUDGET
+
+
+def test_gui_import() -> None:
+    pytest.importorskip("PyQt6")
+    pytest.importorskip("waitingspinnerwidget")
+    duration, imported = import_module("earth_crawler_gui")
+    assert imported == []
+    # Qt libraries take most of the time
+    assert duration < BUDGET * 3
@@ -0,0 +1,89 @@
+import pytest
+import csv
+import os
+import re
+import sqlite3
+import struct
+import sys
+import zipfile
+# Path hack to make tests work.
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from table_export import LocationColumns, ExcelTableExporter, \
+    CSVTableExporter, GeoPackageTableExporter, \
+    ParquetTableExporter  # noqa: E402
+
+ROWS = [
+    {"location": f"V{i}", "county": None, "state": "S",
+     "region": f"R{i % 2}", "country": "C", "lon": i + 0.5, "lat": -i}
+    for i in range(5)]
+
+
+def test_location_columns() -> None:
+    Columns = LocationColumns(ROWS)
+    assert len(Columns) == 5
+    assert Columns.categories["region"] == {"R0": 0, "R1": 1}
+    assert list(Columns.codes["county"]) == [-1] * 5
+    assert list(Columns.rows())[1] == ("V1", None, "S", "R1", "C", 1.5, -1)
+
+
+def test_excel(tmp_path) -> None:
+    path = str(tmp_path / "test.xlsx")
+    Exporter = ExcelTableExporter(path, max_rows=3)
+    Exporter.add("Area: 1", LocationColumns(ROWS))
+    Exporter.add("area_ 1", LocationColumns(ROWS[:1]))
+    Exporter.close()
+    with zipfile.ZipFile(path) as archive:
+        workbook = archive.read("xl/workbook.xml").decode("utf-8")
+        sheet = archive.read("xl/worksheets/sheet3.xml").decode("utf-8")
+    # Header and 2 rows per sheet, names are valid and unique
+    assert re.findall(r'<sheet name="([^"]+)"', workbook) == [
+        "Area_ 1", "Area_ 1 (2)", "Area_ 1 (3)", "area_ 1 (4)"]
+    assert sheet.count("<row ") == 2
+
+
+def test_csv(tmp_path) -> None:
+    path = str(tmp_path / "test.csv")
+    Exporter = CSVTableExporter(path)
+    Exporter.add("A", LocationColumns(ROWS))
+    Exporter.discard()
+    assert not os.path.exists(path)
+    Exporter = CSVTableExporter(path)
+    Exporter.add("A", LocationColumns(ROWS))
+    Exporter.close()
+    with open(path, encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["area", *LocationColumns.COLUMNS]
+    assert rows[1] == ["A", "V0", "", "S", "R0", "C", "0.5", "0.0"]
+
+
+def test_geopackage(tmp_path) -> None:
+    path = str(tmp_path / "test.gpkg")
+    Exporter = GeoPackageTableExporter(path)
+    Exporter.add("A", LocationColumns(ROWS))
+    Exporter.close()
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA application_id").fetchone()[0] == \
+        0x47504B47
+    assert connection.execute(
+        "SELECT min_x, min_y, max_x, max_y FROM gpkg_contents").fetchone() \
+        == (0.5, -4, 4.5, 0)
+    geom, location = connection.execute(
+        "SELECT geom, location FROM locations WHERE fid = 2").fetchone()
+    assert location == "V1"
+    assert geom[:2] == b"GP"
+    assert struct.unpack("<dd", geom[-16:]) == (1.5, -1)
+    connection.close()
+
+
+def test_parquet(tmp_path) -> None:
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "test.parquet")
+    Exporter = ParquetTableExporter(path)
+    Exporter.add("A", LocationColumns(ROWS))
+    Exporter.add("B", LocationColumns(ROWS[:1]))
+    Exporter.close()
+    table = parquet.read_table(path)
+    assert table.num_rows == 6
+    assert table.column("county").null_count == 6
+    assert table.column("area").to_pylist()[-1] == "B"